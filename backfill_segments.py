@@ -1,6 +1,7 @@
 from database.db import SessionLocal
 from database.models import Prospect, Tag
-import re
+from services.tagging import resegment
+from sqlalchemy import select, update, or_
 import json
 
 def backfill_and_rename():
@@ -27,65 +28,37 @@ def backfill_and_rename():
 
     session.commit()
     
-    # 2. Backfill Existing Prospects
+    # 2. Backfill Existing Prospects (colonnes seules, écritures en masse)
     print("🔄 Backfilling existing prospects...")
-    prospects = session.query(Prospect).all()
-    count = 0
-    updated_size_count = 0
-    
-    for p in prospects:
-        size_to_parse = p.company_size
+    missing_size = session.execute(
+        select(Prospect.id, Prospect.experiences).where(
+            or_(Prospect.company_size.is_(None), Prospect.company_size == ''),
+            Prospect.experiences.isnot(None)
+        )
+    ).all()
 
+    size_updates = []
+    for p_id, experiences in missing_size:
         # Fallback: Extract from experiences if company_size is missing
-        if not size_to_parse and p.experiences:
-            try:
-                exps = json.loads(p.experiences)
-                if exps and isinstance(exps, list):
-                    # Check first experience for companySize
-                    first_exp = exps[0]
-                    # Format might vary (Apify sometimes nests parsing)
-                    if first_exp.get('companySize'):
-                        size_to_parse = first_exp.get('companySize')
-                    # Sometimes it's in company.companySize? depends on raw structure, 
-                    # but ApifyEnricher usually flattens or keeps as is.
-                
+        try:
+            exps = json.loads(experiences)
+            if exps and isinstance(exps, list) and isinstance(exps[0], dict):
+                # Check first experience for companySize
+                size_to_parse = exps[0].get('companySize')
                 if size_to_parse:
-                    p.company_size = size_to_parse
-                    updated_size_count += 1
-            except Exception as e:
-                # print(f"Error parsing exp for {p.full_name}: {e}")
-                pass
-
-        if not size_to_parse:
-            continue
-            
-        # Robust Parsing
-        s_clean = size_to_parse.replace(",", "")
-        numbers = re.findall(r'\d+', s_clean)
-        
-        if not numbers:
-            continue
-            
-        lower = int(numbers[0])
-        tag_name = None
+                    size_updates.append({'id': p_id, 'company_size': size_to_parse})
+        except Exception as e:
+            # print(f"Error parsing exp for {p_id}: {e}")
+            pass
 
-        if 1 <= lower <= 10: tag_name = 'Hors Cible'
-        elif 11 <= lower <= 100: tag_name = 'Segment A (11-100)'
-        elif 101 <= lower <= 500: tag_name = 'Segment B (101-500)'
-        elif 501 <= lower <= 2000: tag_name = 'Segment C (501-2000)'
-        elif 2001 <= lower <= 5000: tag_name = 'Segment C (501-2000)'
-        elif lower > 5000: tag_name = 'Hors Cible'
+    if size_updates:
+        session.execute(update(Prospect), size_updates)  # UPDATE groupé par clé primaire
+        session.commit()
 
-        if tag_name:
-            tag = session.query(Tag).filter_by(name=tag_name).first()
-            if tag:
-                if tag not in p.tags:
-                    p.tags.append(tag)
-                    count += 1
-                    print(f"   + Tagged {p.full_name} ({size_to_parse}) -> {tag_name}")
-    
+    stats = resegment(session)
     session.commit()
-    print(f"✅ Backfill complete. Updated size for {updated_size_count} prospects. Enhanced {count} prospects.")
+    print(f"✅ Backfill complete. Updated size for {len(size_updates)} prospects. "
+          f"Segmented {stats['segmented']} prospects ({stats['added']} tags added, {stats['removed']} stale segment tags removed).")
     session.close()
 
 if __name__ == "__main__":
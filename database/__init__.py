@@ -1,4 +1,5 @@
 from .db import init_db, get_db, SessionLocal
 from .models import Prospect, Campaign, Action, Settings, Account, Tag
+from . import counters  # noqa: enregistre la maintenance des compteurs de statuts
 
 __all__ = ['init_db', 'get_db', 'SessionLocal', 'Prospect', 'Campaign', 'Action', 'Settings', 'Account', 'Tag']
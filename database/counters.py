@@ -0,0 +1,220 @@
+"""
+Compteurs de prospects par (compte, statut) maintenus incrémentalement.
+
+Le dashboard et les filtres de /prospects lisent `prospect_status_counts`
+(recherche par clé primaire) au lieu de recompter toute la table à chaque
+requête.
+
+La maintenance passe par les événements de session SQLAlchemy, donc par toutes
+les écritures ORM (run_campaigns.py, /api/connect, /api/message, scraping,
+enrichissement) :
+- before_flush relit en base l'état (compte, statut, a un message) des
+  prospects touchés par le flush ;
+- after_flush relit ce même état une fois les écritures faites et applique
+  la différence par UPSERT, dans la même transaction.
+
+Les UPDATE/DELETE en masse (`query.delete()`, SQL brut) ne passent pas par
+ces événements : les appelants doivent soit passer par l'ORM, soit appeler
+`rebuild_status_counts()` (cf. reconcile_status_counts.py).
+"""
+
+from collections import Counter
+
+from sqlalchemy import event, exists, inspect, select, text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from .models import Prospect, Action, ProspectStatusCount
+
+MESSAGED_KEY = '__messaged__'
+
+# Taille des listes IN (limite de variables SQLite)
+CHUNK_SIZE = 500
+
+_PENDING_KEY = '_status_counts_before'
+
+_ready_binds = set()
+
+
+def _table_ready(connection) -> bool:
+    """La table existe-t-elle ? (sinon la migration 2 n'est pas encore passée)"""
+    key = str(connection.engine.url)
+    if key in _ready_binds:
+        return True
+    if inspect(connection).has_table(ProspectStatusCount.__tablename__):
+        _ready_binds.add(key)
+        return True
+    return False
+
+
+def _status_key(status):
+    return status if status is not None else ''
+
+
+def _prospect_states(connection, prospect_ids):
+    """{prospect_id: (account_id, statut, a_un_message)} lu en base"""
+    has_message = exists().where(
+        Action.prospect_id == Prospect.id,
+        Action.action_type == 'message',
+        Action.status == 'success'
+    )
+    states = {}
+    ids = list(prospect_ids)
+    for i in range(0, len(ids), CHUNK_SIZE):
+        rows = connection.execute(
+            select(Prospect.id, Prospect.account_id, Prospect.status, has_message)
+            .where(Prospect.id.in_(ids[i:i + CHUNK_SIZE]))
+        )
+        for prospect_id, account_id, status, messaged in rows:
+            states[prospect_id] = (account_id, _status_key(status), bool(messaged))
+    return states
+
+
+def _changed(obj, *attrs):
+    state = inspect(obj)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+def _before_flush(session, flush_context, instances):
+    session.info.pop(_PENDING_KEY, None)
+
+    touched_ids = set()
+    new_prospects = []
+    actions = []
+
+    for obj in session.new:
+        if isinstance(obj, Prospect):
+            new_prospects.append(obj)
+        elif isinstance(obj, Action):
+            actions.append(obj)
+
+    for obj in session.dirty:
+        if isinstance(obj, Prospect) and _changed(obj, 'status', 'account_id'):
+            touched_ids.add(obj.id)
+        elif isinstance(obj, Action) and _changed(obj, 'status', 'action_type', 'prospect_id'):
+            actions.append(obj)
+            # Ancien prospect si l'action a été réattribuée
+            touched_ids.update(v for v in inspect(obj).attrs.prospect_id.history.deleted if v)
+
+    for obj in session.deleted:
+        if isinstance(obj, Prospect):
+            touched_ids.add(obj.id)
+        elif isinstance(obj, Action):
+            actions.append(obj)
+
+    for action in actions:
+        prospect_id = action.prospect_id
+        if prospect_id is None and action.prospect is not None:
+            prospect_id = action.prospect.id
+        if prospect_id is not None:
+            touched_ids.add(prospect_id)
+
+    if not touched_ids and not new_prospects:
+        return
+
+    connection = session.connection()
+    if not _table_ready(connection):
+        return
+
+    session.info[_PENDING_KEY] = (
+        _prospect_states(connection, touched_ids),
+        touched_ids,
+        new_prospects,
+        actions,
+    )
+
+
+def _after_flush(session, flush_context):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending is None:
+        return
+    before, touched_ids, new_prospects, actions = pending
+
+    # Les nouveaux prospects / actions ont maintenant leurs identifiants
+    ids = set(touched_ids)
+    ids.update(p.id for p in new_prospects if p.id is not None)
+    ids.update(a.prospect_id for a in actions if a.prospect_id is not None)
+
+    connection = session.connection()
+    after = _prospect_states(connection, ids)
+
+    deltas = Counter()
+    for states, sign in ((before, -1), (after, 1)):
+        for account_id, status, messaged in states.values():
+            if account_id is None:
+                continue
+            deltas[(account_id, status)] += sign
+            if messaged:
+                deltas[(account_id, MESSAGED_KEY)] += sign
+
+    apply_deltas(connection, deltas)
+
+
+def apply_deltas(connection, deltas):
+    """UPSERT count = count + delta pour chaque (compte, statut) modifié"""
+    rows = [
+        {'account_id': account_id, 'status': status, 'count': delta}
+        for (account_id, status), delta in deltas.items() if delta
+    ]
+    if not rows:
+        return
+    stmt = insert(ProspectStatusCount.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['account_id', 'status'],
+        set_={'count': ProspectStatusCount.__table__.c.count + stmt.excluded.count}
+    )
+    connection.execute(stmt, rows)
+
+
+def rebuild_status_counts(connection, account_id=None):
+    """Recalculer les compteurs depuis prospects/actions (tous les comptes ou un seul)"""
+    params = {'account_id': account_id, 'messaged': MESSAGED_KEY}
+    scope = "AND account_id = :account_id" if account_id is not None else ""
+
+    connection.execute(text(
+        f"DELETE FROM prospect_status_counts WHERE 1 = 1 {scope}"
+    ), params)
+    connection.execute(text(f"""
+        INSERT INTO prospect_status_counts (account_id, status, count)
+        SELECT account_id, COALESCE(status, ''), COUNT(*)
+        FROM prospects
+        WHERE account_id IS NOT NULL {scope}
+        GROUP BY account_id, COALESCE(status, '')
+    """), params)
+    connection.execute(text(f"""
+        INSERT INTO prospect_status_counts (account_id, status, count)
+        SELECT account_id, :messaged, COUNT(*)
+        FROM prospects
+        WHERE account_id IS NOT NULL {scope}
+          AND EXISTS (
+              SELECT 1 FROM actions
+              WHERE actions.prospect_id = prospects.id
+                AND actions.action_type = 'message'
+                AND actions.status = 'success'
+          )
+        GROUP BY account_id
+    """), params)
+
+
+def read_status_counts(db, account_id):
+    """
+    Compteurs d'un compte au format du dashboard :
+    {'all', 'new', 'connected', 'followed', 'messaged'}.
+    """
+    rows = db.query(ProspectStatusCount.status, ProspectStatusCount.count).filter(
+        ProspectStatusCount.account_id == account_id
+    ).all()
+
+    counts = {'all': 0, 'new': 0, 'connected': 0, 'followed': 0, 'messaged': 0}
+    for status, count in rows:
+        if status == MESSAGED_KEY:
+            counts['messaged'] = count
+            continue
+        counts['all'] += count
+        if status in counts and status != 'messaged':
+            counts[status] = count
+    return counts
+
+
+event.listen(Session, 'before_flush', _before_flush)
+event.listen(Session, 'after_flush', _after_flush)
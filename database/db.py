@@ -1,9 +1,16 @@
 """
 Gestion de la connexion à la base de données SQLite.
+
+La base est partagée par plusieurs processus (worker gunicorn, run_campaigns.py
+lancé par cron ou depuis /api/campaign/run) : on passe en WAL pour que les
+lectures du dashboard ne soient jamais bloquées par les commits des campagnes,
+et un busy_timeout fait attendre les écrivains au lieu de lever
+`database is locked`.
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
+from sqlalchemy.pool import QueuePool
 import os
 
 # Declare Base here so it can be imported by models.py
@@ -15,8 +22,56 @@ DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'pros
 # Créer le dossier data si inexistant
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
 
+# Pragmas appliqués à chaque nouvelle connexion
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',            # Lecteurs et écrivain concurrents (persistant dans le fichier)
+    'synchronous': 'NORMAL',          # Sûr en WAL, évite un fsync par commit
+    'busy_timeout': 30000,            # ms d'attente sur un verrou avant "database is locked"
+    'mmap_size': 268435456,           # 256 Mo de lecture mappée en mémoire
+    'cache_size': -65536,             # 64 Mo de cache de pages (valeur négative = Kio)
+    'temp_store': 'MEMORY',           # Tris / tables temporaires en RAM
+    'journal_size_limit': 67108864,   # Tronquer le fichier -wal à 64 Mo après checkpoint
+}
+
+
+def create_sqlite_engine(db_path: str, echo: bool = False):
+    """
+    Créer un engine SQLite configuré pour un accès multi-processus.
+
+    Chaque processus garde un petit pool de connexions réutilisées (les pragmas
+    ne sont appliqués qu'à l'ouverture). Le pool est réinitialisé après un fork
+    pour ne jamais partager une connexion SQLite entre deux processus.
+    """
+    engine = create_engine(
+        f'sqlite:///{db_path}',
+        echo=echo,
+        poolclass=QueuePool,
+        pool_size=5,
+        max_overflow=5,
+        pool_timeout=30,
+        connect_args={
+            'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+            # Les sessions sont par thread (scoped_session), mais une connexion
+            # rendue au pool peut être reprise par un autre thread
+            'check_same_thread': False,
+        },
+    )
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
+
+    return engine
+
+
 # Créer engine SQLite
-engine = create_engine(f'sqlite:///{DB_PATH}', echo=False)
+engine = create_sqlite_engine(DB_PATH)
 
 # Session factory
 SessionLocal = scoped_session(sessionmaker(bind=engine))
@@ -0,0 +1,95 @@
+"""
+Canonicalisation des URLs de profil LinkedIn et de leur identifiant (handle).
+
+Source unique pour le scraper (URL stockée), l'enrichissement Apify (URL
+envoyée, rapprochement des résultats) et la colonne `Prospect.linkedin_handle`,
+remplie automatiquement à chaque affectation de `linkedin_url` (cf. models.py).
+
+    https://fr.linkedin.com/in/Jean-Dupont-12ab/fr/?trk=x
+        URL canonique : https://fr.linkedin.com/in/Jean-Dupont-12ab
+        handle        : jean-dupont-12ab
+"""
+
+from urllib.parse import unquote
+
+
+def _split_profile_url(url: str):
+    """(préfixe jusqu'à '/in/', premier segment après '/in/') ou None"""
+    if not url:
+        return None
+    url = url.strip().split('#')[0].split('?')[0]
+    marker = url.lower().find('/in/')
+    if marker < 0:
+        return None
+    segment = url[marker + 4:].strip('/').split('/')[0]
+    if not segment:
+        return None
+    return url[:marker + 4], segment
+
+
+def canonical_profile_url(url: str) -> str:
+    """
+    URL de profil sans query string, fragment, suffixe de langue (/fr, /en, /zh-cn...)
+    ni sous-page : seul le premier segment après /in/ est gardé. Domaine et casse conservés.
+    URL non reconnue (société, autre) : renvoyée sans query string ni slash final.
+    """
+    parts = _split_profile_url(url)
+    if parts is None:
+        return (url or '').split('?')[0].rstrip('/')
+    prefix, segment = parts
+    return prefix + segment
+
+
+def canonical_handle(url: str) -> str:
+    """Identifiant du profil : premier segment après /in/, décodé et en minuscules ('' si absent)"""
+    parts = _split_profile_url(url)
+    if parts is None:
+        return ''
+    return unquote(parts[1]).strip().lower()
+
+
+def handle_stems(handle: str):
+    """Préfixes du handle aux tirets, du plus long au plus court (jean-dupont-12ab, jean-dupont, jean)"""
+    pieces = handle.split('-')
+    return ['-'.join(pieces[:i]) for i in range(len(pieces), 0, -1) if pieces[i - 1]]
+
+
+def _fuzzy_stems(handle: str):
+    """Préfixes stricts utilisables en approximatif : au moins prénom-nom (un prénom seul est trop ambigu)"""
+    return [stem for stem in handle_stems(handle)[1:] if '-' in stem]
+
+
+class HandleIndex:
+    """
+    Rapprochement handle -> objet en O(1) : correspondance exacte, puis approximative
+    par index des préfixes aux tirets (handle avec ou sans suffixe d'ID, dans les deux sens).
+    Un préfixe partagé par plusieurs objets est ambigu et n'est jamais utilisé.
+    """
+
+    def __init__(self, items, key):
+        self.exact = {}
+        self.by_stem = {}
+        for item in items:
+            handle = key(item)
+            if not handle:
+                continue
+            self.exact.setdefault(handle, item)
+            for stem in _fuzzy_stems(handle):
+                self.by_stem[stem] = item if stem not in self.by_stem else None
+
+    def get(self, handle: str):
+        if not handle:
+            return None
+        item = self.exact.get(handle)
+        if item is not None:
+            return item
+        # Handle reçu plus court que le nôtre (suffixe d'ID en moins)
+        item = self.by_stem.get(handle)
+        if item is not None:
+            return item
+        # Handle reçu plus long (suffixe en plus) : notre handle est l'un de ses préfixes
+        for stem in _fuzzy_stems(handle):
+            item = self.exact.get(stem)
+            if item is not None:
+                return item
+        return None
@@ -3,15 +3,18 @@ Modèles de base de données SQLAlchemy.
 3 tables principales: Prospect, Campaign, Action
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Float, Table, Index
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime
 from .db import Base
+from .handles import canonical_handle
 
 # Association Table
 prospect_tags = Table('prospect_tags', Base.metadata,
     Column('prospect_id', Integer, ForeignKey('prospects.id'), primary_key=True),
-    Column('tag_id', Integer, ForeignKey('tags.id'), primary_key=True)
+    Column('tag_id', Integer, ForeignKey('tags.id'), primary_key=True),
+    # La PK (prospect_id, tag_id) ne sert pas le filtre par tag
+    Index('ix_prospect_tags_tag', 'tag_id', 'prospect_id')
 )
 
 class Tag(Base):
@@ -64,7 +67,9 @@ class Prospect(Base):
     
     id = Column(Integer, primary_key=True)
     account_id = Column(Integer, ForeignKey('accounts.id'), nullable=True) # Nullable pour la migration
-    linkedin_url = Column(String, nullable=False) # Removed unique=True constraint globally, managed by application logic per account if needed, or composite unique index later
+    linkedin_url = Column(String, nullable=False) # Unique par compte (uq_prospects_url_account), pas globalement
+    linkedin_urn = Column(String)   # ID membre (fsd_profile / memberId), mis en cache par le bot
+    linkedin_handle = Column(String)  # Identifiant canonique de l'URL (database/handles.py), tenu à jour par set_linkedin_url
     full_name = Column(String)
     headline = Column(String)
     company = Column(String)
@@ -91,6 +96,13 @@ class Prospect(Base):
     industry = Column(String)
     years_of_experience = Column(Float) # Changed to Float for values like 13.4
     raw_data = Column(Text) # JSON complet du dump
+    raw_parser_version = Column(Integer)  # PARSER_VERSION (services/apify_enrichment.py) des champs tirés de raw_data
+    raw_data_hash = Column(String)        # Empreinte de raw_data à ce parsing (cf. reprocess_raw_data.py)
+    raw_data_at = Column(DateTime)        # Date du dump Apify (comparée à profile_scraped_at)
+
+    # Relevé du bot lors de ses visites (opt-in, cf. services/profile_snapshot.py)
+    connection_degree = Column(String)      # 1st, 2nd, 3rd
+    profile_scraped_at = Column(DateTime)   # Fraîcheur des champs relevés par le bot
     
     # Status du prospect
     status = Column(String, default='new')  # new, connected, messaged, replied
@@ -107,6 +119,35 @@ class Prospect(Base):
     account = relationship("Account", back_populates="prospects")
     tags = relationship("Tag", secondary=prospect_tags, backref="prospects")
 
+    @validates('linkedin_url')
+    def set_linkedin_url(self, key, url):
+        # Handle recalculé à chaque affectation de l'URL (insertion comprise)
+        self.linkedin_handle = canonical_handle(url) or None
+        return url
+
+    # Index alignés sur les requêtes chaudes (cf. migrations/add_indexes.py pour les bases existantes)
+    __table_args__ = (
+        # Unicité par compte. linkedin_url en tête pour servir aussi les recherches par URL seule.
+        Index('uq_prospects_url_account', 'linkedin_url', 'account_id', unique=True),
+        Index('ix_prospects_account_status', 'account_id', 'status'),   # Compteurs dashboard / filtres
+        Index('ix_prospects_account_added', 'account_id', 'added_at'),  # Liste triée par date d'ajout
+        Index('ix_prospects_campaign_status', 'campaign_id', 'status', 'last_action_at'),  # Étape messages
+        Index('ix_prospects_status', 'status'),  # Sélection des prospects 'new' (étape connexions)
+        Index('ix_prospects_handle', 'linkedin_handle', 'account_id'),  # Rapprochement par handle (scraper, Apify)
+    )
+
+class ProspectStatusCount(Base):
+    """
+    Compteurs de prospects par (compte, statut), maintenus dans la même
+    transaction que les écritures (cf. database/counters.py).
+    La clé réservée '__messaged__' compte les prospects ayant au moins un message envoyé.
+    """
+    __tablename__ = 'prospect_status_counts'
+
+    account_id = Column(Integer, primary_key=True)
+    status = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
 class Campaign(Base):
     """Table des campagnes de prospection"""
     __tablename__ = 'campaigns'
@@ -161,6 +202,12 @@ class Action(Base):
     # Relations
     prospect = relationship("Prospect", back_populates="actions")
     campaign = relationship("Campaign", back_populates="actions")
+
+    __table_args__ = (
+        Index('ix_actions_prospect_type_status', 'prospect_id', 'action_type', 'status'),  # Messages par prospect
+        Index('ix_actions_campaign_type_executed', 'campaign_id', 'action_type', 'executed_at'),  # Quotas journaliers
+        Index('ix_actions_executed_at', 'executed_at'),  # Actions récentes (dashboard)
+    )
     
 class Settings(Base):
     """Configuration globale de l'application"""
@@ -179,3 +226,66 @@ class User(Base):
     username = Column(String, unique=True, nullable=False)
     password_hash = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class Job(Base):
+    """
+    File de tâches persistante (scraping, enrichissement, tagging IA).
+    Consommée par worker.py, cf. services/job_queue.py.
+    """
+    __tablename__ = 'jobs'
+
+    id = Column(Integer, primary_key=True)
+    account_id = Column(Integer, ForeignKey('accounts.id'), nullable=True)
+    pipeline_id = Column(Integer)  # Job racine de la chaîne (scrape -> enrich -> tag)
+    job_type = Column(String, nullable=False)  # scrape, enrich, tag, drafts
+    status = Column(String, default='queued')  # queued, running, done, failed
+
+    payload = Column(Text)  # JSON : paramètres de l'étape
+    result = Column(Text)   # JSON : résultat de l'étape
+    error = Column(Text)
+
+    progress = Column(Integer, default=0)  # 0-100
+    progress_message = Column(String)
+
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    run_after = Column(DateTime)  # Backoff avant nouvelle tentative
+    locked_by = Column(String)    # Identifiant du worker
+    heartbeat_at = Column(DateTime)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_jobs_status_run_after', 'status', 'run_after', 'id'),  # Prochaine tâche à prendre
+        Index('ix_jobs_pipeline', 'pipeline_id'),  # Suivi d'une chaîne depuis l'UI
+    )
+
+
+class MessageDraft(Base):
+    """
+    Message IA pré-généré pour un prospect d'une campagne (cf. services/message_drafts.py).
+    Valide tant que le prompt et le profil n'ont pas changé depuis la génération.
+    """
+    __tablename__ = 'message_drafts'
+
+    id = Column(Integer, primary_key=True)
+    campaign_id = Column(Integer, ForeignKey('campaigns.id'), nullable=False)
+    prospect_id = Column(Integer, ForeignKey('prospects.id'), nullable=False)
+
+    prompt_version = Column(String)   # Empreinte du prompt (+ modèle) utilisé
+    profile_version = Column(String)  # Empreinte des champs du profil envoyés au modèle
+    message = Column(Text)
+    status = Column(String, default='ready')  # ready, failed, used
+    error = Column(Text)
+    attempts = Column(Integer, default=0)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    generated_at = Column(DateTime)
+    used_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('uq_message_drafts_campaign_prospect', 'campaign_id', 'prospect_id', unique=True),
+    )
@@ -1,96 +1,42 @@
 """
 Script pour enrichir les prospects via Apify
 Usage: python enrich_prospects.py --limit 100
+       python enrich_prospects.py --limit 500 --chunk-size 25 --parallel 3   # runs Apify parallèles
+       python enrich_prospects.py --bot-fresh-days 0   # inclure les prospects relevés récemment par le bot
 """
 import argparse
-from database import SessionLocal, Prospect
-from database.models import Tag
-from services.apify_enrichment import ApifyEnricher
 import json
-import re
-
-# Auto-Segmentation Logic
-def assign_segment(session, prospect, size_str):
-    if not size_str:
-        return
-
-    # Parse size using regex to be robust
-    # e.g. "11-50 employees" -> 11
-    # "10,001+ employees" -> 10001
-    
-    # 1. Clean string (remove commas)
-    s_clean = size_str.replace(",", "")
-    
-    # 2. Extract first number
-    numbers = re.findall(r'\d+', s_clean)
-    if not numbers:
-        return
-
-    lower = int(numbers[0])
-    tag_name = None
-
-    # Logic based on User definitions
-    # Segment A (11-100)
-    # Segment B (101-500)
-    # Segment C (501-2000)
-    # Hors Cible (Others)
-
-    if 1 <= lower <= 10:
-        tag_name = 'Hors Cible'
-    elif 11 <= lower <= 100:
-        tag_name = 'Segment A (11-100)'
-    elif 101 <= lower <= 500:
-        tag_name = 'Segment B (101-500)'
-    elif 501 <= lower <= 2000:
-        tag_name = 'Segment C (501-2000)'
-    elif 2001 <= lower <= 5000:
-        # Previously mapped 1001-5000 to C. But user said C is 501-2000.
-        # Let's map 2001-5000 to C as well to be safe? Or Hors Cible?
-        # User request: "Segment C (501-2000)".
-        # Let's assume > 2000 is Hors Cible unless likely relevant.
-        # Previous logic: 1001-5000 -> C.
-        tag_name = 'Segment C (501-2000)'
-    else:
-        # > 5000
-        tag_name = 'Hors Cible'
-
-    if tag_name:
-        tag = session.query(Tag).filter_by(name=tag_name).first()
-        if tag:
-            if tag not in prospect.tags:
-                prospect.tags.append(tag)
-                print(f"🏷️ Auto-tagged {prospect.full_name}: {tag_name}")
-import json
-import re
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from database import SessionLocal, Prospect
+from services.apify_enrichment import (
+    ApifyEnricher, CHUNK_SIZE, MAX_PARALLEL_RUNS, PARSER_VERSION, prospect_fields, raw_data_hash,
+)
+from services.profile_snapshot import BOT_DATA_FRESH_DAYS
+from database.handles import canonical_handle, canonical_profile_url, HandleIndex
+from services.tagging import TagCatalogue, add_tags, resegment
 
-def clean_handle(url):
-    """Extraire l'identifiant unique de l'URL LinkedIn"""
-    if not url: return ""
-    try:
-        # Garder la partie après /in/
-        if '/in/' in url:
-            path = url.split('/in/')[-1]
-        else:
-            return "" # URL invalide ou format société
-            
-        # Nettoyer query params et slashes
-        path = path.split('?')[0].strip('/')
-        
-        # Gérer les suffixes de langue ex: "arthur-mensch/en" -> "arthur-mensch"
-        parts = path.split('/')
-        handle = parts[0]
-        
-        # Nettoyage supplémentaire si besoin (certains scrapers ajoutent des IDs)
-        return handle.lower()
-    except:
-        return ""
+WRITE_BATCH = 25  # Prospects enrichis par transaction
 
-def enrich_prospects(limit=20, force_clean=False, redo_empty=False):
-    db = SessionLocal()
-    
+def select_prospects(db, limit=20, force_clean=False, redo_empty=False, prospect_ids=None, bot_fresh_days=BOT_DATA_FRESH_DAYS):
+    """
+    Prospects à enrichir selon le mode (ou une liste explicite d'IDs, cf. worker.py).
+    Hors modes nettoyage/réparation, les prospects relevés par le bot depuis moins de
+    `bot_fresh_days` jours sont ignorés (0 = pas de filtre).
+    """
     query = db.query(Prospect)
+    if bot_fresh_days and not (force_clean or redo_empty):
+        cutoff = datetime.utcnow() - timedelta(days=bot_fresh_days)
+        query = query.filter(or_(Prospect.profile_scraped_at == None, Prospect.profile_scraped_at < cutoff))
     
-    if force_clean:
+    if prospect_ids is not None:
+        # Déjà enrichis exclus : une nouvelle tentative ne repaie pas Apify pour eux
+        prospects = query.filter(
+            Prospect.id.in_(prospect_ids),
+            Prospect.is_enriched == False,
+            Prospect.linkedin_url != None
+        ).all()
+    elif force_clean:
         print("🧹 Mode nettoyage activé : Ciblage des noms avec '/'")
         prospects = query.filter(Prospect.full_name.like('%/%')).limit(limit).all()
     elif redo_empty:
@@ -106,180 +52,180 @@ def enrich_prospects(limit=20, force_clean=False, redo_empty=False):
             Prospect.is_enriched == False,
             Prospect.linkedin_url != None
         ).limit(limit).all()
+    return prospects
+
+
+def apply_item(item, matched_prospect):
+    """Écrire un item Apify sur son prospect (sans commit). False si rien d'écrit (profil fantôme, à supprimer par l'appelant)."""
+    # Check for Ghost/Invalid Profile
+    # Criteria: No first name AND no last name, or explicit error in raw data
+    if not item.get('firstName') and not item.get('lastName'):
+        print(f"👻 Ghost Profile Detected for {matched_prospect.linkedin_url} (No Name). Deleting...")
+        return False
+
+    # Champs extraits de l'item (même règles que reprocess_raw_data.py)
+    for key, value in prospect_fields(item).items():
+        setattr(matched_prospect, key, value)
     
-    if not prospects:
-        print("✅ Aucun prospect à traiter.")
-        db.close()
-        return
+    # RAW, avec la version du parseur et l'empreinte du dump (retraitement sans nouvel appel Apify)
+    matched_prospect.raw_data = json.dumps(item)
+    matched_prospect.raw_parser_version = PARSER_VERSION
+    matched_prospect.raw_data_hash = raw_data_hash(matched_prospect.raw_data)
+    matched_prospect.raw_data_at = datetime.utcnow()
+    
+    # Clean heuristique
+    if matched_prospect.full_name and '/' in matched_prospect.full_name:
+        matched_prospect.full_name = matched_prospect.full_name.split('/')[0].strip()
 
-    print(f"🎯 {len(prospects)} prospects à traiter...")
+    matched_prospect.is_enriched = True
+    print(f"✅ Réparé: {matched_prospect.full_name}")
+    return True
     
-    # Nettoyage des URLs avant envoi à Apify (CRUCIAL pour éviter les 404)
-    clean_urls = []
-    for p in prospects:
-        u = p.linkedin_url.split('?')[0].rstrip('/')
-        parts = u.split('/')
-        if len(parts) > 0 and len(parts[-1]) <= 2: # ex: /fr, /en
-            u = '/'.join(parts[:-1]) # On garde tout sauf le dernier segment
-        clean_urls.append(u)
-        
-    # Appel Apify avec URLs propres
-    enricher = ApifyEnricher()
-    try:
-        results = enricher.enrich_profiles(clean_urls)
-    except Exception as e:
-        print(f"❌ Erreur critique Apify: {e}")
-        db.close()
-        return
+
+
+
+def match_item(item, prospect_index):
+    """Prospect correspondant à un item Apify : handle exact, puis préfixe (index, pas de parcours)"""
+    apify_url = item.get('url') or item.get('linkedinUrl')
+    if not apify_url:
+        return None
+    return prospect_index.get(canonical_handle(apify_url))
+
+
+def apply_enrichment(db, prospects, chunk_size=CHUNK_SIZE, max_parallel=MAX_PARALLEL_RUNS):
+    """
+    Enrichir les prospects via Apify et mettre à jour la base.
+    Runs Apify par lots de `chunk_size` URLs, `max_parallel` en parallèle ; les items
+    sont écrits au fil de la lecture des datasets, commit tous les WRITE_BATCH.
+    Un lot en échec n'annule pas les autres (ses prospects restent non enrichis,
+    repris au prochain passage). Retourne le nombre de prospects mis à jour ;
+    lève l'exception Apify si tous les lots ont échoué.
+    """
+    print(f"🎯 {len(prospects)} prospects à traiter...")
     
-    # ... (Reste du code identique jusqu'au nettoyage nom)
-    # On met à jour le map pour matcher avec les URLs propres
-    prospect_map = {}
-    for p in prospects:
-        # On calcule le handle attendu depuis l'URL propre du prospect
-        u = p.linkedin_url.split('?')[0].rstrip('/')
-        parts = u.split('/')
-        if len(parts) > 0 and len(parts[-1]) <= 2:
-            u = '/'.join(parts[:-1])
-        h = clean_handle(u)
-        if h:
-            prospect_map[h] = p
+    # URLs propres envoyées à Apify (CRUCIAL pour éviter les 404) ; rapprochement par handle indexé
+    clean_urls = [canonical_profile_url(p.linkedin_url) for p in prospects]
+    prospect_index = HandleIndex(prospects, key=lambda p: p.linkedin_handle or canonical_handle(p.linkedin_url))
 
+    enricher = ApifyEnricher()
+    catalogue = TagCatalogue(db)
     updated_count = 0
-    for item in results:
-        apify_url = item.get('url') or item.get('linkedinUrl')
-        if not apify_url: continue
-        
-        handle = clean_handle(apify_url)
-        matched_prospect = prospect_map.get(handle)
-        
-        # Fallback search
-        if not matched_prospect:
-            for p in prospects:
-                h = clean_handle(p.linkedin_url) # Handle de base
-                if h and (h in handle or handle in h):
-                    matched_prospect = p
-                    break
-        
-        if matched_prospect:
-            data = enricher.parse_result_to_db(item)
-            
-            # Extract names for checks
-            first = item.get('firstName')
-            last = item.get('lastName')
-            full = item.get('fullName')
-            
-            # Update fields
-            matched_prospect.summary = data['summary']
-            if data['email']: matched_prospect.email = data['email']
-            matched_prospect.phone = data['phone']
-            matched_prospect.location = data['location']
-            if data['profile_picture']: matched_prospect.profile_picture = data['profile_picture']
-            if data['headline']: matched_prospect.headline = data['headline']
-            
-            matched_prospect.skills = data['skills']
-            matched_prospect.experiences = data['experiences']
-            matched_prospect.education = data['education']
-            matched_prospect.languages = data['languages']
-            
-            # Check for Ghost/Invalid Profile
-            # Criteria: No first name AND no last name, or explicit error in raw data
-            if not first and not last:
-                print(f"👻 Ghost Profile Detected for {matched_prospect.linkedin_url} (No Name). Deleting...")
-                try:
-                    # Generic deletion of related actions is handled by Foreign Key cascade if set, 
-                    # but we'll stick to simple deletion of the prospect for now.
-                    # If you have Actions separately linked, you might need to delete them first if no CASCADE.
-                    # Assuming basic deletion is fine or SQLAlchemy handles cascade if configured.
-                    db.delete(matched_prospect)
-                    db.commit()
-                    print(f"🗑️ Deleted Ghost Profile: {matched_prospect.id}")
-                except Exception as e:
-                    print(f"❌ Error deleting ghost profile: {e}")
-                    db.rollback()
-                continue
+    pending = []  # Prospects mis à jour depuis le dernier commit, segmentés en masse au commit
+    ghosts = []  # Profils fantômes, supprimés avec le lot
+    errors = []
+    chunks_done = 0
 
-            # Nouveaux champs enrichis
-            matched_prospect.connections_count = data['connections_count']
-            matched_prospect.followers_count = data['followers_count']
-            matched_prospect.is_premium = data['is_premium']
-            matched_prospect.is_creator = data['is_creator']
-            matched_prospect.is_verified = data['is_verified']
-            matched_prospect.years_of_experience = data['years_of_experience']
-            
-            # Company Details
-            matched_prospect.company_size = data['company_size']
-            matched_prospect.industry = data['industry']
-            
-            # RAW
-            matched_prospect.raw_data = data['raw_data']
-            
-            # Auto-Segment
-            assign_segment(db, matched_prospect, matched_prospect.company_size)
-            
-            if first and last:
-                matched_prospect.full_name = f"{first} {last}"
-            elif full:
-                matched_prospect.full_name = full
-            
-            # Clean heuristique
-            if matched_prospect.full_name and '/' in matched_prospect.full_name:
-                matched_prospect.full_name = matched_prospect.full_name.split('/')[0].strip()
+    def commit_pending():
+        nonlocal updated_count
+        for ghost in ghosts:
+            db.delete(ghost)
+        # Auto-Segment
+        resegment(db, [(p.id, p.company_size) for p in pending], catalogue)
+        db.commit()
+        updated_count += len(pending)
+        for ghost in ghosts:
+            print(f"🗑️ Deleted Ghost Profile: {ghost.id}")
+        pending.clear()
+        ghosts.clear()
 
-            matched_prospect.is_enriched = True
-            updated_count += 1
-            print(f"✅ Réparé: {matched_prospect.full_name}")
-            
-    db.commit()
-    
-    # AUTO-TAG SIGNALS with AI (NEW)
+    for chunk, items, error in enricher.iter_chunks(clean_urls, chunk_size=chunk_size, max_parallel=max_parallel):
+        chunks_done += 1
+        if error:
+            errors.append(error)
+            continue
+
+        try:
+            for item in items:
+                matched_prospect = match_item(item, prospect_index)
+                if not matched_prospect:
+                    continue
+                if apply_item(item, matched_prospect):
+                    pending.append(matched_prospect)
+                else:
+                    ghosts.append(matched_prospect)
+                if len(pending) + len(ghosts) >= WRITE_BATCH:
+                    commit_pending()
+            commit_pending()
+        except Exception as e:
+            # Lecture du dataset interrompue : ce qui a été commité reste acquis (et seul compté)
+            print(f"❌ Erreur lecture dataset Apify ({len(chunk)} URLs): {e}")
+            db.rollback()
+            pending.clear()
+            ghosts.clear()
+            errors.append(e)
+
+    if errors:
+        print(f"⚠️ {len(errors)} lot(s) Apify en échec, leurs prospects seront repris au prochain passage")
+        if len(errors) == chunks_done:
+            raise errors[0]
+    return updated_count
+
+
+def tag_signals(db, prospects, on_progress=None):
+    """
+    Tagging des signaux sur les prospects enrichis : préfiltre par mots-clés
+    (services/signal_matcher.py), puis IA pour les profils ambigus, par petits lots en parallèle.
+    `on_progress(done, total)` est appelé après chaque lot (cf. worker.py).
+    """
     print("\n🤖 Running AI Signal Tagging on enriched prospects...")
     from services.ai_service import AIService
+    from services.signal_matcher import SIGNAL_PREFIX, SIGNAL_COLORS, iter_signal_tags
     ai = AIService()
     
-    # Get or create signal tags
-    SIGNAL_TAGS = {
-        "Platform/DevEx initiatives": "#6f42c1",
-        "AI coding mentions": "#198754",
-        "scaling/hiring": "#fd7e14",
-        "productivity investment": "#0dcaf0",
-        "refactor/tech debt narratives": "#dc3545"
-    }
-    
-    tag_objects = {}
-    for name, color in SIGNAL_TAGS.items():
-        tag = db.query(Tag).filter_by(name="Signal: " + name).first()
-        if not tag:
-            tag = Tag(name="Signal: " + name, color=color)
-            db.add(tag)
-            db.commit()
-        tag_objects[name] = tag
+    # Tags signal : catalogue lu une fois, créés si absents
+    catalogue = TagCatalogue(db)
+    tag_ids = {name: catalogue.ensure(SIGNAL_PREFIX + name, color) for name, color in SIGNAL_COLORS.items()}
     
-    # Batch AI analysis (only for newly enriched)
+    # Batch analysis (only for newly enriched) : décisions locales d'abord, puis réponses IA au fil de l'eau
     enriched_prospects = [p for p in prospects if p.is_enriched]
-    BATCH_SIZE = 3
-    for i in range(0, len(enriched_prospects), BATCH_SIZE):
-        batch = enriched_prospects[i:i+BATCH_SIZE]
-        batch_data = [{'id': p.id, 'headline': p.headline, 'summary': p.summary, 'skills': p.skills} for p in batch]
-        
+    batch_data = [{'id': p.id, 'headline': p.headline, 'summary': p.summary, 'skills': p.skills} for p in enriched_prospects]
+    known_ids = {p.id for p in enriched_prospects}  # Un id renvoyé par l'IA hors du lot est ignoré
+
+    hits_before, misses_before = (ai.cache.hits, ai.cache.misses) if ai.cache else (0, 0)
+    done = 0
+    for batch, results in iter_signal_tags(ai, batch_data):
         try:
-            results = ai.analyze_batch_signals(batch_data)
-            for p_id_str, tags_found in results.items():
-                if not tags_found:
-                    continue
-                p_id = int(p_id_str)
-                prospect = db.query(Prospect).get(p_id)
-                if not prospect:
-                    continue
-                for tag_key in tags_found:
-                    db_tag = tag_objects.get(tag_key)
-                    if db_tag and db_tag not in prospect.tags:
-                        prospect.tags.append(db_tag)
-                        print(f"🏷️ AI Tagged {prospect.full_name}: {tag_key}")
+            pairs = [
+                (int(p_id_str), tag_ids[tag_key])
+                for p_id_str, tags_found in results.items()
+                for tag_key in tags_found or []
+                if int(p_id_str) in known_ids and tag_key in tag_ids
+            ]
+            added = add_tags(db, pairs)
             db.commit()
+            if added:
+                print(f"🏷️ AI Tagged: {added} signal(s) posé(s) sur ce lot")
         except Exception as e:
             print(f"⚠️ AI Tagging Error: {e}")
             db.rollback()
+        
+        done += len(batch)
+        if on_progress:
+            on_progress(done, len(enriched_prospects))
+
+    if ai.cache:
+        print(f"🗃️ Cache IA: {ai.cache.hits - hits_before} hit(s), {ai.cache.misses - misses_before} miss(es)")
+
+
+def enrich_prospects(limit=20, force_clean=False, redo_empty=False, bot_fresh_days=BOT_DATA_FRESH_DAYS,
+                     chunk_size=CHUNK_SIZE, max_parallel=MAX_PARALLEL_RUNS):
+    db = SessionLocal()
+    
+    prospects = select_prospects(db, limit, force_clean, redo_empty, bot_fresh_days=bot_fresh_days)
+    if not prospects:
+        print("✅ Aucun prospect à traiter.")
+        db.close()
+        return
+
+    try:
+        updated_count = apply_enrichment(db, prospects, chunk_size=chunk_size, max_parallel=max_parallel)
+    except Exception as e:
+        print(f"❌ Erreur critique Apify: {e}")
+        db.close()
+        return
+    
+    # AUTO-TAG SIGNALS with AI (NEW)
+    tag_signals(db, prospects)
     
     db.close()
     print(f"\n🏁 Terminé: {updated_count}/{len(prospects)} réparés.")
@@ -289,6 +235,11 @@ if __name__ == "__main__":
     parser.add_argument('--limit', type=int, default=20)
     parser.add_argument('--clean', action='store_true')
     parser.add_argument('--redo-empty', action='store_true', help='Relancer ceux qui sont vides')
+    parser.add_argument('--bot-fresh-days', type=int, default=BOT_DATA_FRESH_DAYS,
+                        help='Ignorer les prospects relevés par le bot depuis moins de N jours (0 = désactivé)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='URLs par run Apify')
+    parser.add_argument('--parallel', type=int, default=MAX_PARALLEL_RUNS, help='Runs Apify simultanés')
     args = parser.parse_args()
     
-    enrich_prospects(limit=args.limit, force_clean=args.clean, redo_empty=args.redo_empty)
+    enrich_prospects(limit=args.limit, force_clean=args.clean, redo_empty=args.redo_empty, bot_fresh_days=args.bot_fresh_days,
+                     chunk_size=args.chunk_size, max_parallel=args.parallel)
@@ -1,7 +1,6 @@
 import sys
 import os
 import json
-import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,27 +8,15 @@ load_dotenv()
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
-from database import SessionLocal, Prospect, Tag
+from database import SessionLocal, Prospect
 # from database.models import ProspectTag # Not needed
 from services.ai_service import AIService
+from services.signal_matcher import SIGNAL_PREFIX, SIGNAL_COLORS, iter_signal_tags, evaluate
+from services.tagging import TagCatalogue, add_tags
 
 # Constants
 BATCH_SIZE = 3
-SIGNAL_TAGS = {
-    "Platform/DevEx initiatives": "#6f42c1", # Purple
-    "AI coding mentions": "#198754",         # Green
-    "scaling/hiring": "#fd7e14",             # Orange
-    "productivity investment": "#0dcaf0",    # Cyan
-    "refactor/tech debt narratives": "#dc3545" # Red
-}
-
-def get_or_create_tag(session, name, color):
-    tag = session.query(Tag).filter(Tag.name == name).first()
-    if not tag:
-        tag = Tag(name=name, color=color)
-        session.add(tag)
-        session.commit()
-    return tag
+SIGNAL_TAGS = SIGNAL_COLORS  # Signal -> couleur (table des définitions : services/signal_matcher.py)
 
 def get_prospects_batch(session, limit=100, force_rescan=False):
     # Fetch prospects, prioritizing those without ANY signal tags
@@ -56,76 +43,99 @@ def get_prospects_batch(session, limit=100, force_rescan=False):
             
     return candidates
 
-def run_signal_enrichment(force_rescan=False):
+def run_signal_enrichment(force_rescan=False, use_cache=True, prefilter=True):
     session = SessionLocal()
     ai = AIService()
 
     # 1. Ensure Tags exist
     print("🔧 Ensuring Signal Tags exist...")
-    tag_objects = {}
-    for name, color in SIGNAL_TAGS.items():
-        tag_objects[name] = get_or_create_tag(session, "Signal: " + name, color)
+    catalogue = TagCatalogue(session)
+    tag_ids = {name: catalogue.ensure(SIGNAL_PREFIX + name, color) for name, color in SIGNAL_TAGS.items()}
 
     # 2. Fetch Prospects
     prospects = get_prospects_batch(session, limit=50, force_rescan=force_rescan) # Limit 50 for test
     print(f"🔍 Found {len(prospects)} prospects to analyze.")
 
-    # 3. Process in Batches
-    for i in range(0, len(prospects), BATCH_SIZE):
-        batch = prospects[i:i+BATCH_SIZE]
-        batch_data = []
-        for p in batch:
-            batch_data.append({
-                'id': p.id,
-                'headline': p.headline,
-                'summary': p.summary,
-                'skills': p.skills  # Add skills for better signal detection
-            })
-        
-        print(f"🤖 Sending batch {i//BATCH_SIZE + 1} ({len(batch)} items) to AI...")
-        
-        # Call AI
+    # 3. Process in Batches (lots envoyés en parallèle par le client LLM partagé, sous son limiteur)
+    batch_data = []
+    for p in prospects:
+        batch_data.append({
+            'id': p.id,
+            'headline': p.headline,
+            'summary': p.summary,
+            'skills': p.skills  # Add skills for better signal detection
+        })
+    known_ids = {p.id for p in prospects}  # Un id renvoyé par l'IA hors du lot est ignoré
+
+    if prefilter:
+        # Mots-clés non ambigus tranchés localement, seuls les profils ambigus partent à l'IA
+        print(f"🔎 Keyword prefilter on {len(batch_data)} prospects, ambiguous ones sent to AI (batches of {BATCH_SIZE}, in parallel)...")
+        batches = iter_signal_tags(ai, batch_data, batch_size=BATCH_SIZE, use_cache=use_cache)
+    else:
+        print(f"🤖 Sending {len(batch_data)} prospects to AI (batches of {BATCH_SIZE}, in parallel)...")
+        batches = ai.iter_batch_signals(batch_data, batch_size=BATCH_SIZE, use_cache=use_cache)
+    for batch_number, (batch, results) in enumerate(batches, 1):
+        # Apply Tags (AI returns "Platform/DevEx initiatives", DB tag is "Signal: Platform/DevEx initiatives")
         try:
-            results = ai.analyze_batch_signals(batch_data)
-            
-            # Apply Tags
-            count_updates = 0
+            pairs = []
             for p_id_str, tags_found in results.items():
-                if not tags_found:
-                    continue
-                
                 p_id = int(p_id_str)
-                prospect = session.query(Prospect).get(p_id)
-                if not prospect:
+                if p_id not in known_ids:
                     continue
-
-                for tag_key in tags_found:
-                    # Match tag key (e.g. "Platform") to DB Tag object
-                    # Note: AI might return "Platform", DB tag is "Signal: Platform"
-                    db_tag = tag_objects.get(tag_key)
-                    if db_tag:
-                        if db_tag not in prospect.tags:
-                            prospect.tags.append(db_tag)
-                            count_updates += 1
-                            print(f"✅ Tagged Prospect {p_id}: {tag_key}")
+                for tag_key in tags_found or []:
+                    if tag_key in tag_ids:
+                        pairs.append((p_id, tag_ids[tag_key]))
+                        print(f"✅ Tagged Prospect {p_id}: {tag_key}")
+            count_updates = add_tags(session, pairs)
             
             session.commit()
-            print(f"💾 Batch saved. {count_updates} tags applied.")
-            
-            # Rate limit safety
-            time.sleep(1)
+            print(f"💾 Batch {batch_number} saved ({len(batch)} items). {count_updates} tags applied.")
             
         except Exception as e:
             print(f"❌ Batch error: {e}")
             session.rollback()
 
     session.close()
+    if ai.cache:
+        stats = ai.cache.stats()
+        print(f"🗃️ LLM cache: {stats['hits']} hit(s), {stats['misses']} miss(es), {stats['entries']} entries")
     print("✨ Signal Enrichment Complete!")
 
+def run_evaluation(sample=200, use_cache=True):
+    """
+    Précision / rappel par signal du préfiltre contre le LLM seul, sur les `sample`
+    derniers prospects enrichis. Aucun tag écrit ; réponses LLM mises en cache.
+    """
+    session = SessionLocal()
+    ai = AIService()
+    prospects = session.query(Prospect).filter(Prospect.is_enriched == True).order_by(Prospect.id.desc()).limit(sample).all()
+    batch_data = [{'id': p.id, 'headline': p.headline, 'summary': p.summary, 'skills': p.skills} for p in prospects]
+    session.close()
+
+    print(f"📏 Evaluating keyword prefilter against AI labels on {len(batch_data)} prospects...")
+    report = evaluate(ai, batch_data, use_cache=use_cache)
+    summary = report.pop('__summary__')
+
+    print(f"\n{'Signal':<32} {'TP':>4} {'FP':>4} {'FN':>4} {'Precision':>10} {'Recall':>8}")
+    for name, counts in report.items():
+        precision = '-' if counts['precision'] is None else f"{counts['precision']:.2f}"
+        recall = '-' if counts['recall'] is None else f"{counts['recall']:.2f}"
+        print(f"{name:<32} {counts['tp']:>4} {counts['fp']:>4} {counts['fn']:>4} {precision:>10} {recall:>8}")
+    print(f"\n⚡ {summary['decided_locally']}/{summary['profiles']} decided locally, "
+          f"{summary['sent_to_llm']} sent to AI ({summary['llm_share']:.0%})")
+    return report
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument('--force-rescan', action='store_true', help='Re-scan all prospects, even those already tagged')
+    parser.add_argument('--no-cache', action='store_true', help='Ignore cached AI answers (unchanged profiles are re-analysed)')
+    parser.add_argument('--no-prefilter', action='store_true', help='Send every prospect to AI (skip the keyword prefilter)')
+    parser.add_argument('--evaluate', action='store_true', help='Report prefilter precision/recall per signal against AI labels, then exit')
+    parser.add_argument('--sample', type=int, default=200, help='Prospects used by --evaluate')
     args = parser.parse_args()
     
-    run_signal_enrichment(force_rescan=args.force_rescan)
+    if args.evaluate:
+        run_evaluation(sample=args.sample, use_cache=not args.no_cache)
+    else:
+        run_signal_enrichment(force_rescan=args.force_rescan, use_cache=not args.no_cache, prefilter=not args.no_prefilter)
@@ -0,0 +1,101 @@
+"""
+Migration 1: index composites + unicité (account_id, linkedin_url) sur prospects.
+
+Conçue pour tourner sur la base de production pendant que l'app tourne :
+- les doublons sont fusionnés groupe par groupe (transactions courtes) ;
+- chaque index est créé dans sa propre transaction, avec busy_timeout,
+  au lieu d'une reconstruction de table (ALTER TABLE / copie) qui verrouillerait tout.
+
+SQLite ne sait pas ajouter une contrainte UNIQUE à une table existante :
+un index UNIQUE est l'équivalent strict et se crée sans copie.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+
+from database.models import Prospect, Action, prospect_tags
+
+BUSY_TIMEOUT_MS = 30000
+
+
+def _merge_duplicates(engine) -> int:
+    """Fusionner les prospects en double (même compte, même URL). Retourne le nombre supprimé."""
+    with engine.connect() as conn:
+        groups = conn.execute(text("""
+            SELECT account_id, linkedin_url
+            FROM prospects
+            WHERE account_id IS NOT NULL
+            GROUP BY account_id, linkedin_url
+            HAVING COUNT(*) > 1
+        """)).fetchall()
+
+    removed = 0
+    for account_id, linkedin_url in groups:
+        with engine.begin() as conn:
+            conn.execute(text(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}"))
+            rows = conn.execute(text("""
+                SELECT id, status, is_enriched FROM prospects
+                WHERE account_id = :account_id AND linkedin_url = :url
+            """), {'account_id': account_id, 'url': linkedin_url}).fetchall()
+
+            # On garde le plus avancé (statut != new, puis enrichi), sinon le plus ancien
+            rows = sorted(rows, key=lambda r: (r.status == 'new', not r.is_enriched, r.id))
+            keep_id = rows[0].id
+            drop_ids = [r.id for r in rows[1:]]
+
+            for drop_id in drop_ids:
+                params = {'keep': keep_id, 'drop': drop_id}
+                conn.execute(text("UPDATE actions SET prospect_id = :keep WHERE prospect_id = :drop"), params)
+                conn.execute(text("""
+                    INSERT OR IGNORE INTO prospect_tags (prospect_id, tag_id)
+                    SELECT :keep, tag_id FROM prospect_tags WHERE prospect_id = :drop
+                """), params)
+                conn.execute(text("DELETE FROM prospect_tags WHERE prospect_id = :drop"), params)
+                conn.execute(text("DELETE FROM prospects WHERE id = :drop"), params)
+
+            removed += len(drop_ids)
+            print(f"   🔀 {linkedin_url} (compte {account_id}): gardé #{keep_id}, fusionné {drop_ids}")
+
+    return removed
+
+
+def _create_indexes(engine):
+    for table in (Prospect.__table__, Action.__table__, prospect_tags):
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            with engine.begin() as conn:
+                conn.execute(text(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}"))
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"),
+                    {'name': index.name}
+                ).first()
+                if exists:
+                    print(f"   . {index.name} existe déjà")
+                    continue
+                # Index sur une colonne ajoutée par une migration ultérieure : créé par celle-ci
+                columns = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table.name})")).fetchall()}
+                if any(column.name not in columns for column in index.columns):
+                    continue
+                index.create(bind=conn)
+                print(f"   + {index.name}")
+
+
+def upgrade(engine):
+    print("🔍 Recherche des doublons (account_id, linkedin_url)...")
+    removed = _merge_duplicates(engine)
+    print(f"   {removed} doublon(s) fusionné(s)")
+
+    print("📇 Création des index...")
+    _create_indexes(engine)
+
+    # Statistiques pour le planificateur (échantillonnées pour rester rapide sur une grosse base)
+    with engine.begin() as conn:
+        conn.execute(text("PRAGMA analysis_limit = 1000"))
+        conn.execute(text("ANALYZE"))
+
+
+if __name__ == '__main__':
+    from database.db import engine
+    upgrade(engine)
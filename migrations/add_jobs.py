@@ -0,0 +1,22 @@
+"""
+Migration 3: table jobs (file de tâches persistante consommée par worker.py).
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.models import Job
+
+
+def upgrade(engine):
+    with engine.begin() as conn:
+        Job.__table__.create(bind=conn, checkfirst=True)
+        for index in Job.__table__.indexes:
+            index.create(bind=conn, checkfirst=True)
+    print("   + jobs")
+
+
+if __name__ == '__main__':
+    from database.db import engine
+    upgrade(engine)
@@ -0,0 +1,22 @@
+"""
+Migration 6: table message_drafts (messages IA pré-générés avant l'envoi).
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.models import MessageDraft
+
+
+def upgrade(engine):
+    with engine.begin() as conn:
+        MessageDraft.__table__.create(bind=conn, checkfirst=True)
+        for index in MessageDraft.__table__.indexes:
+            index.create(bind=conn, checkfirst=True)
+    print("   + message_drafts")
+
+
+if __name__ == '__main__':
+    from database.db import engine
+    upgrade(engine)
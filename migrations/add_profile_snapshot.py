@@ -0,0 +1,20 @@
+"""
+Migration 5: colonnes du relevé de profil par le bot (degré de relation, fraîcheur).
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from migrations.add_prospect_urn import add_column
+
+
+def upgrade(engine):
+    with engine.begin() as conn:
+        add_column(conn, 'prospects', 'connection_degree', 'VARCHAR')
+        add_column(conn, 'prospects', 'profile_scraped_at', 'DATETIME')
+
+
+if __name__ == '__main__':
+    from database.db import engine
+    upgrade(engine)
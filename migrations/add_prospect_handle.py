@@ -0,0 +1,52 @@
+"""
+Migration 7: colonne prospects.linkedin_handle (identifiant canonique de l'URL) + index.
+
+Remplie pour les lignes existantes avec le même canonicaliseur que l'ORM
+(database/handles.py), une transaction par lot : le verrou d'écriture est rendu
+entre les lots, et une migration interrompue reprend aux handles encore vides.
+Les nouvelles lignes la reçoivent à l'insertion.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+
+from database.handles import canonical_handle
+from migrations.add_prospect_urn import add_column
+
+BATCH_SIZE = 1000
+
+
+def upgrade(engine):
+    with engine.begin() as conn:
+        add_column(conn, 'prospects', 'linkedin_handle', 'VARCHAR')
+
+    filled = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                "SELECT id, linkedin_url FROM prospects "
+                "WHERE id > :last_id AND linkedin_handle IS NULL ORDER BY id LIMIT :limit"
+            ), {'last_id': last_id, 'limit': BATCH_SIZE}).fetchall()
+            if not rows:
+                break
+            conn.execute(
+                text("UPDATE prospects SET linkedin_handle = :handle WHERE id = :id"),
+                [{'id': row[0], 'handle': canonical_handle(row[1]) or None} for row in rows]
+            )
+        filled += len(rows)
+        last_id = rows[-1][0]
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_prospects_handle ON prospects (linkedin_handle, account_id)"
+        ))
+    print(f"   + ix_prospects_handle ({filled} handle(s) calculé(s))")
+
+
+if __name__ == '__main__':
+    from database.db import engine
+    upgrade(engine)
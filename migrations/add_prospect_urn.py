@@ -0,0 +1,32 @@
+"""
+Migration 4: colonne prospects.linkedin_urn (identifiant membre LinkedIn).
+
+Renseignée par les bots au premier passage sur le profil (capture réseau ou
+code source) ; les actions suivantes la réutilisent sans extraction.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+
+
+def add_column(conn, table: str, column: str, ddl: str) -> bool:
+    """ALTER TABLE ADD COLUMN si la colonne manque (ajout sans copie de table sous SQLite)"""
+    columns = [row[1] for row in conn.execute(text(f"PRAGMA table_info({table})")).fetchall()]
+    if column in columns:
+        return False
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    print(f"   + {table}.{column}")
+    return True
+
+
+def upgrade(engine):
+    with engine.begin() as conn:
+        add_column(conn, 'prospects', 'linkedin_urn', 'VARCHAR')
+
+
+if __name__ == '__main__':
+    from database.db import engine
+    upgrade(engine)
@@ -0,0 +1,25 @@
+"""
+Migration 8: colonnes prospects.raw_parser_version / raw_data_hash / raw_data_at (retraitement du raw_data).
+
+Laissées à NULL pour les lignes existantes : reprocess_raw_data.py les traite
+toutes au premier passage, puis seulement celles dont le parseur ou le dump a changé.
+Date du dump inconnue (NULL) : un relevé du bot existant est considéré plus récent.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from migrations.add_prospect_urn import add_column
+
+
+def upgrade(engine):
+    with engine.begin() as conn:
+        add_column(conn, 'prospects', 'raw_parser_version', 'INTEGER')
+        add_column(conn, 'prospects', 'raw_data_hash', 'VARCHAR')
+        add_column(conn, 'prospects', 'raw_data_at', 'DATETIME')
+
+
+if __name__ == '__main__':
+    from database.db import engine
+    upgrade(engine)
@@ -0,0 +1,27 @@
+"""
+Migration 2: table de compteurs prospect_status_counts (compte, statut) -> nombre.
+
+La table est ensuite maintenue à chaque flush (cf. database/counters.py) ;
+on la remplit ici une première fois à partir des données existantes.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database.models import ProspectStatusCount
+from database.counters import rebuild_status_counts
+
+
+def upgrade(engine):
+    with engine.begin() as conn:
+        ProspectStatusCount.__table__.create(bind=conn, checkfirst=True)
+        print("   + prospect_status_counts")
+        rebuild_status_counts(conn)
+        total = conn.execute(ProspectStatusCount.__table__.select()).fetchall()
+        print(f"   {len(total)} compteur(s) initialisé(s)")
+
+
+if __name__ == '__main__':
+    from database.db import engine
+    upgrade(engine)
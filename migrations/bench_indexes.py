@@ -0,0 +1,169 @@
+"""
+Banc d'essai de la migration 1 (index) sur une base synthétique.
+
+Construit une base temporaire au schéma d'avant migration (sans index),
+la remplit, chronomètre les requêtes chaudes, applique la migration
+puis rechronomètre.
+
+Usage:
+    python migrations/bench_indexes.py --prospects 100000 --actions 300000
+"""
+
+import sys
+import os
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, text
+
+from database.db import Base
+from database import models  # noqa: enregistre les tables dans Base.metadata
+from migrations import add_indexes
+
+STATUSES = ['new'] * 6 + ['connected', 'followed', 'messaged', 'failed']
+
+# (nom, SQL, générateur de paramètres) — mêmes formes que les requêtes de web/app.py et run_campaigns.py
+QUERIES = [
+    ("dashboard: count par statut",
+     "SELECT COUNT(*) FROM prospects WHERE account_id = :a AND status = :s",
+     lambda ctx: {'a': random.randint(1, ctx['accounts']), 's': random.choice(['new', 'connected', 'followed'])}),
+    ("dashboard: prospects messagés (distinct)",
+     """SELECT COUNT(DISTINCT actions.prospect_id) FROM actions JOIN prospects ON prospects.id = actions.prospect_id
+        WHERE prospects.account_id = :a AND actions.action_type = 'message' AND actions.status = 'success'""",
+     lambda ctx: {'a': random.randint(1, ctx['accounts'])}),
+    ("liste prospects: 50 plus récents",
+     "SELECT id FROM prospects WHERE account_id = :a ORDER BY added_at DESC LIMIT 50",
+     lambda ctx: {'a': random.randint(1, ctx['accounts'])}),
+    ("liste prospects: nb messages d'un prospect",
+     "SELECT COUNT(*) FROM actions WHERE prospect_id = :p AND action_type = 'message' AND status = 'success'",
+     lambda ctx: {'p': random.randint(1, ctx['prospects'])}),
+    ("quota: actions du jour d'une campagne",
+     "SELECT COUNT(*) FROM actions WHERE campaign_id = :c AND action_type = 'connect' AND executed_at >= :d",
+     lambda ctx: {'c': random.randint(1, ctx['campaigns']), 'd': ctx['today']}),
+    ("doublon: URL dans un compte",
+     "SELECT id FROM prospects WHERE linkedin_url = :u AND account_id = :a LIMIT 1",
+     lambda ctx: {'u': f"https://www.linkedin.com/in/user-{random.randint(1, ctx['prospects'])}", 'a': random.randint(1, ctx['accounts'])}),
+    ("étape messages: candidats d'une campagne",
+     """SELECT id FROM prospects WHERE campaign_id = :c AND status IN ('connected', 'followed')
+        AND last_action_at <= :d""",
+     lambda ctx: {'c': random.randint(1, ctx['campaigns']), 'd': ctx['today'] - timedelta(days=3)}),
+    ("filtre tag",
+     "SELECT prospect_id FROM prospect_tags WHERE tag_id = :t LIMIT 50",
+     lambda ctx: {'t': random.randint(1, 8)}),
+]
+
+
+def build_legacy_db(path, n_accounts, n_campaigns, n_prospects, n_actions):
+    engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+
+    with engine.begin() as conn:
+        # Schéma d'avant migration : aucun index secondaire
+        for table in (models.Prospect.__table__, models.Action.__table__, models.prospect_tags):
+            for index in table.indexes:
+                conn.execute(text(f"DROP INDEX {index.name}"))
+
+        now = datetime.utcnow()
+        conn.execute(text("INSERT INTO accounts (id, name, email) VALUES (:id, :n, :e)"),
+                     [{'id': i, 'n': f'Compte {i}', 'e': f'c{i}@example.com'} for i in range(1, n_accounts + 1)])
+        conn.execute(text("INSERT INTO campaigns (id, account_id, name) VALUES (:id, :a, :n)"),
+                     [{'id': i, 'a': random.randint(1, n_accounts), 'n': f'Campagne {i}'} for i in range(1, n_campaigns + 1)])
+        conn.execute(text("INSERT INTO tags (id, name) VALUES (:id, :n)"),
+                     [{'id': i, 'n': f'Tag {i}'} for i in range(1, 9)])
+
+        prospects = []
+        for i in range(1, n_prospects + 1):
+            prospects.append({
+                'id': i,
+                'a': random.randint(1, n_accounts),
+                'u': f"https://www.linkedin.com/in/user-{i}",
+                's': random.choice(STATUSES),
+                'c': random.randint(1, n_campaigns) if random.random() < 0.5 else None,
+                'd': now - timedelta(minutes=random.randint(0, 60 * 24 * 180)),
+                'l': now - timedelta(days=random.randint(0, 30)),
+            })
+        # Quelques doublons (même compte, même URL) pour exercer la fusion
+        for j in range(1, max(2, n_prospects // 1000)):
+            src = prospects[random.randint(0, n_prospects - 1)]
+            prospects.append(dict(src, id=n_prospects + j))
+
+        conn.execute(text("""
+            INSERT INTO prospects (id, account_id, linkedin_url, status, campaign_id, added_at, last_action_at, is_enriched)
+            VALUES (:id, :a, :u, :s, :c, :d, :l, 0)
+        """), prospects)
+
+        conn.execute(text("""
+            INSERT INTO actions (prospect_id, campaign_id, action_type, status, executed_at)
+            VALUES (:p, :c, :t, :s, :d)
+        """), [{
+            'p': random.randint(1, n_prospects),
+            'c': random.randint(1, n_campaigns),
+            't': random.choice(['connect', 'connect', 'message', 'visit']),
+            's': random.choice(['success', 'success', 'failed']),
+            'd': now - timedelta(minutes=random.randint(0, 60 * 24 * 60)),
+        } for _ in range(n_actions)])
+
+        conn.execute(text("INSERT OR IGNORE INTO prospect_tags (prospect_id, tag_id) VALUES (:p, :t)"),
+                     [{'p': random.randint(1, n_prospects), 't': random.randint(1, 8)} for _ in range(n_prospects // 2)])
+
+    return engine
+
+
+def time_queries(engine, ctx, repeat):
+    timings = {}
+    with engine.connect() as conn:
+        for name, sql, params in QUERIES:
+            samples = []
+            for _ in range(repeat):
+                p = params(ctx)
+                t0 = time.perf_counter()
+                conn.execute(text(sql), p).fetchall()
+                samples.append((time.perf_counter() - t0) * 1000)
+            timings[name] = statistics.median(samples)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--accounts', type=int, default=5)
+    parser.add_argument('--campaigns', type=int, default=20)
+    parser.add_argument('--prospects', type=int, default=100000)
+    parser.add_argument('--actions', type=int, default=300000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(42)
+    ctx = {
+        'accounts': args.accounts,
+        'campaigns': args.campaigns,
+        'prospects': args.prospects,
+        'today': datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        print(f"🧪 Base synthétique: {args.prospects} prospects, {args.actions} actions...")
+        engine = build_legacy_db(path, args.accounts, args.campaigns, args.prospects, args.actions)
+
+        before = time_queries(engine, ctx, args.repeat)
+
+        t0 = time.perf_counter()
+        add_indexes.upgrade(engine)
+        print(f"⏱️ Migration: {time.perf_counter() - t0:.2f}s")
+
+        after = time_queries(engine, ctx, args.repeat)
+        engine.dispose()
+
+    print(f"\n{'Requête':<45} {'avant (ms)':>11} {'après (ms)':>11} {'gain':>8}")
+    for name, _, _ in QUERIES:
+        gain = before[name] / after[name] if after[name] else float('inf')
+        print(f"{name:<45} {before[name]:>11.2f} {after[name]:>11.2f} {gain:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Migrations de schéma versionnées.
+
+La version du schéma est stockée dans `PRAGMA user_version` de la base SQLite.
+Chaque migration est une fonction `upgrade(engine)` idempotente, appliquée une
+seule fois dans l'ordre des versions.
+
+Usage:
+    python migrations/migrate.py             # applique les migrations en attente
+    python migrations/migrate.py --status    # affiche la version courante
+    python migrations/migrate.py --db /chemin/vers/prospects.db
+"""
+
+import sys
+import os
+import argparse
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+
+from migrations import (
+    add_indexes, add_status_counts, add_jobs, add_prospect_urn, add_profile_snapshot, add_message_drafts,
+    add_prospect_handle, add_raw_data_version,
+)
+
+# (version, nom, fonction upgrade) — ne jamais renuméroter une migration publiée
+MIGRATIONS = [
+    (1, 'add_indexes', add_indexes.upgrade),
+    (2, 'add_status_counts', add_status_counts.upgrade),
+    (3, 'add_jobs', add_jobs.upgrade),
+    (4, 'add_prospect_urn', add_prospect_urn.upgrade),
+    (5, 'add_profile_snapshot', add_profile_snapshot.upgrade),
+    (6, 'add_message_drafts', add_message_drafts.upgrade),
+    (7, 'add_prospect_handle', add_prospect_handle.upgrade),
+    (8, 'add_raw_data_version', add_raw_data_version.upgrade),
+]
+
+
+def current_version(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("PRAGMA user_version")).scalar() or 0
+
+
+def set_version(engine, version: int):
+    with engine.begin() as conn:
+        # PRAGMA n'accepte pas de paramètre lié
+        conn.execute(text(f"PRAGMA user_version = {int(version)}"))
+
+
+def migrate(engine=None, target: int = None):
+    """Appliquer les migrations en attente jusqu'à `target` (toutes par défaut)"""
+    if engine is None:
+        from database.db import engine
+
+    version = current_version(engine)
+    pending = [m for m in MIGRATIONS if m[0] > version and (target is None or m[0] <= target)]
+
+    if not pending:
+        print(f"✅ Schéma à jour (version {version})")
+        return version
+
+    for number, name, upgrade in pending:
+        print(f"🔧 Migration {number}: {name}...")
+        upgrade(engine)
+        set_version(engine, number)
+        print(f"✅ Migration {number} appliquée")
+
+    return pending[-1][0]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Migrations de schéma versionnées')
+    parser.add_argument('--db', help='Chemin de la base SQLite (défaut: data/prospects.db)')
+    parser.add_argument('--status', action='store_true', help='Afficher la version courante')
+    args = parser.parse_args()
+
+    db_engine = None
+    if args.db:
+        from database.db import create_sqlite_engine
+        db_engine = create_sqlite_engine(args.db)
+
+    if args.status:
+        if db_engine is None:
+            from database.db import engine as db_engine
+        print(f"📦 Version du schéma: {current_version(db_engine)} (dernière: {MIGRATIONS[-1][0]})")
+    else:
+        migrate(db_engine)
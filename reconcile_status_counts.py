@@ -0,0 +1,43 @@
+"""
+Reconstruire la table de compteurs prospect_status_counts depuis prospects/actions.
+
+À lancer après des modifications faites hors ORM (SQL brut, suppressions en
+masse, scripts de correction) ou pour vérifier la dérive des compteurs.
+
+Usage:
+    python reconcile_status_counts.py              # tous les comptes
+    python reconcile_status_counts.py --account 2  # un seul compte
+"""
+
+import argparse
+
+from database.db import engine, SessionLocal
+from database.models import Account
+from database.counters import rebuild_status_counts, read_status_counts
+
+
+def reconcile(account_id=None):
+    db = SessionLocal()
+    account_ids = [account_id] if account_id else [a.id for a in db.query(Account).all()]
+    before = {a: read_status_counts(db, a) for a in account_ids}
+    db.close()
+
+    with engine.begin() as conn:
+        rebuild_status_counts(conn, account_id)
+
+    db = SessionLocal()
+    for a in account_ids:
+        after = read_status_counts(db, a)
+        drift = {k: after[k] - before[a][k] for k in after if after[k] != before[a][k]}
+        if drift:
+            print(f"🔧 Compte {a}: corrigé {drift}")
+        else:
+            print(f"✅ Compte {a}: compteurs à jour {after}")
+    db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Reconstruire les compteurs de statuts')
+    parser.add_argument('--account', type=int, help='ID du compte (défaut: tous)')
+    args = parser.parse_args()
+    reconcile(args.account)
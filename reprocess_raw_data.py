@@ -0,0 +1,167 @@
+"""
+Retraitement du raw_data Apify stocké, sans nouvel appel Apify.
+
+Réapplique le parseur actuel (services/apify_enrichment.py : prospect_fields)
+aux dumps déjà en base, après un changement de l'extraction :
+
+- lecture en flux (`yield_per`) dans une session dédiée, par lots de --batch-size ;
+- seules les lignes dont la version du parseur (PARSER_VERSION) ou l'empreinte
+  du raw_data diffère de celle du dernier parsing sont reparsées ;
+- parsing JSON réparti sur un pool de processus (--workers) ;
+- seules les colonnes modifiées sont écrites, en UPDATE groupés par lot ;
+  re-segmentation des prospects dont company_size a changé ;
+- colonnes écrites : PROSPECT_FIELDS (services/apify_enrichment.py). Celles que
+  le bot relève aussi (BOT_FIELDS : nom, titre, localisation, entreprise) ne sont
+  pas touchées si le relevé (`profile_scraped_at`) est plus récent que le dump
+  (`raw_data_at`, ou date du dump inconnue) ;
+- point de reprise (table settings) commité avec chaque lot : relancé après une
+  interruption, le script repart du dernier lot écrit (--restart pour repartir de zéro).
+
+Usage:
+    python reprocess_raw_data.py
+    python reprocess_raw_data.py --workers 4 --batch-size 2000
+    python reprocess_raw_data.py --restart
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import select, update
+
+from database import SessionLocal, Prospect
+from database.models import Settings
+from services.apify_enrichment import PARSER_VERSION, PROSPECT_FIELDS, prospect_fields, raw_data_hash
+from services.profile_snapshot import BOT_FIELDS
+from services.tagging import TagCatalogue, resegment
+
+STREAM_BATCH = 1000  # Lignes lues, reparsées et commitées par lot
+CHECKPOINT_KEY = 'reprocess_raw_data_checkpoint'
+
+
+def reparse(row):
+    """(id, champs, erreur) d'un raw_data ; exécuté dans un process du pool"""
+    p_id, raw_data = row
+    try:
+        return p_id, prospect_fields(json.loads(raw_data)), None
+    except Exception as e:
+        return p_id, None, f"{type(e).__name__}: {e}"
+
+
+def bot_is_fresher(row) -> bool:
+    """Relevé du bot plus récent que le dump (date du dump inconnue : le relevé l'emporte)"""
+    if row.profile_scraped_at is None:
+        return False
+    return row.raw_data_at is None or row.profile_scraped_at > row.raw_data_at
+
+
+def load_checkpoint(db):
+    setting = db.query(Settings).filter(Settings.key == CHECKPOINT_KEY).first()
+    return json.loads(setting.value) if setting and setting.value else None
+
+
+def save_checkpoint(db, last_id: int):
+    """Point de reprise (commit laissé à l'appelant, avec le lot qu'il couvre)"""
+    value = json.dumps({'parser_version': PARSER_VERSION, 'last_id': last_id})
+    setting = db.query(Settings).filter(Settings.key == CHECKPOINT_KEY).first()
+    if setting:
+        setting.value = value
+    else:
+        db.add(Settings(key=CHECKPOINT_KEY, value=value))
+
+
+def clear_checkpoint(db):
+    db.query(Settings).filter(Settings.key == CHECKPOINT_KEY).delete(synchronize_session=False)
+
+
+def reprocess(workers=None, batch_size=STREAM_BATCH, restart=False) -> dict:
+    db = SessionLocal()
+    # Session de lecture séparée : le flux reste ouvert pendant les commits des lots (WAL)
+    reader = SessionLocal.session_factory()
+    workers = max(1, workers or os.cpu_count() or 1)
+    stats = {'scanned': 0, 'unchanged': 0, 'reparsed': 0, 'updated': 0, 'errors': 0, 'resegmented': 0}
+
+    last_id = 0
+    checkpoint = None if restart else load_checkpoint(db)
+    if checkpoint and checkpoint.get('parser_version') == PARSER_VERSION:
+        last_id = checkpoint['last_id']
+        print(f"⏩ Reprise après le prospect {last_id}")
+
+    print(f"🔄 Retraitement du raw_data (parseur v{PARSER_VERSION}, {workers} process, lots de {batch_size})...")
+    stream = reader.execute(
+        select(Prospect.id, Prospect.raw_data, Prospect.raw_parser_version, Prospect.raw_data_hash,
+               Prospect.raw_data_at, Prospect.profile_scraped_at,
+               *(getattr(Prospect, field) for field in PROSPECT_FIELDS))
+        .where(Prospect.raw_data.isnot(None), Prospect.id > last_id)
+        .order_by(Prospect.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+    catalogue = TagCatalogue(db)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for rows in stream.partitions():
+            stats['scanned'] += len(rows)
+            todo = {}  # id -> (empreinte, ligne) à reparser
+            for row in rows:
+                digest = raw_data_hash(row.raw_data)
+                if row.raw_parser_version == PARSER_VERSION and row.raw_data_hash == digest:
+                    stats['unchanged'] += 1
+                    continue
+                todo[row.id] = (digest, row)
+
+            inputs = [(p_id, row.raw_data) for p_id, (_, row) in todo.items()]
+            if pool:
+                results = pool.map(reparse, inputs, chunksize=max(1, len(inputs) // (workers * 4)))
+            else:
+                results = map(reparse, inputs)
+
+            updates, sizes = [], []
+            for p_id, fields, error in results:
+                digest, row = todo[p_id]
+                values = {'id': p_id, 'raw_parser_version': PARSER_VERSION, 'raw_data_hash': digest}
+                stats['reparsed'] += 1
+                if error:
+                    # Version et empreinte posées quand même : pas de nouvel essai avant un changement du parseur ou du dump
+                    stats['errors'] += 1
+                    print(f"   ⚠️ Prospect {p_id}: raw_data illisible ({error})")
+                else:
+                    if bot_is_fresher(row):
+                        fields = {key: value for key, value in fields.items() if key not in BOT_FIELDS}
+                    changed = {key: value for key, value in fields.items() if getattr(row, key) != value}
+                    if changed:
+                        stats['updated'] += 1
+                        values.update(changed)
+                    if 'company_size' in changed:
+                        sizes.append((p_id, changed['company_size']))
+                updates.append(values)
+
+            if updates:
+                db.execute(update(Prospect), updates)  # UPDATE groupé par clé primaire
+            if sizes:
+                stats['resegmented'] += resegment(db, sizes, catalogue)['segmented']
+            save_checkpoint(db, rows[-1].id)
+            db.commit()
+            print(f"   💾 {stats['scanned']} lus, {stats['reparsed']} reparsés, {stats['updated']} modifiés (jusqu'au prospect {rows[-1].id})")
+
+        clear_checkpoint(db)
+        db.commit()
+    finally:
+        if pool:
+            pool.shutdown()
+        reader.close()
+        db.close()
+
+    print(f"✅ Terminé: {stats['scanned']} lus, {stats['unchanged']} inchangés, {stats['reparsed']} reparsés, "
+          f"{stats['updated']} modifiés, {stats['errors']} illisibles, {stats['resegmented']} re-segmentés.")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Réappliquer le parseur Apify au raw_data stocké")
+    parser.add_argument('--workers', type=int, default=None, help='Process de parsing (défaut: nombre de CPU)')
+    parser.add_argument('--batch-size', type=int, default=STREAM_BATCH, help='Lignes par lot lu et commité')
+    parser.add_argument('--restart', action='store_true', help='Ignorer le point de reprise')
+    args = parser.parse_args()
+
+    reprocess(workers=args.workers, batch_size=args.batch_size, restart=args.restart)
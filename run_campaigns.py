@@ -1,6 +1,10 @@
 """
 Script d'automatisation des campagnes LinkedIn
-Lance ce script via cron job pour automatiser les campagnes
+Exécution manuelle / ponctuelle uniquement : l'automatisation passe par
+scheduler.py (plus de cron). Le script s'arrête aussitôt si le planificateur
+(ou un autre runner) détient le verrou de campagne (services/run_lock.py).
+Une seule session navigateur est ouverte par compte et partagée
+entre toutes ses campagnes (connexions + messages).
 
 Usage:
     python run_campaigns.py
@@ -8,10 +12,14 @@ Usage:
 from dotenv import load_dotenv
 load_dotenv()
 
-from database import SessionLocal, Prospect, Campaign, Action, Settings
-from services.linkedin_bot import LinkedInBot
-from services.ai_service import AIService
+from database import SessionLocal, Prospect, Campaign, Action
+from services.bot_pool import BotPool, AUTH_FAILED
+from services.message_drafts import prepare_drafts, draft_state, mark_draft_used
+from services.profile_snapshot import apply_profile_snapshot
+from services.run_lock import acquire_run_lock
 from datetime import datetime, timedelta
+from itertools import groupby
+import random
 import time
 import argparse
 import sys
@@ -90,52 +98,85 @@ def run_campaigns(campaign_id=None):
     
     print(f"🎯 {len(campaigns)} campagne(s) à traiter\n")
     
-    for campaign in campaigns:
-        print("=" * 70)
-        print(f"📊 Campagne: {campaign.name}")
-        print(f"   Requête: {campaign.search_query}")
-        print(f"   Limite: {campaign.daily_limit}/jour")
-        print(f"   Délai message: {campaign.message_delay_days} jours")
-        print("=" * 70)
-        
-        # Étape 1: Envoyer des connexions aux prospects "new"
-        send_connections(db, campaign)
-        
-        # Étape 2: Envoyer des messages aux prospects connectés depuis X jours
-        send_messages(db, campaign)
-        
-        print()
+    # Une seule session navigateur par compte pour tout le run (toutes campagnes, deux étapes)
+    pool = BotPool(headless=True, max_contexts=1)
+    
+    try:
+        campaigns = sorted(campaigns, key=lambda c: c.account_id or 0)
+        for account_id, account_campaigns in groupby(campaigns, key=lambda c: c.account_id or 0):
+            for campaign in account_campaigns:
+                print("=" * 70)
+                print(f"📊 Campagne: {campaign.name}")
+                print(f"   Requête: {campaign.search_query}")
+                print(f"   Limite: {campaign.daily_limit}/jour")
+                print(f"   Délai message: {campaign.message_delay_days} jours")
+                print("=" * 70)
+                
+                # Étape 1: Envoyer des connexions aux prospects "new"
+                send_connections(db, campaign, pool)
+                
+                # Étape 2: Envoyer des messages aux prospects connectés depuis X jours
+                send_messages(db, campaign, pool)
+                
+                print()
+            
+            # Campagnes du compte terminées : on libère son navigateur avant le compte suivant
+            pool.discard(account_id)
+    finally:
+        pool.close_all()
+        db.close()
     
-    db.close()
     print("\n✅ Toutes les campagnes ont été traitées")
 
-def send_connections(db, campaign):
-    """Envoie des demandes de connexion/follow aux prospects new"""
-    print("\n🤝 ÉTAPE 1: Connexions/Follow")
-    
-    # Récupérer TOUS les prospects "new" (pas juste ceux de la campagne)
-    # --- LOGIQUE DAILY LIMIT ---
-    today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    
-    # Compter combien d'actions de ce type ont déjà été faites aujourd'hui pour cette campagne
-    actions_today = db.query(Action).filter(
+def acquire_bot(db, pool, account):
+    """Louer la session du compte (démarrée au premier besoin, partagée ensuite)"""
+    bot = pool.acquire(account)
+    if bot:
+        print("   ✅ Session bot prête\n")
+        account.cookie_status = 'valid'
+    elif pool.last_error == AUTH_FAILED:
+        print("   ❌ Échec démarrage bot (Cookie invalide)")
+        account.cookie_status = 'expired'
+    else:
+        # Pool plein, session déjà louée, erreur réseau... : le cookie n'est pas en cause
+        print(f"   ⚠️ Session bot indisponible ({pool.last_error}), cookie non remis en cause")
+    db.commit()
+    return bot
+
+def count_actions_today(db, campaign, action_type, today_start=None) -> int:
+    """
+    Actions `action_type` déjà faites aujourd'hui pour cette campagne.
+    `today_start` : début du jour, naïf en UTC comme executed_at (défaut : minuit local du serveur).
+    """
+    if today_start is None:
+        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return db.query(Action).filter(
         Action.campaign_id == campaign.id,
-        Action.action_type == 'connect',
+        Action.action_type == action_type,
         Action.executed_at >= today_start
     ).count()
+
+def pacing_limit(db, campaign, action_type):
+    """
+    Nombre d'actions `action_type` autorisées pour cette exécution :
+    min(quota journalier restant, rythme horaire cible). 0 si le quota est atteint.
+    """
+    label = 'connexions' if action_type == 'connect' else 'messages'
+    
+    # --- LOGIQUE DAILY LIMIT ---
+    actions_today = count_actions_today(db, campaign, action_type)
     
     remaining_quota = campaign.daily_limit - actions_today
     
     if remaining_quota <= 0:
-        print(f"   🛑 Quota journalier atteint ({actions_today}/{campaign.daily_limit}). Pas de nouvelles connexions.")
-        return
+        print(f"   🛑 Quota journalier de {label} atteint ({actions_today}/{campaign.daily_limit}).")
+        return 0
 
-    print(f"   Quota restant aujourd'hui : {remaining_quota} (Déjà fait: {actions_today})")
+    print(f"   Quota {label} restant aujourd'hui : {remaining_quota} (Déjà fait: {actions_today})")
 
     # --- LOGIQUE DE LISSAGE (PACING) ---
     # Pour éviter de tout faire à 8h du matin, on calcule un rythme horaire
     # Ex: 10 actions sur 10 heures (9h-19h) = 1 action/heure
-    
     settings = json.loads(campaign.account.security_settings) if campaign.account.security_settings else {}
     working_hours = settings.get('working_hours', {})
     start_str = working_hours.get('start', '09:00')
@@ -156,7 +197,6 @@ def send_connections(db, campaign):
         # On ne veut pas dépasser :
         # 1. Le quota global restant
         # 2. Le rythme horaire cible (pour laisser du travail aux prochaines heures)
-        
         limit_now = min(remaining_quota, target_per_hour)
         print(f"   ⏱️ Rythme calculé : {target_per_hour}/heure (sur {total_hours:.1f}h).")
         print(f"   ➡️ Actions pour cette exécution : {limit_now}")
@@ -165,17 +205,221 @@ def send_connections(db, campaign):
         print(f"   ⚠️ Erreur calcul pacing ({e}), fallback sur tout le quota.")
         limit_now = remaining_quota
 
-    prospects = db.query(Prospect).filter(
-        Prospect.status == 'new'
-    ).limit(limit_now).all()
+    return limit_now
+
+def plan_connections(db, campaign, exclude_ids=None, limit=None):
+    """
+    Prospects 'new' à contacter maintenant (quota + pacing appliqués).
+    `exclude_ids` : prospects déjà réservés par un autre compte du même run (cf. run_campaigns_async.py).
+    `limit` : nombre imposé par l'appelant, qui gère lui-même le quota (cf. scheduler.py).
+    """
+    limit_now = pacing_limit(db, campaign, 'connect') if limit is None else limit
+    if limit_now <= 0:
+        return []
+
+    # Récupérer TOUS les prospects "new" (pas juste ceux de la campagne)
+    query = db.query(Prospect).filter(Prospect.status == 'new')
+    if exclude_ids:
+        query = query.filter(~Prospect.id.in_(exclude_ids))
+    prospects = query.limit(limit_now).all()
     
     if not prospects:
         print("   ℹ️ Aucun prospect 'new' disponible")
-        return
+        return []
     
     print(f"   📋 {len(prospects)} prospect(s) à contacter maintenant")
+    return prospects
+
+def plan_messages(db, campaign, limit=None, exclude_ids=None):
+    """
+    Prospects connectés depuis X jours, sans message, à messager maintenant (quota + pacing appliqués).
+    `limit` : nombre imposé par l'appelant, qui gère lui-même le quota (cf. scheduler.py).
+    `exclude_ids` : prospects déjà réservés par un autre compte du même run (cf. run_campaigns_async.py).
+    """
+    limit_now = pacing_limit(db, campaign, 'message') if limit is None else limit
+    if limit_now <= 0:
+        return []
+
+    # Date limite: il y a X jours
+    cutoff_date = datetime.now() - timedelta(days=campaign.message_delay_days)
+
+    # Une seule requête : anti-jointure sur les messages réussis, LIMIT poussé en SQL.
+    # Index : ix_prospects_campaign_status (sélection) + ix_actions_prospect_type_status (NOT EXISTS)
+    already_messaged = db.query(Action.id).filter(
+        Action.prospect_id == Prospect.id,
+        Action.action_type == 'message',
+        Action.status == 'success'
+    ).exists()
+
+    query = db.query(Prospect).filter(
+        Prospect.campaign_id == campaign.id,
+        Prospect.status.in_(['connected', 'followed']),
+        Prospect.last_action_at <= cutoff_date,
+        ~already_messaged
+    )
+    if exclude_ids:
+        query = query.filter(~Prospect.id.in_(exclude_ids))
+    # Même ordre que draft_candidates (services/message_drafts.py) : les brouillons préparés sont ceux envoyés
+    prospects_to_message = query.order_by(Prospect.last_action_at, Prospect.id).limit(limit_now).all()
+
+    if not prospects_to_message:
+        print("   ℹ️ Aucun prospect prêt pour un message")
+        return []
+
+    print(f"   📋 {len(prospects_to_message)} prospect(s) à messager maintenant")
+    return prospects_to_message
+
+def render_template_message(campaign, prospect):
+    """Template classique de la campagne ({name}, {full_name}, {company}, {title})"""
+    message = campaign.first_message
+    message = message.replace('{name}', prospect.full_name.split()[0] if prospect.full_name else 'there')
+    message = message.replace('{full_name}', prospect.full_name or '')
+    message = message.replace('{company}', prospect.company or '')
+    message = message.replace('{title}', prospect.headline or '')
+    return message
+
+def build_message(db, campaign, prospect):
+    """
+    Message à envoyer : brouillon IA pré-généré si activé (fallback template), sinon template.
+    Les brouillons sont préparés en amont (services/message_drafts.py) : pas d'appel IA
+    pendant que la session navigateur attend, sauf brouillon absent (dernier recours).
+    """
+    if not campaign.use_ai_customization:
+        return render_template_message(campaign, prospect)
+
+    state, draft = draft_state(db, campaign, prospect)
+    if state in ('missing', 'stale'):
+        print("      ✨ Pas de brouillon IA à jour, génération immédiate...")
+        prepare_drafts(db, campaign, [prospect])
+        state, draft = draft_state(db, campaign, prospect)
+
+    if state == 'ready':
+        print("      ✨ Brouillon IA prêt")
+        return draft.message
+
+    print(f"      ⚠️ Erreur AI, fallback sur template classique: {draft.error if draft else state}")
+    return render_template_message(campaign, prospect)
+
+def record_connection(db, campaign, prospect, result, profile_id=None):
+    """
+    Enregistrer le résultat d'une demande de connexion/follow (prospect + Action).
+    `profile_id` : ID membre résolu par le bot, mis en cache sur le prospect.
+    """
+    if profile_id and prospect.linkedin_urn != profile_id:
+        prospect.linkedin_urn = profile_id
+
+    # Gérer le résultat
+    if isinstance(result, tuple):
+        success, status_code = result
+    else:
+        success = result
+        status_code = 'connected' if success else 'failed'
+    
+    if success:
+        # Mettre à jour le prospect
+        prospect.status = status_code  # 'connected' ou 'followed'
+        prospect.campaign_id = campaign.id  # Tag avec la campagne
+        prospect.last_action_at = datetime.now()
+        
+        # Logger l'action
+        action = Action(
+            prospect_id=prospect.id,
+            campaign_id=campaign.id,
+            action_type='connect',
+            source='campaign', # <--- SOURCE CAMPAIGN
+            status='success',
+            error_message=f"Outcome: {status_code}",
+            executed_at=datetime.now()
+        )
+        db.add(action)
+        db.commit()
+        
+        print(f"      ✅ {status_code}")
+    else:
+        print(f"      ❌ Échec (Marqué comme failed)")
+        # Mettre à jour le prospect pour ne pas retester à l'infini
+        prospect.status = 'failed' 
+        prospect.last_action_at = datetime.now()
+        
+        # Logger l'echec
+        action = Action(
+            prospect_id=prospect.id,
+            campaign_id=campaign.id,
+            action_type='connect',
+            source='campaign', # <--- SOURCE CAMPAIGN
+            status='failed',
+            error_message=f"Bot returned False",
+            executed_at=datetime.now()
+        )
+        db.add(action)
+        db.commit()
+
+def record_message(db, campaign, prospect, success, message):
+    """Enregistrer le résultat d'un envoi de message (prospect + Action)"""
+    if success:
+        # Mettre à jour le prospect
+        prospect.status = 'messaged'
+        prospect.last_action_at = datetime.now()
+        mark_draft_used(db, campaign, prospect)
+        
+        # Logger l'action
+        action = Action(
+            prospect_id=prospect.id,
+            campaign_id=campaign.id,
+            action_type='message',
+            source='campaign', # <--- SOURCE CAMPAIGN
+            message_sent=message,
+            status='success',
+            executed_at=datetime.now()
+        )
+        db.add(action)
+        db.commit()
+        
+        print(f"      ✅ Message envoyé")
+    else:
+        print(f"      ❌ Échec envoi message")
+        # Marquer comme échoué temporairement ou définitivement
+        # On met 'failed' pour qu'il sorte de la liste "à messager"
+        # Ou on pourrait compter les retries. Pour l'instant: Failed.
+        # Mais attention, si on met status='failed', il ne sera plus 'connected', donc on perd l'info qu'il est connecté.
+        # On va dire que status reste 'connected' mais on log l'échec? 
+        # Non le user veut "failed sur le bouton".
+        prospect.status = 'failed_message' 
+        prospect.last_action_at = datetime.now()
+        
+        action = Action(
+            prospect_id=prospect.id,
+            campaign_id=campaign.id,
+            action_type='message',
+            source='campaign', # <--- SOURCE CAMPAIGN
+            status='failed',
+            error_message="Bot returned False",
+            executed_at=datetime.now()
+        )
+        db.add(action)
+        db.commit()
+
+def process_connection(db, campaign, bot, prospect):
+    """Une demande de connexion/follow : envoi + enregistrement"""
+    result = bot.send_connection_request(prospect.linkedin_url, message="", profile_id=prospect.linkedin_urn)
+    apply_profile_snapshot(prospect, bot.last_profile_snapshot)
+    record_connection(db, campaign, prospect, result, profile_id=bot.last_profile_id)
+
+def process_message(db, campaign, bot, prospect):
+    """Un message : personnalisation + envoi + enregistrement"""
+    message = build_message(db, campaign, prospect)
+    success = bot.send_message(prospect.linkedin_url, message)
+    apply_profile_snapshot(prospect, bot.last_profile_snapshot)
+    record_message(db, campaign, prospect, success, message)
+
+def send_connections(db, campaign, pool):
+    """Envoie des demandes de connexion/follow aux prospects new"""
+    print("\n🤝 ÉTAPE 1: Connexions/Follow")
+    
+    prospects = plan_connections(db, campaign)
+    if not prospects:
+        return
     
-    # Démarrer le bot
     # Démarrer le bot avec le contexte du compte associé à la campagne
     account = campaign.account
     
@@ -183,86 +427,17 @@ def send_connections(db, campaign):
     if not check_working_hours(account):
         return
 
-    proxy_config = None
-    if account.proxy_url and account.proxy_enabled:
-        proxy_config = {
-            'server': account.proxy_url,
-            'username': account.proxy_username,
-            'password': account.proxy_password
-        }
-    
-    # Parse settings
-    security_settings = json.loads(account.security_settings) if account.security_settings else {}
-
-    bot = LinkedInBot(
-        li_at_cookie=account.li_at_cookie,
-        proxy_config=proxy_config,
-        user_agent=account.user_agent,
-        headless=True,
-        security_settings=security_settings
-    )
-    try:
-        if bot.start():
-            print("   ✅ Bot démarré\n")
-            account.cookie_status = 'valid'
-            db.commit()
-        else:
-            print("   ❌ Échec démarrage bot (Cookie invalide)")
-            account.cookie_status = 'expired'
-            db.commit()
-            return
+    bot = acquire_bot(db, pool, account)
+    if not bot:
+        return
 
+    healthy = True
+    try:
         for i, prospect in enumerate(prospects, 1):
             print(f"   [{i}/{len(prospects)}] {prospect.full_name}")
             
             # Envoyer connexion/follow
-            result = bot.send_connection_request(prospect.linkedin_url, message="")
-            
-            # Gérer le résultat
-            if isinstance(result, tuple):
-                success, status_code = result
-            else:
-                success = result
-                status_code = 'connected' if success else 'failed'
-            
-            if success:
-                # Mettre à jour le prospect
-                prospect.status = status_code  # 'connected' ou 'followed'
-                prospect.campaign_id = campaign.id  # Tag avec la campagne
-                prospect.last_action_at = datetime.now()
-                
-                # Logger l'action
-                action = Action(
-                    prospect_id=prospect.id,
-                    campaign_id=campaign.id,
-                    action_type='connect',
-                    source='campaign', # <--- SOURCE CAMPAIGN
-                    status='success',
-                    error_message=f"Outcome: {status_code}",
-                    executed_at=datetime.now()
-                )
-                db.add(action)
-                db.commit()
-                
-                print(f"      ✅ {status_code}")
-            else:
-                print(f"      ❌ Échec (Marqué comme failed)")
-                # Mettre à jour le prospect pour ne pas retester à l'infini
-                prospect.status = 'failed' 
-                prospect.last_action_at = datetime.now()
-                
-                # Logger l'echec
-                action = Action(
-                    prospect_id=prospect.id,
-                    campaign_id=campaign.id,
-                    action_type='connect',
-                    source='campaign', # <--- SOURCE CAMPAIGN
-                    status='failed',
-                    error_message=f"Bot returned False",
-                    executed_at=datetime.now()
-                )
-                db.add(action)
-                db.commit()
+            process_connection(db, campaign, bot, prospect)
             
             # Délai aléatoire entre chaque action (30-120 secondes)
             if i < len(prospects):
@@ -270,95 +445,19 @@ def send_connections(db, campaign):
         
     except Exception as e:
         print(f"   ❌ Erreur bot: {e}")
+        healthy = False
     finally:
-        # Fermer le bot
-        if hasattr(bot, 'browser') and bot.browser:
-            bot.browser.close()
-        if hasattr(bot, 'playwright') and bot.playwright:
-            bot.playwright.stop()
+        # Rendre la session au pool (fermée seulement si elle est en mauvais état)
+        pool.release(account.id, bot, healthy=healthy)
 
-def send_messages(db, campaign):
+def send_messages(db, campaign, pool):
     """Envoie des messages aux prospects connectés depuis X jours"""
     print("\n📨 ÉTAPE 2: Messages automatiques")
     
-    # Date limite: il y a X jours
-    cutoff_date = datetime.now() - timedelta(days=campaign.message_delay_days)
-    
-    # Récupérer les prospects connectés/followed depuis X jours, sans message
-    prospects = db.query(Prospect).filter(
-        Prospect.campaign_id == campaign.id,
-        Prospect.status.in_(['connected', 'followed']),
-        Prospect.last_action_at <= cutoff_date
-    ).all()
-    
-    # Filtrer ceux qui n'ont pas encore reçu de message
-    prospects_to_message = []
-    for p in prospects:
-        has_message = db.query(Action).filter(
-            Action.prospect_id == p.id,
-            Action.action_type == 'message',
-            Action.status == 'success'
-        ).first()
-        
-        if not has_message:
-            prospects_to_message.append(p)
-    
+    prospects_to_message = plan_messages(db, campaign)
     if not prospects_to_message:
-        print("   ℹ️ Aucun prospect prêt pour un message")
-        return
-    
-    print(f"   📋 {len(prospects_to_message)} prospect(s) à messager")
-    
-    
-    # --- LOGIQUE DAILY LIMIT (MESSAGES) ---
-    today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    
-    # Compter combien de messages ont déjà été envoyés aujourd'hui pour cette campagne
-    actions_today = db.query(Action).filter(
-        Action.campaign_id == campaign.id,
-        Action.action_type == 'message',
-        Action.executed_at >= today_start
-    ).count()
-    
-    remaining_quota = campaign.daily_limit - actions_today
-    
-    if remaining_quota <= 0:
-        print(f"   🛑 Quota journalier de messages atteint ({actions_today}/{campaign.daily_limit}).")
         return
-
-    print(f"   Quota messages restant aujourd'hui : {remaining_quota} (Déjà fait: {actions_today})")
-
-    # --- LOGIQUE DE LISSAGE (PACING - MESSAGES) ---
-    settings = json.loads(campaign.account.security_settings) if campaign.account.security_settings else {}
-    working_hours = settings.get('working_hours', {})
-    start_str = working_hours.get('start', '09:00')
-    end_str = working_hours.get('end', '18:00')
     
-    try:
-        fmt = '%H:%M'
-        t_start = datetime.strptime(start_str, fmt)
-        t_end = datetime.strptime(end_str, fmt)
-        total_hours = (t_end - t_start).seconds / 3600
-        if total_hours < 1: total_hours = 1
-        
-        target_per_hour = max(1, math.ceil(campaign.daily_limit / total_hours))
-        
-        limit_now = min(remaining_quota, target_per_hour)
-        print(f"   ⏱️ Rythme calculé : {target_per_hour}/heure (sur {total_hours:.1f}h).")
-        print(f"   ➡️ Messages pour cette exécution : {limit_now}")
-        
-    except Exception as e:
-        print(f"   ⚠️ Erreur calcul pacing ({e}), fallback sur tout le quota.")
-        limit_now = remaining_quota
-
-    # Limiter au limit_now (Pacing)
-    prospects_to_message = prospects_to_message[:limit_now]
-    
-    if not prospects_to_message:
-        print("   ℹ️ Aucun prospect à contacter maintenant (Quota horaire atteint ou 0).")
-        return
-    
-    # Démarrer le bot
     # Démarrer le bot avec le contexte du compte associé à la campagne
     account = campaign.account
     
@@ -366,118 +465,21 @@ def send_messages(db, campaign):
     if not check_working_hours(account):
         return
 
-    proxy_config = None
-    if account.proxy_url and account.proxy_enabled:
-        proxy_config = {
-            'server': account.proxy_url,
-            'username': account.proxy_username,
-            'password': account.proxy_password
-        }
-
-    # Parse settings
-    security_settings = json.loads(account.security_settings) if account.security_settings else {}
-
-    bot = LinkedInBot(
-        li_at_cookie=account.li_at_cookie,
-        proxy_config=proxy_config,
-        user_agent=account.user_agent,
-        headless=True,
-        security_settings=security_settings
-    )
+    # Brouillons IA générés avant d'ouvrir la session : le navigateur n'attend pas l'IA
+    if campaign.use_ai_customization:
+        prepare_drafts(db, campaign, prospects_to_message)
+
+    bot = acquire_bot(db, pool, account)
+    if not bot:
+        return
+
+    healthy = True
     try:
-        if bot.start():
-            print("   ✅ Bot démarré\n")
-            account.cookie_status = 'valid'
-            db.commit()
-        else:
-            print("   ❌ Échec démarrage bot (Cookie invalide)")
-            account.cookie_status = 'expired'
-            db.commit()
-            return
-        
         for i, prospect in enumerate(prospects_to_message, 1):
             print(f"   [{i}/{len(prospects_to_message)}] {prospect.full_name}")
             
-            # Personnaliser le message
-            if campaign.use_ai_customization:
-                print("      ✨ Génération message AI...")
-                # Récupérer le prompt système
-                # Priorité: Compte > Global
-                system_prompt = campaign.account.system_prompt
-                
-                if not system_prompt:
-                    system_prompt_setting = db.query(Settings).filter(Settings.key == 'system_prompt').first()
-                    system_prompt = system_prompt_setting.value if system_prompt_setting else None
-                
-                prospect_data = {
-                    'name': prospect.full_name,
-                    'headline': prospect.headline,
-                    'summary': prospect.summary,
-                    'experience': prospect.experiences,
-                }
-                
-                ai_service = AIService()
-                message = ai_service.generate_icebreaker(prospect_data, system_prompt)
-                
-                if message.startswith("Error"):
-                     print(f"      ⚠️ Erreur AI, fallback sur template classique: {message}")
-                     message = campaign.first_message
-                     message = message.replace('{name}', prospect.full_name.split()[0] if prospect.full_name else 'there')
-                     message = message.replace('{full_name}', prospect.full_name or '')
-                     message = message.replace('{company}', prospect.company or '')
-                     message = message.replace('{title}', prospect.headline or '')
-            else:
-                # Template classique
-                message = campaign.first_message
-                message = message.replace('{name}', prospect.full_name.split()[0] if prospect.full_name else 'there')
-                message = message.replace('{full_name}', prospect.full_name or '')
-                message = message.replace('{company}', prospect.company or '')
-                message = message.replace('{title}', prospect.headline or '')
-            
-            # Envoyer le message
-            success = bot.send_message(prospect.linkedin_url, message)
-            
-            if success:
-                # Mettre à jour le prospect
-                prospect.status = 'messaged'
-                prospect.last_action_at = datetime.now()
-                
-                # Logger l'action
-                action = Action(
-                    prospect_id=prospect.id,
-                    campaign_id=campaign.id,
-                    action_type='message',
-                    source='campaign', # <--- SOURCE CAMPAIGN
-                    message_sent=message,
-                    status='success',
-                    executed_at=datetime.now()
-                )
-                db.add(action)
-                db.commit()
-                
-                print(f"      ✅ Message envoyé")
-            else:
-                print(f"      ❌ Échec envoi message")
-                # Marquer comme échoué temporairement ou définitivement
-                # On met 'failed' pour qu'il sorte de la liste "à messager"
-                # Ou on pourrait compter les retries. Pour l'instant: Failed.
-                # Mais attention, si on met status='failed', il ne sera plus 'connected', donc on perd l'info qu'il est connecté.
-                # On va dire que status reste 'connected' mais on log l'échec? 
-                # Non le user veut "failed sur le bouton".
-                prospect.status = 'failed_message' 
-                prospect.last_action_at = datetime.now()
-                
-                action = Action(
-                    prospect_id=prospect.id,
-                    campaign_id=campaign.id,
-                    action_type='message',
-                    source='campaign', # <--- SOURCE CAMPAIGN
-                    status='failed',
-                    error_message="Bot returned False",
-                    executed_at=datetime.now()
-                )
-                db.add(action)
-                db.commit()
+            # Personnaliser et envoyer le message
+            process_message(db, campaign, bot, prospect)
             
             # Délai aléatoire entre chaque message (60-180 secondes)
             if i < len(prospects_to_message):
@@ -485,18 +487,21 @@ def send_messages(db, campaign):
         
     except Exception as e:
         print(f"   ❌ Erreur bot: {e}")
+        healthy = False
     finally:
-        # Fermer le bot
-        if hasattr(bot, 'browser') and bot.browser:
-            bot.browser.close()
-        if hasattr(bot, 'playwright') and bot.playwright:
-            bot.playwright.stop()
+        # Rendre la session au pool (fermée seulement si elle est en mauvais état)
+        pool.release(account.id, bot, healthy=healthy)
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='LinkedIn Campaign Runner')
     parser.add_argument('--campaign_id', type=int, help='ID de la campagne à exécuter')
     args = parser.parse_args()
 
+    # Jamais en parallèle d'un autre runner (scheduler.py tient le verrou en continu)
+    run_lock = acquire_run_lock()
+    if run_lock is None:
+        sys.exit(1)
+
     print("\n🚀 LANCEMENT DES CAMPAGNES LINKEDIN")
     print(f"📅 {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n")
     
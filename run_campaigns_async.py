@@ -0,0 +1,187 @@
+"""
+Runner de campagnes asynchrone : tous les comptes en parallèle dans un seul processus.
+
+Même planification et même enregistrement que run_campaigns.py (quota,
+pacing, horaires, message IA/template), mais chaque compte est une tâche
+asyncio pilotant un AsyncLinkedInBot : pendant qu'un compte attend entre deux
+actions (30-180s), les autres travaillent.
+
+- Concurrence par compte : 1 (une tâche séquentielle, un navigateur par compte)
+- Plafond global de navigateurs ouverts : --max-browsers (sémaphore)
+
+Usage:
+    python run_campaigns_async.py
+    python run_campaigns_async.py --max-browsers 5
+    python run_campaigns_async.py --campaign_id 3
+"""
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import asyncio
+import random
+import sys
+from datetime import datetime
+from itertools import groupby
+
+from playwright.async_api import async_playwright
+
+from database import SessionLocal, Campaign, Account
+from services.async_linkedin_bot import AsyncLinkedInBot
+from services.profile_snapshot import apply_profile_snapshot
+from services.run_lock import acquire_run_lock
+from services.message_drafts import prepare_drafts
+from run_campaigns import (
+    check_working_hours,
+    plan_connections,
+    plan_messages,
+    build_message,
+    record_connection,
+    record_message,
+)
+
+DEFAULT_MAX_BROWSERS = 3
+
+
+async def human_pause(bot, min_seconds, max_seconds):
+    """Délai aléatoire non bloquant : les autres comptes avancent pendant ce temps"""
+    delay = random.uniform(min_seconds, max_seconds)
+    bot.log(f"   ⏳ Attente de {delay:.1f}s...")
+    await asyncio.sleep(delay)
+
+
+def plan_account(db, campaigns, claimed):
+    """
+    Prospects à traiter pour chaque campagne du compte.
+    `claimed` est partagé entre comptes : la sélection des prospects 'new'
+    n'étant pas filtrée par compte, deux comptes ne doivent pas contacter le même.
+    """
+    work = []
+    for campaign in campaigns:
+        print(f"📊 Campagne: {campaign.name} (compte {campaign.account_id})")
+        print("\n🤝 ÉTAPE 1: Connexions/Follow")
+        connections = plan_connections(db, campaign, exclude_ids=claimed)
+        claimed.update(p.id for p in connections)
+        print("\n📨 ÉTAPE 2: Messages automatiques")
+        messages = plan_messages(db, campaign, exclude_ids=claimed)
+        claimed.update(p.id for p in messages)
+        if connections or messages:
+            work.append((campaign, connections, messages))
+    return work
+
+
+async def run_account(account_id, campaign_ids, playwright, browsers, claimed, headless=True):
+    """Toutes les campagnes d'un compte, séquentiellement, avec un seul navigateur"""
+    # Session propre à la tâche : les tâches s'entrelacent sur le même thread
+    db = SessionLocal.session_factory()
+    try:
+        account = db.query(Account).get(account_id)
+        campaigns = db.query(Campaign).filter(Campaign.id.in_(campaign_ids)).all()
+        if not account:
+            print(f"⚠️ Compte {account_id} introuvable, campagnes ignorées")
+            return
+
+        # Planification avant d'ouvrir un navigateur : pas de Chromium pour rien
+        work = plan_account(db, campaigns, claimed)
+        if not work:
+            print(f"ℹ️ Compte {account.name}: rien à faire")
+            return
+
+        if not check_working_hours(account):
+            return
+
+        # Brouillons IA générés avant d'ouvrir le navigateur (appels LLM bloquants : hors boucle)
+        for campaign, connections, messages in work:
+            if messages and campaign.use_ai_customization:
+                await asyncio.to_thread(prepare_drafts, db, campaign, messages)
+
+        async with browsers:
+            bot = AsyncLinkedInBot.from_account(account, headless=headless)
+            started = await bot.start(playwright)
+            if started:
+                account.cookie_status = 'valid'
+            elif bot.auth_failed:
+                account.cookie_status = 'expired'
+            db.commit()
+            if not started:
+                return
+
+            try:
+                for campaign, connections, messages in work:
+                    for i, prospect in enumerate(connections, 1):
+                        bot.log(f"   🤝 [{i}/{len(connections)}] {prospect.full_name}")
+                        result = await bot.send_connection_request(
+                            prospect.linkedin_url, message="", profile_id=prospect.linkedin_urn)
+                        apply_profile_snapshot(prospect, bot.last_profile_snapshot)
+                        record_connection(db, campaign, prospect, result, profile_id=bot.last_profile_id)
+                        if i < len(connections):
+                            await human_pause(bot, 30, 120)
+
+                    for i, prospect in enumerate(messages, 1):
+                        bot.log(f"   📨 [{i}/{len(messages)}] {prospect.full_name}")
+                        # Brouillon prêt ; sinon génération de dernier recours (requests, bloquant) : hors boucle
+                        message = await asyncio.to_thread(build_message, db, campaign, prospect)
+                        success = await bot.send_message(prospect.linkedin_url, message)
+                        apply_profile_snapshot(prospect, bot.last_profile_snapshot)
+                        record_message(db, campaign, prospect, success, message)
+                        if i < len(messages):
+                            await human_pause(bot, 60, 180)
+            finally:
+                await bot.stop()
+    finally:
+        db.close()
+
+
+async def run_campaigns_async(campaign_id=None, max_browsers=DEFAULT_MAX_BROWSERS, headless=True):
+    db = SessionLocal()
+    if campaign_id:
+        print(f"🎯 Lancement ciblé de la campagne ID: {campaign_id}")
+        campaigns = db.query(Campaign).filter(Campaign.id == campaign_id).all()
+    else:
+        campaigns = db.query(Campaign).filter(Campaign.status == 'active').all()
+
+    campaigns = sorted(campaigns, key=lambda c: c.account_id or 0)
+    by_account = [
+        (account_id, [c.id for c in group])
+        for account_id, group in groupby(campaigns, key=lambda c: c.account_id or 0)
+    ]
+    db.close()
+    SessionLocal.remove()
+
+    if not by_account:
+        print("❌ Aucune campagne trouvée ou active")
+        return
+
+    print(f"🎯 {len(campaigns)} campagne(s) sur {len(by_account)} compte(s), {max_browsers} navigateur(s) max\n")
+
+    browsers = asyncio.Semaphore(max_browsers)
+    claimed = set()
+    async with async_playwright() as playwright:
+        results = await asyncio.gather(*[
+            run_account(account_id, campaign_ids, playwright, browsers, claimed, headless)
+            for account_id, campaign_ids in by_account
+        ], return_exceptions=True)
+
+    for (account_id, _), result in zip(by_account, results):
+        if isinstance(result, Exception):
+            print(f"❌ Compte {account_id}: {result}")
+
+    print("\n✅ Toutes les campagnes ont été traitées")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='LinkedIn Campaign Runner (async, multi-comptes)')
+    parser.add_argument('--campaign_id', type=int, help='ID de la campagne à exécuter')
+    parser.add_argument('--max-browsers', type=int, default=DEFAULT_MAX_BROWSERS, help='Navigateurs ouverts simultanément')
+    args = parser.parse_args()
+
+    run_lock = acquire_run_lock()
+    if run_lock is None:
+        sys.exit(1)
+
+    print("\n🚀 LANCEMENT DES CAMPAGNES LINKEDIN (async)")
+    print(f"📅 {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n")
+
+    asyncio.run(run_campaigns_async(campaign_id=args.campaign_id, max_browsers=args.max_browsers))
+
+    print(f"\n🏁 Terminé à {datetime.now().strftime('%H:%M:%S')}")
@@ -0,0 +1,297 @@
+"""
+Planificateur résident des campagnes (remplace le cron horaire de run_campaigns.py).
+
+Un seul processus, démarré par entrypoint.sh :
+- garde les sessions navigateur chaudes entre deux actions (BotPool) ;
+- répartit le quota journalier de chaque campagne sur les horaires de travail
+  du compte (`security_settings.working_hours`) : un créneau par action, avec
+  un jitter à l'intérieur de chaque créneau, au lieu d'une rafale par heure ;
+- déclenche une action à la fois par compte, quand son créneau est échu ;
+- tient le verrou mono-instance partagé avec run_campaigns.py : jamais deux runners en parallèle ;
+- empile régulièrement, pour les campagnes avec IA, une tâche 'drafts' (worker.py)
+  qui pré-génère les messages des prochains prospects, hors fenêtre d'envoi comprise.
+
+Les créneaux d'une journée sont déterministes (graine = campagne + date) : un
+redémarrage retrouve le même plan et rattrape les créneaux manqués, espacés.
+
+Usage:
+    python scheduler.py
+    python scheduler.py --max-browsers 2
+    python scheduler.py --dry-run      # affiche le plan du jour puis quitte
+"""
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import json
+import random
+import signal
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from database import SessionLocal, Campaign
+from database.models import Job
+from services import job_queue
+from services.bot_pool import BotPool
+from services.run_lock import acquire_run_lock
+from run_campaigns import (
+    count_actions_today,
+    plan_connections,
+    plan_messages,
+    acquire_bot,
+    process_connection,
+    process_message,
+)
+
+TICK_SECONDS = 20
+IDLE_RECHECK = timedelta(minutes=15)     # campagne sans prospect éligible : on revient plus tard
+BOT_FAILURE_BACKOFF = timedelta(minutes=10)
+# Écart minimal entre deux actions d'un même compte (mêmes plages que run_campaigns.py)
+ACTION_GAPS = {'connect': (30, 120), 'message': (60, 180)}
+SESSION_IDLE_TIMEOUT = 1800
+DRAFT_REFRESH = timedelta(minutes=30)  # Fréquence d'empilement des tâches 'drafts' par campagne
+
+_stopping = False
+
+
+def account_settings(account) -> dict:
+    try:
+        return json.loads(account.security_settings) if account.security_settings else {}
+    except ValueError:
+        return {}
+
+
+def account_now(account) -> datetime:
+    """Heure courante dans le fuseau du compte"""
+    try:
+        tz = ZoneInfo(account_settings(account).get('timezone', 'Europe/Paris'))
+    except Exception:
+        tz = ZoneInfo('UTC')
+    return datetime.now(tz)
+
+
+def day_start_utc(now: datetime) -> datetime:
+    """Minuit du jour de `now` (fuseau du compte), en UTC naïf comme Action.executed_at"""
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def working_window(account, now: datetime):
+    """(début, fin) de la plage de travail du jour de `now`, ou None si jour non travaillé"""
+    working_hours = account_settings(account).get('working_hours', {})
+    # Mêmes défauts que check_working_hours / pacing_limit
+    days = working_hours.get('days', [0, 1, 2, 3, 4]) if working_hours else list(range(7))
+    if now.weekday() not in days:
+        return None
+
+    try:
+        start = datetime.strptime(working_hours.get('start', '09:00'), '%H:%M').time()
+        end = datetime.strptime(working_hours.get('end', '18:00'), '%H:%M').time()
+    except ValueError:
+        return None
+
+    start_dt = now.replace(hour=start.hour, minute=start.minute, second=0, microsecond=0)
+    end_dt = now.replace(hour=end.hour, minute=end.minute, second=0, microsecond=0)
+    if end_dt <= start_dt:
+        return None
+    return start_dt, end_dt
+
+
+def action_slots(campaign, action_type: str, window) -> list:
+    """
+    Créneaux du jour : la plage est découpée en `daily_limit` intervalles égaux,
+    un instant tiré au hasard dans chacun (stratifié : ni rafale ni trou).
+    """
+    start, end = window
+    count = max(0, campaign.daily_limit or 0)
+    if not count:
+        return []
+    rng = random.Random(f"{campaign.id}:{action_type}:{start.date().isoformat()}")
+    step = (end - start) / count
+    return [start + step * (i + rng.uniform(0.1, 0.9)) for i in range(count)]
+
+
+def due_count(db, campaign, action_type: str, now: datetime, window) -> int:
+    """Créneaux échus non encore consommés par une action du jour"""
+    elapsed = sum(1 for slot in action_slots(campaign, action_type, window) if slot <= now)
+    # Même journée (fuseau du compte) pour les créneaux et les actions déjà faites
+    return elapsed - count_actions_today(db, campaign, action_type, today_start=day_start_utc(now))
+
+
+class Scheduler:
+    def __init__(self, max_browsers: int = 3, headless: bool = True):
+        self.pool = BotPool(headless=headless, max_contexts=max_browsers, idle_timeout=SESSION_IDLE_TIMEOUT)
+        self.next_action_at = {}  # account_id -> instant (monotonic) de la prochaine action permise
+        self.idle_until = {}      # (campaign_id, action_type) -> instant (monotonic)
+        self.next_drafts_at = {}  # campaign_id -> instant (monotonic) du prochain empilement 'drafts'
+
+    def tick(self):
+        """Un passage : au plus une action par compte dont un créneau est échu"""
+        db = SessionLocal()
+        try:
+            campaigns = db.query(Campaign).filter(Campaign.status == 'active').all()
+            by_account = {}
+            for campaign in campaigns:
+                if campaign.account_id:
+                    by_account.setdefault(campaign.account_id, []).append(campaign)
+
+            self.schedule_drafts(db, campaigns)
+
+            for account_id, account_campaigns in by_account.items():
+                if _stopping:
+                    break
+                if time.monotonic() < self.next_action_at.get(account_id, 0):
+                    continue
+                self.run_account(db, account_campaigns[0].account, account_campaigns)
+        finally:
+            db.close()
+            SessionLocal.remove()
+
+        self.pool.evict_idle()
+
+    def schedule_drafts(self, db, campaigns):
+        """Empiler la pré-génération des messages IA (une tâche en file au plus par campagne)"""
+        for campaign in campaigns:
+            if not campaign.use_ai_customization or time.monotonic() < self.next_drafts_at.get(campaign.id, 0):
+                continue
+            self.next_drafts_at[campaign.id] = time.monotonic() + DRAFT_REFRESH.total_seconds()
+
+            payload = json.dumps({'campaign_id': campaign.id})
+            pending = db.query(Job.id).filter(
+                Job.job_type == 'drafts',
+                Job.status.in_(['queued', 'running']),
+                Job.payload == payload
+            ).first()
+            if not pending:
+                job_queue.enqueue(db, 'drafts', {'campaign_id': campaign.id}, account_id=campaign.account_id)
+
+    def run_account(self, db, account, campaigns):
+        now = account_now(account)
+        window = working_window(account, now)
+        if not window or not (window[0] <= now <= window[1]):
+            return
+
+        for campaign in campaigns:
+            for action_type in ('connect', 'message'):
+                key = (campaign.id, action_type)
+                if time.monotonic() < self.idle_until.get(key, 0):
+                    continue
+                if due_count(db, campaign, action_type, now, window) <= 0:
+                    continue
+
+                print(f"\n⏰ {now.strftime('%H:%M')} [{account.name}] {campaign.name} → {action_type}", flush=True)
+                done = self.run_action(db, account, campaign, action_type)
+                if done is None:
+                    # Pas de session : on laisse le compte tranquille un moment
+                    self.next_action_at[account.id] = time.monotonic() + BOT_FAILURE_BACKOFF.total_seconds()
+                    return
+                if not done:
+                    self.idle_until[key] = time.monotonic() + IDLE_RECHECK.total_seconds()
+                    continue
+
+                gap = random.uniform(*ACTION_GAPS[action_type])
+                self.next_action_at[account.id] = time.monotonic() + gap
+                print(f"   ⏳ Prochaine action du compte dans {gap:.0f}s au plus tôt", flush=True)
+                return
+
+    def run_action(self, db, account, campaign, action_type: str):
+        """Une action. True = faite, False = rien d'éligible, None = session indisponible."""
+        if action_type == 'connect':
+            prospects = plan_connections(db, campaign, limit=1)
+        else:
+            prospects = plan_messages(db, campaign, limit=1)
+        if not prospects:
+            return False
+
+        bot = acquire_bot(db, self.pool, account)
+        if not bot:
+            return None
+
+        healthy = True
+        try:
+            prospect = prospects[0]
+            print(f"   👤 {prospect.full_name}")
+            if action_type == 'connect':
+                process_connection(db, campaign, bot, prospect)
+            else:
+                process_message(db, campaign, bot, prospect)
+        except Exception as e:
+            print(f"   ❌ Erreur bot: {e}")
+            db.rollback()
+            healthy = False
+        finally:
+            self.pool.release(account.id, bot, healthy=healthy)
+        return True
+
+    def close(self):
+        self.pool.close_all()
+
+
+def print_plan():
+    """Plan du jour (créneaux restants par campagne), sans rien exécuter"""
+    db = SessionLocal()
+    try:
+        for campaign in db.query(Campaign).filter(Campaign.status == 'active').all():
+            account = campaign.account
+            if not account:
+                continue
+            now = account_now(account)
+            window = working_window(account, now)
+            print(f"📊 {campaign.name} ({account.name})")
+            if not window:
+                print("   ⏸️ Jour non travaillé")
+                continue
+            for action_type in ('connect', 'message'):
+                slots = [s for s in action_slots(campaign, action_type, window) if s > now]
+                done = count_actions_today(db, campaign, action_type, today_start=day_start_utc(now))
+                preview = ', '.join(s.strftime('%H:%M') for s in slots[:8])
+                print(f"   {action_type}: {done} fait(s), {len(slots)} créneau(x) restant(s) {preview}{' ...' if len(slots) > 8 else ''}")
+    finally:
+        db.close()
+
+
+def _handle_stop(signum, frame):
+    global _stopping
+    print("🛑 Arrêt demandé, fin de l'action en cours...", flush=True)
+    _stopping = True
+
+
+def main(max_browsers: int = 3):
+    lock = acquire_run_lock()
+    if lock is None:
+        sys.exit(1)
+
+    signal.signal(signal.SIGTERM, _handle_stop)
+    signal.signal(signal.SIGINT, _handle_stop)
+    print(f"🗓️ Planificateur démarré ({max_browsers} navigateur(s) max)", flush=True)
+
+    scheduler = Scheduler(max_browsers=max_browsers)
+    try:
+        while not _stopping:
+            try:
+                scheduler.tick()
+            except Exception as e:
+                print(f"❌ Erreur planificateur: {e}", flush=True)
+            # Sommeil découpé : SIGTERM pris en compte rapidement
+            for _ in range(TICK_SECONDS):
+                if _stopping:
+                    break
+                time.sleep(1)
+    finally:
+        scheduler.close()
+        lock.close()
+    print("👋 Planificateur arrêté")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Planificateur résident des campagnes LinkedIn')
+    parser.add_argument('--max-browsers', type=int, default=3, help='Sessions navigateur chaudes simultanées')
+    parser.add_argument('--dry-run', action='store_true', help='Afficher le plan du jour puis quitter')
+    args = parser.parse_args()
+
+    if args.dry_run:
+        print_plan()
+    else:
+        main(max_browsers=args.max_browsers)
@@ -1,7 +1,9 @@
-import os
-import requests
 import json
-import time
+
+from services.llm_client import get_llm_client, LLMError
+from services.llm_cache import get_llm_cache, cache_key
+
+SIGNAL_BATCH_SIZE = 5  # Profils par requête de tagging (les requêtes partent en parallèle)
 
 DEFAULT_PROMPT = """
 Role: You are an expert B2B social seller.
@@ -31,36 +33,65 @@ Experience: {experience}
 Message (Raw text only):
 """
 
+SIGNAL_PROMPT = """
+Role: You are an expert B2B analyst.
+Task: Analyze the following list of LinkedIn profiles and identify "Signal Tags".
+
+Signal Definitions:
+- "Platform/DevEx initiatives": Mentions Platform Engineering, IDP, Developer Experience, DevEX, DX.
+- "AI coding mentions": Mentions AI coding agents, Copilot, Cursor, LLM for code, autonomous coding.
+- "scaling/hiring": Mentions "scaling", "hypergrowth", "hiring", "growing", "recruiting".
+- "productivity investment": Mentions "engineering productivity", "developer productivity", "DORA metrics", "SPACE framework".
+- "refactor/tech debt narratives": Mentions "tech debt", "refactoring", "legacy code", "modernization".
+
+Input:
+{prospects_json}
+
+Each profile contains: id, headline, summary (bio), and skills (list).
+
+Output Rules:
+- Return ONLY valid JSON.
+- Format: {{ "id": ["tag_name1", "tag_name2"] }}
+- Use EXACT tag names from the list above.
+"""
+
+
 class AIService:
-    def __init__(self):
-        self.api_key = os.getenv('OPENROUTER_KEY')
-        self.base_url = "https://openrouter.ai/api/v1"
+    def __init__(self, client=None, cache=None):
+        # Client partagé : keep-alive, limiteur RPM/TPM et retries communs à tous les appels
+        self.client = client or get_llm_client()
+        # Cache des réponses (services/llm_cache.py) ; cache=False pour s'en passer
+        self.cache = None if cache is False else (cache or get_llm_cache())
+        self.api_key = self.client.api_key
         self.model = "anthropic/claude-sonnet-4.5" 
 
-    def generate_icebreaker(self, prospect_data, prompt_template=None):
+    def generate_icebreaker(self, prospect_data, prompt_template=None, use_cache=True):
         """
         Génère un message d'accroche personnalisé.
+        Retourne le message, ou une chaîne commençant par "Error" en cas d'échec.
+        `use_cache=False` : nouvelle génération, même si ces entrées sont en cache.
         """
-        if not self.api_key:
-            return "Error: OPENROUTER_KEY not found in .env"
-
         final_prompt = prompt_template if prompt_template else DEFAULT_PROMPT
         
         # Formatting the prompt with safe defaults
-        formatted_prompt = final_prompt.format(
-            name=prospect_data.get('name') or '',
-            headline=prospect_data.get('headline') or '',
-            summary=(prospect_data.get('summary') or '')[:500], # Limit context size
-            experience=str(prospect_data.get('experience') or '')[:500]
-        )
-
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "HTTP-Referer": "https://linkedin-mvp.local", # Required by OpenRouter
-            "X-Title": "LinkedIn MVP",
-            "Content-Type": "application/json"
+        fields = {
+            'name': prospect_data.get('name') or '',
+            'headline': prospect_data.get('headline') or '',
+            'summary': (prospect_data.get('summary') or '')[:500], # Limit context size
+            'experience': str(prospect_data.get('experience') or '')[:500],
         }
 
+        key = cache_key('icebreaker', self.model, final_prompt, fields) if self.cache else None
+        if key and use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        if not self.api_key:
+            return "Error: OPENROUTER_KEY not found in .env"
+
+        formatted_prompt = final_prompt.format(**fields)
+
         payload = {
             "model": self.model,
 
@@ -73,88 +104,59 @@ class AIService:
         }
 
         try:
-            response = requests.post(
-                f"{self.base_url}/chat/completions",
-                headers=headers,
-                data=json.dumps(payload),
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                if 'choices' in result and len(result['choices']) > 0:
-                    content = result['choices'][0]['message']['content'].strip()
-                    
-                    # Post-processing to enforce user rules strictly
-                    # 1. Remove ANY surrounding quotation marks (single or double)
-                    content = content.strip('"').strip("'")
-                    
-                    # 2. Replace all forms of dashes with commas
-                    # Em-dash, En-dash, standard dash surrounded by spaces
-                    content = content.replace("—", ", ").replace("–", ", ").replace(" - ", ", ")
-                    
-                    # 3. Final cleanup of whitespace
-                    content = content.strip()
-                    
-                    return content
-                else:
-                    return "Error: Empty response from AI"
-            else:
-                return f"Error: API returned {response.status_code} - {response.text}"
-                
+            result = self.client.chat(payload, timeout=30)
+        except LLMError as e:
+            return f"Error: {e}"
         except Exception as e:
             return f"Error calling AI: {str(e)}"
 
-    def analyze_batch_signals(self, prospects_list):
+        if 'choices' in result and len(result['choices']) > 0:
+            content = result['choices'][0]['message']['content'].strip()
+            
+            # Post-processing to enforce user rules strictly
+            # 1. Remove ANY surrounding quotation marks (single or double)
+            content = content.strip('"').strip("'")
+            
+            # 2. Replace all forms of dashes with commas
+            # Em-dash, En-dash, standard dash surrounded by spaces
+            content = content.replace("—", ", ").replace("–", ", ").replace(" - ", ", ")
+            
+            # 3. Final cleanup of whitespace
+            content = content.strip()
+            
+            if key and content:
+                self.cache.set(key, content, kind='icebreaker', model=self.model)
+            return content
+        else:
+            return "Error: Empty response from AI"
+
+    def generate_icebreakers(self, prospects_data, prompt_template=None, use_cache=True):
         """
-        Analyse un lot de prospects pour détecter des "Signal Tags".
-        prospects_list: liste de dicts {'id': 1, 'headline': '...', 'about': '...'}
-        Retourne: dict { str(id): ['Tag1', 'Tag2'] }
+        Version lot de generate_icebreaker : requêtes en parallèle sous le limiteur.
+        Itère sur (index, message) au fil des réponses (message "Error..." en cas d'échec).
         """
-        # print(f"DEBUG INPUT: {type(prospects_list)} - {prospects_list}") # DEBUG
-        if not self.api_key:
-            print("Error: OPENROUTER_KEY not found")
-            return {}
-
-        prompt = """
-Role: You are an expert B2B analyst.
-Task: Analyze the following list of LinkedIn profiles and identify "Signal Tags".
-
-Signal Definitions:
-- "Platform/DevEx initiatives": Mentions Platform Engineering, IDP, Developer Experience, DevEX, DX.
-- "AI coding mentions": Mentions AI coding agents, Copilot, Cursor, LLM for code, autonomous coding.
-- "scaling/hiring": Mentions "scaling", "hypergrowth", "hiring", "growing", "recruiting".
-- "productivity investment": Mentions "engineering productivity", "developer productivity", "DORA metrics", "SPACE framework".
-- "refactor/tech debt narratives": Mentions "tech debt", "refactoring", "legacy code", "modernization".
-
-Input:
-{prospects_json}
-
-Each profile contains: id, headline, summary (bio), and skills (list).
+        for index, message in self.client.fan_out(
+                lambda data: self.generate_icebreaker(data, prompt_template, use_cache), prospects_data):
+            if isinstance(message, Exception):
+                message = f"Error calling AI: {message}"
+            yield index, message
+
+    @staticmethod
+    def _signal_input(p):
+        """Champs d'un profil envoyés au tagging (et clé de cache, id exclu)"""
+        return {
+            'headline': (p.get('headline') or '')[:300],
+            'about': (p.get('summary') or '')[:500]
+        }
 
-Output Rules:
-- Return ONLY valid JSON.
-- Format: {{ "id": ["tag_name1", "tag_name2"] }}
-- Use EXACT tag names from the list above.
-"""
-        
+    def _analyze_signals_chunk(self, prospects_list):
+        """Une requête de tagging pour un petit lot de profils"""
         # Prepare clean JSON input for AI
         clean_input = []
         for p in prospects_list:
-            clean_input.append({
-                'id': str(p['id']),
-                'headline': (p.get('headline') or '')[:300],
-                'about': (p.get('summary') or '')[:500]
-            })
+            clean_input.append({'id': str(p['id']), **self._signal_input(p)})
             
-        final_prompt = prompt.format(prospects_json=json.dumps(clean_input))
-
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "HTTP-Referer": "https://linkedin-mvp.local",
-            "X-Title": "LinkedIn MVP",
-            "Content-Type": "application/json"
-        }
+        final_prompt = SIGNAL_PROMPT.format(prospects_json=json.dumps(clean_input))
 
         payload = {
             "model": self.model,
@@ -166,27 +168,61 @@ Output Rules:
             "response_format": { "type": "json_object" } # Force JSON if supported, else prompt does it
         }
 
-        try:
-            response = requests.post(
-                f"{self.base_url}/chat/completions",
-                headers=headers,
-                data=json.dumps(payload),
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                content = result['choices'][0]['message']['content']
-                # print(f"DEBUG AI RESP: {content}") # DEBUG
-                
-                # Cleanup Markdown Code Blocks
-                content = content.replace("```json", "").replace("```", "").strip()
-                
-                # Parse JSON
-                return json.loads(content)
-            else:
-                print(f"AI Error: {response.text}")
-                return {}
-        except Exception as e:
-            print(f"Batch AI Error: {e}")
-            return {}
+        result = self.client.chat(payload, timeout=60)
+        content = result['choices'][0]['message']['content']
+        
+        # Cleanup Markdown Code Blocks
+        content = content.replace("```json", "").replace("```", "").strip()
+        
+        # Parse JSON
+        return json.loads(content)
+
+    def iter_batch_signals(self, prospects_list, batch_size=SIGNAL_BATCH_SIZE, use_cache=True):
+        """
+        Tagging d'un nombre quelconque de prospects : les profils déjà analysés
+        (entrées inchangées) sont servis par le cache, les autres découpés en lots
+        de `batch_size` envoyés en parallèle. Itère sur (lot, dict {str(id): [tags]})
+        au fil des réponses (dict vide pour un lot en échec).
+        """
+        keys = {}
+        pending = prospects_list
+        if self.cache:
+            keys = {p['id']: cache_key('signals', self.model, SIGNAL_PROMPT, self._signal_input(p)) for p in prospects_list}
+            cached, pending = [], []
+            for p in prospects_list:
+                tags = self.cache.get(keys[p['id']]) if use_cache else None
+                if tags is None:
+                    pending.append(p)
+                else:
+                    cached.append((p, tags))
+            if cached:
+                yield [p for p, _ in cached], {str(p['id']): tags for p, tags in cached if tags}
+
+        if not pending:
+            return
+        if not self.api_key:
+            print("Error: OPENROUTER_KEY not found")
+            return
+
+        chunks = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        for index, result in self.client.fan_out(self._analyze_signals_chunk, chunks):
+            if isinstance(result, Exception):
+                print(f"Batch AI Error: {result}")
+                result = {}
+            elif keys:
+                # Réponse valide : un profil absent de la réponse n'a aucun signal
+                for p in chunks[index]:
+                    tags = result.get(str(p['id'])) or []
+                    self.cache.set(keys[p['id']], tags, kind='signals', model=self.model)
+            yield chunks[index], result
+
+    def analyze_batch_signals(self, prospects_list, batch_size=SIGNAL_BATCH_SIZE, use_cache=True):
+        """
+        Analyse des prospects pour détecter des "Signal Tags" (centaines acceptées).
+        prospects_list: liste de dicts {'id': 1, 'headline': '...', 'summary': '...'}
+        Retourne: dict { str(id): ['Tag1', 'Tag2'] }
+        """
+        results = {}
+        for _, chunk_results in self.iter_batch_signals(prospects_list, batch_size, use_cache):
+            results.update(chunk_results)
+        return results
@@ -1,5 +1,7 @@
 import os
 import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from apify_client import ApifyClient
 from dotenv import load_dotenv
 
@@ -9,43 +11,78 @@ APIFY_API_KEY = os.getenv('APIFY_API_KEY')
 # Actor: Mass LinkedIn Profile Scraper with Email (dev_fusion/Linkedin-Profile-Scraper)
 ACTOR_ID = "dev_fusion/Linkedin-Profile-Scraper"
 
+CHUNK_SIZE = int(os.getenv('APIFY_CHUNK_SIZE', 25))      # URLs par run de l'actor
+MAX_PARALLEL_RUNS = int(os.getenv('APIFY_MAX_PARALLEL', 3))  # Runs Apify simultanés
+
+# Version de parse_result_to_db / prospect_fields : à incrémenter à chaque changement
+# de l'extraction, pour que reprocess_raw_data.py réapplique le parseur au raw_data stocké
+PARSER_VERSION = 1
+
+
 class ApifyEnricher:
     def __init__(self):
         self.client = ApifyClient(APIFY_API_KEY)
-        
+
+    def _run_chunk(self, linkedin_urls):
+        """Un run de l'actor (bloquant, exécuté dans un thread). Retourne le run terminé."""
+        run_input = {
+            "profileUrls": linkedin_urls
+        }
+        run = self.client.actor(ACTOR_ID).call(run_input=run_input)
+        if not run:
+            raise RuntimeError("Apify run returned nothing")
+        if run.get('status') not in (None, 'SUCCEEDED'):
+            raise RuntimeError(f"Apify run {run.get('id')} ended with status {run.get('status')}")
+        return run
+
+    def iter_chunks(self, linkedin_urls, chunk_size=CHUNK_SIZE, max_parallel=MAX_PARALLEL_RUNS):
+        """
+        Enrichissement découpé en runs parallèles (au plus `max_parallel` à la fois).
+        Itère, dans le thread appelant et au fil des fins de runs, sur
+        (URLs du lot, itérateur des items du dataset, erreur) : les items sont lus
+        page par page (`iterate_items`), jamais tous en mémoire. Un lot en échec
+        est signalé (itérateur None) sans interrompre les autres.
+        """
+        if not linkedin_urls:
+            return
+
+        chunks = [linkedin_urls[i:i + chunk_size] for i in range(0, len(linkedin_urls), chunk_size)]
+        print(f"🚀 [Apify] {len(linkedin_urls)} profils en {len(chunks)} run(s) ({max_parallel} en parallèle max) avec {ACTOR_ID}...")
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(chunks)))) as pool:
+            futures = {pool.submit(self._run_chunk, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    run = future.result()
+                except Exception as e:
+                    print(f"\n❌ ERREUR APIFY ({len(chunk)} URLs): {str(e)}")
+                    yield chunk, None, e
+                    continue
+                print(f"✅ [Apify] Run terminé (ID: {run['id']}, {len(chunk)} URLs)")
+                yield chunk, self.client.dataset(run["defaultDatasetId"]).iterate_items(), None
+
     def enrich_profiles(self, linkedin_urls):
         """
         Enrichit une liste d'URLs LinkedIn via Apify.
-        Retourne une liste de dictionnaires avec les données complètes.
+        Retourne une liste de dictionnaires avec les données complètes
+        (tout en mémoire : pour les gros volumes, préférer iter_chunks).
         """
-        if not linkedin_urls:
-            return []
-            
-        print(f"🚀 [Apify] Lancement du scraping pour {len(linkedin_urls)} profils avec {ACTOR_ID}...")
-        
-        # Configuration de l'input d'après la documentation (screenshots)
-        run_input = {
-            "profileUrls": linkedin_urls
-        }
-        
-        try:
-            # Lancer l'Actor et attendre la fin (synchrone pour l'instant)
-            run = self.client.actor(ACTOR_ID).call(run_input=run_input)
-        except Exception as e:
-            print(f"\n❌ ERREUR APIFY: {str(e)}")
-            raise e
-            
-        print(f"✅ [Apify] Run terminé (ID: {run['id']})")
-        
-        # Récupérer les résultats du dataset
         results = []
-        for item in self.client.dataset(run["defaultDatasetId"]).iterate_items():
-            results.append(item)
-            
+        errors = []
+        for _, items, error in self.iter_chunks(linkedin_urls):
+            if error:
+                errors.append(error)
+            else:
+                results.extend(items)
+        if errors and not results:
+            raise errors[0]
+
         print(f"📊 [Apify] {len(results)} résultats récupérés.")
         return results
 
-    def parse_result_to_db(self, item):
+    @staticmethod
+    def parse_result_to_db(item):
         """Transforme le JSON Apify au format attendu par notre DB"""
         
         # 1. Récupération des champs de base
@@ -104,6 +141,42 @@ class ApifyEnricher:
             'raw_data': json.dumps(item)
         }
 
+
+# Colonnes du prospect écrites depuis un item Apify (prospect_fields)
+PARSED_FIELDS = (
+    'summary', 'phone', 'location', 'skills', 'experiences', 'education', 'languages',
+    'connections_count', 'followers_count', 'is_premium', 'is_creator', 'is_verified',
+    'years_of_experience', 'company_size', 'industry',
+)
+KEPT_IF_EMPTY_FIELDS = ('email', 'profile_picture', 'headline')  # Valeur en base gardée si l'item n'en a pas
+PROSPECT_FIELDS = PARSED_FIELDS + KEPT_IF_EMPTY_FIELDS + ('full_name',)
+
+
+def raw_data_hash(raw_data: str) -> str:
+    """Empreinte du raw_data stocké (détecte un dump modifié depuis le dernier parsing)"""
+    return hashlib.sha1((raw_data or '').encode('utf-8')).hexdigest()
+
+
+def prospect_fields(item) -> dict:
+    """
+    Colonnes du prospect issues d'un item Apify (hors raw_data) : parse_result_to_db
+    + règles de fusion (email, photo, headline conservés si l'item n'en a pas ; nom complet).
+    Sans accès base ni client Apify : utilisable dans un process séparé.
+    """
+    data = ApifyEnricher.parse_result_to_db(item)
+    fields = {key: data[key] for key in PARSED_FIELDS}
+    for key in KEPT_IF_EMPTY_FIELDS:
+        if data[key]:
+            fields[key] = data[key]
+
+    first, last = item.get('firstName'), item.get('lastName')
+    full_name = f"{first} {last}" if first and last else item.get('fullName')
+    if full_name:
+        # Clean heuristique
+        fields['full_name'] = full_name.split('/')[0].strip() if '/' in full_name else full_name
+    return fields
+
+
 if __name__ == "__main__":
     # Test unitaire rapide
     enricher = ApifyEnricher()
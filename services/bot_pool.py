@@ -0,0 +1,242 @@
+"""
+Pool de sessions LinkedInBot persistantes (une par compte).
+
+Évite de relancer Chromium + injection cookie + vérification de session
+(10-20s) à chaque action : le bot est démarré une fois via LinkedInBot.start(),
+puis loué / rendu entre deux actions.
+
+Contrainte Playwright (API sync) : un navigateur ne peut être piloté que depuis
+le thread qui l'a créé. Le pool est donc prévu pour un seul thread (worker
+gunicorn sync, runner de campagnes). Un appel depuis un autre thread reçoit
+une session jetable, arrêtée au retour.
+"""
+
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+from .linkedin_bot import LinkedInBot
+
+# Raisons d'échec de acquire() (BotPool.last_error) : seule AUTH_FAILED met en cause le cookie
+AUTH_FAILED = 'auth_failed'          # LinkedIn a refusé la session (renvoi vers login/guest, cookie absent)
+START_FAILED = 'start_failed'        # Démarrage en échec pour une autre raison (réseau, proxy, navigateur)
+RECENT_FAILURE = 'recent_failure'    # Échec récent non relancé (raison d'origine dans _failures)
+POOL_FULL = 'pool_full'
+LEASED = 'leased'
+
+
+def _account_fingerprint(account) -> str:
+    """Empreinte des paramètres qui imposent un nouveau navigateur s'ils changent"""
+    parts = [
+        account.li_at_cookie or '',
+        account.proxy_url or '',
+        account.proxy_username or '',
+        account.proxy_password or '',
+        str(bool(account.proxy_enabled)),
+        account.user_agent or '',
+        account.security_settings or '',
+    ]
+    return hashlib.sha256('\x00'.join(parts).encode('utf-8')).hexdigest()
+
+
+class _PooledSession:
+    """Bot démarré + métadonnées de location"""
+
+    def __init__(self, bot, fingerprint):
+        self.bot = bot
+        self.fingerprint = fingerprint
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.leased = False
+        self.uses = 0
+
+
+class BotPool:
+    """Pool de bots chauds, authentifiés, indexés par Account.id"""
+
+    def __init__(self, headless: bool = True, max_contexts: int = 3, idle_timeout: float = 600, failure_ttl: float = 300):
+        self.headless = headless
+        self.max_contexts = max_contexts
+        self.idle_timeout = idle_timeout
+        self.failure_ttl = failure_ttl
+
+        self._sessions = {}  # account_id -> _PooledSession
+        self._failures = {}  # account_id -> (fingerprint, instant de l'échec, raison)
+        self.last_error = None  # Raison du dernier acquire() en échec (None si réussi)
+        self._ephemeral = set()  # id(bot) des sessions jetables (hors thread propriétaire)
+        self._owner_thread = None
+        self._lock = threading.Lock()
+
+    # --- Location -------------------------------------------------------
+
+    def acquire(self, account):
+        """
+        Louer le bot du compte (démarré si besoin).
+        Retourne None si la session ne peut pas être authentifiée ou si le pool est plein
+        (raison dans `last_error`).
+        """
+        self.last_error = None
+        if not self._claim_thread():
+            print("ℹ️ Pool utilisé hors de son thread, session jetable")
+            bot = self._start_bot(account)
+            if bot:
+                self._ephemeral.add(id(bot))
+            return bot
+
+        self.evict_idle()
+
+        fingerprint = _account_fingerprint(account)
+        entry = self._sessions.get(account.id)
+
+        if entry:
+            if entry.leased:
+                # Une seule action à la fois par compte
+                print(f"⚠️ Session du compte {account.id} déjà louée")
+                self.last_error = LEASED
+                return None
+            if entry.fingerprint != fingerprint:
+                self._close(account.id, "paramètres du compte modifiés")
+                entry = None
+            elif not entry.bot.is_alive():
+                self._close(account.id, "session morte ou expirée")
+                entry = None
+
+        if entry is None:
+            # Même cookie/config qui vient d'échouer : inutile de relancer un navigateur
+            failure = self._failures.get(account.id)
+            if failure and failure[0] == fingerprint and time.monotonic() - failure[1] < self.failure_ttl:
+                print(f"⏭️ Session du compte {account.id} en échec récent, pas de nouveau démarrage")
+                # Un refus du cookie reste un refus ; un échec transitoire n'est pas un cookie expiré
+                self.last_error = AUTH_FAILED if failure[2] == AUTH_FAILED else RECENT_FAILURE
+                return None
+
+            if not self._make_room():
+                print(f"❌ Pool plein ({self.max_contexts} navigateurs loués)")
+                self.last_error = POOL_FULL
+                return None
+
+            bot = self._start_bot(account)
+            if not bot:
+                self._failures[account.id] = (fingerprint, time.monotonic(), self.last_error)
+                return None
+
+            self._failures.pop(account.id, None)
+
+            entry = _PooledSession(bot, fingerprint)
+            self._sessions[account.id] = entry
+        else:
+            print(f"♻️ Réutilisation de la session chaude (compte {account.id})")
+
+        entry.leased = True
+        entry.uses += 1
+        entry.last_used = time.monotonic()
+        return entry.bot
+
+    def release(self, account_id, bot, healthy: bool = True):
+        """Rendre un bot au pool (healthy=False le ferme, ex: après une exception)"""
+        if id(bot) in self._ephemeral:
+            self._ephemeral.discard(id(bot))
+            bot.stop()
+            return
+
+        entry = self._sessions.get(account_id)
+        if not entry or entry.bot is not bot:
+            # Bot déjà évincé entre-temps
+            bot.stop()
+            return
+
+        entry.leased = False
+        entry.last_used = time.monotonic()
+
+        if not healthy or not bot.is_alive():
+            self._close(account_id, "rendu en mauvais état")
+
+    @contextmanager
+    def lease(self, account):
+        """Context manager: `with pool.lease(account) as bot:` (bot peut être None)"""
+        bot = self.acquire(account)
+        healthy = True
+        try:
+            yield bot
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            if bot:
+                self.release(account.id, bot, healthy=healthy)
+
+    # --- Maintenance ----------------------------------------------------
+
+    def evict_idle(self):
+        """Fermer les sessions inactives depuis plus de idle_timeout secondes"""
+        now = time.monotonic()
+        for account_id, entry in list(self._sessions.items()):
+            if not entry.leased and now - entry.last_used > self.idle_timeout:
+                self._close(account_id, "inactive")
+
+    def discard(self, account_id):
+        """Fermer la session d'un compte (ex: cookie mis à jour, compte supprimé)"""
+        entry = self._sessions.get(account_id)
+        if entry and not entry.leased:
+            self._close(account_id, "retirée")
+
+    def close_all(self):
+        """Arrêter tous les navigateurs du pool"""
+        for account_id in list(self._sessions.keys()):
+            self._close(account_id, "arrêt du pool")
+        with self._lock:
+            self._owner_thread = None
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            'max_contexts': self.max_contexts,
+            'sessions': [
+                {
+                    'account_id': account_id,
+                    'leased': entry.leased,
+                    'uses': entry.uses,
+                    'idle_seconds': round(now - entry.last_used, 1),
+                    'age_seconds': round(now - entry.created_at, 1),
+                }
+                for account_id, entry in self._sessions.items()
+            ]
+        }
+
+    # --- Interne --------------------------------------------------------
+
+    def _claim_thread(self) -> bool:
+        with self._lock:
+            if self._owner_thread is None:
+                self._owner_thread = threading.get_ident()
+            return self._owner_thread == threading.get_ident()
+
+    def _start_bot(self, account):
+        """Bot démarré et authentifié, ou None (raison dans last_error)"""
+        bot = LinkedInBot.from_account(account, headless=self.headless)
+        try:
+            if bot.start():
+                return bot
+            self.last_error = AUTH_FAILED if bot.auth_failed else START_FAILED
+        except Exception as e:
+            print(f"❌ Erreur démarrage bot (compte {account.id}): {e}")
+            bot.stop()
+            self.last_error = AUTH_FAILED if not bot.li_at_cookie else START_FAILED
+        return None
+
+    def _make_room(self) -> bool:
+        """Évincer la session libre la moins récemment utilisée si le cap est atteint"""
+        while len(self._sessions) >= self.max_contexts:
+            idle = [(entry.last_used, account_id) for account_id, entry in self._sessions.items() if not entry.leased]
+            if not idle:
+                return False
+            _, lru_account_id = min(idle)
+            self._close(lru_account_id, "cap max_contexts atteint")
+        return True
+
+    def _close(self, account_id, reason: str):
+        entry = self._sessions.pop(account_id, None)
+        if entry:
+            print(f"🧹 Fermeture session compte {account_id} ({reason})")
+            entry.bot.stop()
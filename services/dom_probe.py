@@ -0,0 +1,196 @@
+"""
+Sonde DOM des boutons d'action d'un profil LinkedIn, en un seul aller-retour.
+
+Chercher le bouton Connect avec des locators Playwright coûte un appel IPC par
+`count()`, `is_visible()` ou `inner_text()`, multiplié par les motifs FR/EN et
+les zones (carte, menu "Plus", modale, état Pending). Ici, un unique
+`page.evaluate(PROBE_SCRIPT)` relève tous les contrôles cliquables de la page,
+les marque d'un attribut `data-probe-handle` (poignée stable, re-ciblable par
+sélecteur CSS) et renvoie un instantané ; la décision est prise en Python par
+`classify_actions()`, sans autre appel au navigateur.
+"""
+
+import re
+
+HANDLE_ATTR = 'data-probe-handle'
+
+# États d'action d'un profil
+CONNECT = 'connect'                  # Connect visible sur la carte
+CONNECT_IN_MORE = 'connect_in_more'  # Connect caché dans le menu "Plus"
+PENDING = 'pending'                  # Invitation déjà en attente
+FOLLOW_ONLY = 'follow_only'          # Pas de Connect, Follow disponible
+MESSAGE_ONLY = 'message_only'        # Déjà en relation (Message seul)
+PREMIUM_GATED = 'premium_gated'      # Message réservé Premium (InMail)
+UNKNOWN = 'unknown'
+
+PROBE_SCRIPT = """
+() => {
+    const ATTR = '%s';
+    const SELECTOR = "button, a, div[role='button'], span[role='button'], li[role='menuitem']";
+    const norm = (s) => (s || '').replace(/\\s+/g, ' ').trim().slice(0, 120);
+    const isVisible = (el) => {
+        const r = el.getBoundingClientRect();
+        if (!r.width || !r.height) return false;
+        const st = getComputedStyle(el);
+        return st.visibility !== 'hidden' && st.display !== 'none' && parseFloat(st.opacity || '1') > 0;
+    };
+
+    document.querySelectorAll('[' + ATTR + ']').forEach((el) => el.removeAttribute(ATTR));
+
+    const main = document.querySelector('main') || document.body;
+    const card = main.querySelector('section') || main;
+    const zones = [
+        ['dialog', document.querySelectorAll("[role='dialog'], .artdeco-modal")],
+        ['dropdown', document.querySelectorAll('.artdeco-dropdown__content')],
+        ['card', [card]],
+        ['main', [main]],
+    ];
+
+    const seen = new Set();
+    const items = [];
+    for (const [zone, roots] of zones) {
+        for (const root of roots) {
+            for (const el of root.querySelectorAll(SELECTOR)) {
+                if (seen.has(el) || items.length >= 400) continue;
+                seen.add(el);
+                const handle = String(items.length);
+                el.setAttribute(ATTR, handle);
+                items.push({
+                    handle: handle,
+                    zone: zone,
+                    text: norm(el.innerText || el.textContent),
+                    aria: norm(el.getAttribute('aria-label')),
+                    href: el.getAttribute('href') || '',
+                    trigger: el.classList.contains('artdeco-dropdown__trigger'),
+                    visible: isVisible(el),
+                    disabled: !!el.disabled || el.getAttribute('aria-disabled') === 'true',
+                });
+            }
+        }
+    }
+    return items;
+}
+""" % HANDLE_ATTR
+
+# Motifs FR/EN : texte exact du contrôle, ou aria-label (fallback)
+TEXT_PATTERNS = {
+    'connect': re.compile(r"^(Connect|Se connecter)$", re.IGNORECASE),
+    'pending': re.compile(r"^(Pending|En attente)$", re.IGNORECASE),
+    'follow': re.compile(r"^(\+ ?)?(Follow|Suivre)$", re.IGNORECASE),
+    'message': re.compile(r"^(Message|Envoyer un message)$", re.IGNORECASE),
+    'add_note': re.compile(r"^(Add a note|Ajouter une note)$", re.IGNORECASE),
+    'send_without_note': re.compile(r"^(Send without a note|Envoyer sans note)$", re.IGNORECASE),
+    'send': re.compile(r"^(Send|Envoyer)$", re.IGNORECASE),
+}
+ARIA_PATTERNS = {
+    'connect': re.compile(r"^(Invite .+ to connect|Invitez .+ à rejoindre votre réseau)", re.IGNORECASE),
+    'pending': re.compile(r"Pending|En attente", re.IGNORECASE),
+    'more': re.compile(r"^(More actions|More|Plus d.actions|Plus)$", re.IGNORECASE),
+}
+PREMIUM_PATTERN = re.compile(r"Premium|InMail", re.IGNORECASE)
+
+# Contrôles de la modale d'invitation
+MODAL_KINDS = ('add_note', 'send_without_note', 'send')
+
+# Zone 'main' hors carte : "Autres profils consultés", "Vous connaissez peut-être"... leurs
+# Connect / Pending / Plus visent un autre membre. Seul Message y est retenu (dernier recours).
+MAIN_ZONE_KINDS = ('message',)
+
+
+def element_kind(item: dict):
+    """Nature d'un contrôle relevé par la sonde (None si sans intérêt)"""
+    text, aria = item.get('text', ''), item.get('aria', '')
+    if item.get('zone') == 'dialog':
+        for kind in MODAL_KINDS:
+            if TEXT_PATTERNS[kind].match(text):
+                return kind
+    for kind in ('connect', 'pending', 'follow', 'message'):
+        if TEXT_PATTERNS[kind].match(text):
+            return kind
+    for kind, pattern in ARIA_PATTERNS.items():
+        if pattern.search(aria):
+            return kind
+    if item.get('trigger') and item.get('zone') == 'card':
+        return 'more'
+    return None
+
+
+class ProfileActions:
+    """Instantané classé : état du profil + poignées des contrôles utiles"""
+
+    def __init__(self, state: str, handles: dict, modal_open: bool = False, premium: bool = False):
+        self.state = state
+        self.handles = handles
+        self.modal_open = modal_open
+        self.premium = premium
+
+    def selector(self, kind: str):
+        """Sélecteur CSS de la poignée d'un contrôle (None s'il n'a pas été vu)"""
+        handle = self.handles.get(kind)
+        return handle_selector(handle) if handle is not None else None
+
+    def __repr__(self):
+        return f"<ProfileActions {self.state} {sorted(self.handles)}>"
+
+
+def handle_selector(handle: str) -> str:
+    return f'[{HANDLE_ATTR}="{handle}"]'
+
+
+def classify_actions(items: list) -> ProfileActions:
+    """Décider de l'état d'action du profil à partir du relevé de PROBE_SCRIPT"""
+    visible = {}  # kind -> première poignée visible
+    hidden_connect = None
+    premium = False
+
+    for item in items or []:
+        kind = element_kind(item)
+        if kind is None or (item.get('disabled') and kind != 'pending'):
+            continue
+        if item.get('zone') == 'main' and kind not in MAIN_ZONE_KINDS:
+            continue
+        if item.get('visible'):
+            visible.setdefault(kind, item['handle'])
+            if kind == 'message' and (PREMIUM_PATTERN.search(item.get('aria', '')) or '/premium' in item.get('href', '')):
+                premium = True
+        elif kind == 'connect' and item.get('zone') == 'dropdown' and hidden_connect is None:
+            hidden_connect = item['handle']
+
+    modal_open = any(kind in visible for kind in MODAL_KINDS)
+    handles = dict(visible)
+
+    if 'pending' in visible:
+        state = PENDING
+    elif 'connect' in visible:
+        state = CONNECT
+    elif hidden_connect is not None and 'more' in visible:
+        state = CONNECT_IN_MORE
+        handles['connect'] = hidden_connect
+    elif 'follow' in visible:
+        state = FOLLOW_ONLY
+    elif 'message' in visible:
+        state = PREMIUM_GATED if premium else MESSAGE_ONLY
+    else:
+        state = UNKNOWN
+
+    return ProfileActions(state, handles, modal_open=modal_open, premium=premium)
+
+
+# Prédicats pour page.wait_for_function : rendent la main dès que l'état attendu est là
+DROPDOWN_OPEN_SCRIPT = """
+() => [...document.querySelectorAll('.artdeco-dropdown__content')]
+    .some((el) => el.getBoundingClientRect().height > 0)
+"""
+
+INVITE_RESPONSE_SCRIPT = """
+() => {
+    const shown = (el) => { const r = el.getBoundingClientRect(); return r.width > 0 && r.height > 0; };
+    if ([...document.querySelectorAll("[role='dialog'], .artdeco-modal")].some(shown)) return true;
+    const main = document.querySelector('main') || document.body;
+    const card = main.querySelector('section') || main;
+    return [...card.querySelectorAll("button, [role='button']")].some((el) => shown(el) && (
+        /^(Pending|En attente)$/i.test((el.innerText || '').trim())
+        || /Pending|En attente/i.test(el.getAttribute('aria-label') || '')
+    ));
+}
+"""
@@ -0,0 +1,44 @@
+"""
+Temporisation « humaine » des bots : budget de pauses par action.
+
+Les attentes techniques (chargement de page, ouverture d'un menu ou d'une
+modale) passent par des waits événementiels qui rendent la main dès que
+l'état attendu est là. Le jitter humain est séparé : de courtes pauses
+aléatoires entre deux gestes, prélevées sur un budget par action (connexion,
+message, vérification de session). Budget épuisé = plus de pause ajoutée.
+
+Les pauses entre deux actions (30-180s dans les runners) ne changent pas.
+
+Configuration par compte dans `Account.security_settings` :
+
+    "timing": {"pause_min": 0.3, "pause_max": 1.5, "action_budget": 6}
+"""
+
+import random
+
+DEFAULT_PAUSE_MIN = 0.3
+DEFAULT_PAUSE_MAX = 1.5
+DEFAULT_ACTION_BUDGET = 6.0  # secondes de pauses cumulées par action
+
+
+class HumanTiming:
+    """Tirage des pauses humaines d'une session, dans la limite du budget de l'action en cours"""
+
+    def __init__(self, security_settings: dict = None):
+        config = (security_settings or {}).get('timing') or {}
+        self.pause_min = float(config.get('pause_min', DEFAULT_PAUSE_MIN))
+        self.pause_max = float(config.get('pause_max', DEFAULT_PAUSE_MAX))
+        self.action_budget = float(config.get('action_budget', DEFAULT_ACTION_BUDGET))
+        self.remaining = self.action_budget
+
+    def start_action(self):
+        """Nouvelle action : budget rechargé"""
+        self.remaining = self.action_budget
+
+    def pause(self, min_sec: float = None, max_sec: float = None) -> float:
+        """Durée de la prochaine pause (secondes), plafonnée par le budget restant"""
+        low = self.pause_min if min_sec is None else min_sec
+        high = self.pause_max if max_sec is None else max_sec
+        delay = max(0.0, min(random.uniform(low, high), self.remaining))
+        self.remaining -= delay
+        return delay
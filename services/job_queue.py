@@ -0,0 +1,141 @@
+"""
+File de tâches persistante adossée à SQLite (table `jobs`).
+
+Le web ne fait qu'empiler des tâches (enqueue) et lire leur état ; worker.py
+les prend une par une (claim), publie leur progression et enchaîne les étapes
+d'un même pipeline (scrape -> enrich -> tag) via `pipeline_id`.
+
+Une tâche en échec repasse en file avec un backoff tant qu'il lui reste des
+tentatives, puis reste en 'failed' jusqu'à un retry manuel (/api/jobs/<id>/retry).
+Une tâche 'running' dont le worker ne donne plus signe de vie (heartbeat) est
+remise en file au démarrage suivant.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_
+
+from database.models import Job
+
+RETRY_BACKOFF_SECONDS = [30, 120, 600]
+STALE_AFTER_SECONDS = 300
+
+
+def enqueue(db, job_type: str, payload: dict = None, account_id: int = None, pipeline_id: int = None, max_attempts: int = 3) -> Job:
+    """Empiler une tâche (commit inclus). Sans pipeline_id, la tâche ouvre un nouveau pipeline."""
+    job = Job(
+        job_type=job_type,
+        account_id=account_id,
+        payload=json.dumps(payload or {}),
+        status='queued',
+        max_attempts=max_attempts,
+    )
+    db.add(job)
+    db.flush()
+    job.pipeline_id = pipeline_id or job.id
+    db.commit()
+    return job
+
+
+def claim_next(db, worker_id: str):
+    """
+    Prendre la plus ancienne tâche prête. Le passage queued -> running est un
+    UPDATE conditionnel : si un autre worker l'a prise entre-temps, on passe à la suivante.
+    """
+    now = datetime.utcnow()
+    candidates = db.query(Job.id).filter(
+        Job.status == 'queued',
+        or_(Job.run_after.is_(None), Job.run_after <= now)
+    ).order_by(Job.id).limit(5).all()
+
+    for (job_id,) in candidates:
+        claimed = db.query(Job).filter(Job.id == job_id, Job.status == 'queued').update({
+            Job.status: 'running',
+            Job.locked_by: worker_id,
+            Job.started_at: now,
+            Job.heartbeat_at: now,
+            Job.attempts: Job.attempts + 1,
+            Job.error: None,
+        }, synchronize_session=False)
+        db.commit()
+        if claimed:
+            return db.query(Job).get(job_id)
+    return None
+
+
+def update_progress(db, job: Job, progress: int, message: str = None):
+    """Publier l'avancement (sert aussi de heartbeat)"""
+    job.progress = max(0, min(100, int(progress)))
+    if message is not None:
+        job.progress_message = message
+    job.heartbeat_at = datetime.utcnow()
+    db.commit()
+
+
+def complete(db, job: Job, result: dict = None):
+    job.status = 'done'
+    job.progress = 100
+    job.result = json.dumps(result or {})
+    job.finished_at = datetime.utcnow()
+    job.locked_by = None
+    db.commit()
+
+
+def fail(db, job: Job, error: str):
+    """Échec d'une tentative : nouvelle tentative différée, ou 'failed' définitif"""
+    job.error = error
+    job.locked_by = None
+    if (job.attempts or 0) < (job.max_attempts or 1):
+        delay = RETRY_BACKOFF_SECONDS[min(job.attempts - 1, len(RETRY_BACKOFF_SECONDS) - 1)]
+        job.status = 'queued'
+        job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+        job.progress_message = f"Retry in {delay}s ({job.attempts}/{job.max_attempts})"
+    else:
+        job.status = 'failed'
+        job.finished_at = datetime.utcnow()
+    db.commit()
+
+
+def retry(db, job: Job):
+    """Relancer manuellement une tâche en échec (compteur de tentatives remis à zéro)"""
+    job.status = 'queued'
+    job.attempts = 0
+    job.run_after = None
+    job.error = None
+    job.progress = 0
+    job.progress_message = None
+    job.finished_at = None
+    db.commit()
+
+
+def requeue_stale(db, stale_after: int = STALE_AFTER_SECONDS) -> int:
+    """Remettre en file les tâches 'running' abandonnées (worker tué en cours de route)"""
+    limit = datetime.utcnow() - timedelta(seconds=stale_after)
+    count = db.query(Job).filter(
+        Job.status == 'running',
+        or_(Job.heartbeat_at.is_(None), Job.heartbeat_at < limit)
+    ).update({
+        Job.status: 'queued',
+        Job.locked_by: None,
+        Job.progress_message: 'Requeued after worker interruption',
+    }, synchronize_session=False)
+    db.commit()
+    return count
+
+
+def job_to_dict(job: Job) -> dict:
+    return {
+        'id': job.id,
+        'pipeline_id': job.pipeline_id,
+        'type': job.job_type,
+        'status': job.status,
+        'progress': job.progress or 0,
+        'message': job.progress_message,
+        'error': job.error,
+        'attempts': job.attempts or 0,
+        'max_attempts': job.max_attempts,
+        'result': json.loads(job.result) if job.result else None,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
@@ -9,8 +9,75 @@ import time
 import random
 import json
 import re
-from urllib.parse import urlparse
+from urllib.parse import urlparse, unquote
 from .proxy_manager import ProxyManager
+from .resource_policy import ResourcePolicy, ResourceStats
+from .dom_probe import (
+    PROBE_SCRIPT, DROPDOWN_OPEN_SCRIPT, INVITE_RESPONSE_SCRIPT,
+    classify_actions, CONNECT, PENDING, MESSAGE_ONLY, PREMIUM_GATED,
+)
+from .human_timing import HumanTiming
+from .profile_snapshot import SNAPSHOT_SCRIPT, parse_snapshot
+from database.handles import canonical_handle
+
+# Fin de la vérification de session : feed atteint ou renvoi vers login
+SESSION_SETTLED_URL = re.compile(r"/feed|/login|authwall|guest|checkpoint")
+PROFILE_READY = "main section"
+MESSAGE_EDITOR = "input[name='subject'], div.msg-form__contenteditable, div[role='textbox']"
+
+# Capture réseau de l'ID membre : réponse Voyager de résolution du profil visité (memberIdentity=<vanity>)
+MEMBER_IDENTITY = re.compile(r"memberIdentity[:=]([^&,)]+)")
+PROFILE_URN = re.compile(r"^urn:li:fsd_profile:([A-Za-z0-9_-]+)$")
+
+
+def lookup_identity(url: str):
+    """Vanity name résolu par une requête Voyager memberIdentity (None pour toute autre requête)"""
+    if '/voyager/api/' not in url:
+        return None
+    match = MEMBER_IDENTITY.search(unquote(url))
+    return unquote(match.group(1)).strip().lower() if match else None
+
+
+def profile_id_from_lookup(body, handle: str):
+    """
+    ID membre de l'entité profil dont le publicIdentifier est `handle` dans la réponse
+    memberIdentity. Les autres profils de la réponse (compte connecté, suggestions) sont ignorés.
+    """
+    stack = [body]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if str(node.get('publicIdentifier') or '').lower() == handle:
+                match = PROFILE_URN.match(str(node.get('entityUrn') or ''))
+                if match:
+                    return match.group(1)
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return None
+
+def account_bot_kwargs(account) -> dict:
+    """Paramètres de bot d'un Account (cookie, proxy, UA, sécurité), communs aux bots sync et async"""
+    proxy_config = None
+    if account.proxy_url and account.proxy_enabled:
+        proxy_config = {
+            'server': account.proxy_url,
+            'username': account.proxy_username,
+            'password': account.proxy_password
+        }
+
+    try:
+        security_settings = json.loads(account.security_settings) if account.security_settings else {}
+    except ValueError:
+        security_settings = {}
+
+    return {
+        'li_at_cookie': account.li_at_cookie,
+        'proxy_config': proxy_config,
+        'user_agent': account.user_agent,
+        'security_settings': security_settings,
+    }
+
 
 class LinkedInBot:
     """Bot d'automatisation LinkedIn avec authentification cookie"""
@@ -30,6 +97,26 @@ class LinkedInBot:
         self.typing_speed = self.security_settings.get('typing_speed', {'min': 50, 'max': 150})
         self.mouse_speed = self.security_settings.get('mouse_speed', 'medium')
         self.human_scroll = self.security_settings.get('human_scroll', True)
+        self.timing = HumanTiming(self.security_settings)
+        # Relevé de la carte du profil visité (opt-in, cf. services/profile_snapshot.py)
+        self.profile_capture = self.security_settings.get('profile_capture', False)
+        self.last_profile_snapshot = None
+
+        # Blocage des ressources lourdes / tracking (politique selon l'action en cours)
+        self.resource_action = 'browse'
+        self.resource_stats = ResourceStats()
+        self._resource_policies = {}
+        self._cdp = None  # Session CDP de la page (interception Fetch), ouverte si une politique est active
+        self._fetch_patterns = []
+
+        # ID membre du dernier profil visité (capturé sur le réseau, sinon extrait du code source)
+        self._expected_handle = None
+        self._network_profile_id = None
+        self.last_profile_id = None
+
+        # True si la vérification de session a été renvoyée vers login/guest (cookie refusé),
+        # False pour tout autre échec de démarrage (réseau, proxy, navigateur)
+        self.auth_failed = False
         
         self.playwright = None
         self.browser = None
@@ -39,7 +126,25 @@ class LinkedInBot:
         if not self.li_at_cookie:
             # On ne lève pas d'erreur ici pour permettre l'import, mais start() échouera
             print("⚠️ LINKEDIN_LI_AT_COOKIE non configuré")
-    
+
+    @classmethod
+    def from_account(cls, account, headless: bool = True):
+        """Construire un bot à partir d'un Account (cookie, proxy, UA, sécurité)"""
+        return cls(headless=headless, **account_bot_kwargs(account))
+
+    def is_alive(self) -> bool:
+        """Vérifier (sans navigation) que le navigateur et la page sont toujours utilisables"""
+        try:
+            if not self.browser or not self.browser.is_connected():
+                return False
+            if not self.page or self.page.is_closed():
+                return False
+            # Session expirée pendant l'inactivité -> LinkedIn redirige vers login/authwall
+            url = self.page.url
+            return '/login' not in url and 'authwall' not in url and 'guest' not in url
+        except Exception:
+            return False
+
     def start(self):
         """Démarrer le navigateur avec cookie de session"""
         if not self.li_at_cookie:
@@ -81,6 +186,8 @@ class LinkedInBot:
         self._inject_cookie()
         
         self.page = self.context.new_page()
+        self.page.on('response', self._capture_profile_response)
+        self._apply_resource_policy()
         
         # Vérifier que le cookie fonctionne
         if self._verify_session():
@@ -93,6 +200,8 @@ class LinkedInBot:
             
     def stop(self):
         """Arrêter le navigateur"""
+        if self.resource_stats.blocked:
+            print(f"📉 Réseau: {self.resource_stats}")
         try:
             if self.browser:
                 self.browser.close()
@@ -102,10 +211,66 @@ class LinkedInBot:
             self.playwright = None
             self.context = None
             self.page = None
+            self._cdp = None
+            self._fetch_patterns = []
         except:
             pass
         print("🛑 Bot arrêté")
 
+    def _resource_policy(self) -> ResourcePolicy:
+        if self.resource_action not in self._resource_policies:
+            self._resource_policies[self.resource_action] = ResourcePolicy.from_settings(self.security_settings, self.resource_action)
+        return self._resource_policies[self.resource_action]
+
+    def set_resource_action(self, action: str):
+        """Changer de parcours ('browse', 'connect', 'message') et de politique de blocage"""
+        self.resource_action = action
+        self._apply_resource_policy()
+
+    def _apply_resource_policy(self):
+        """Motifs d'interception Fetch (CDP) de la politique en cours ; aucune interception si désactivée"""
+        if not self.page:
+            return
+        patterns = self._resource_policy().fetch_patterns()
+        if patterns == self._fetch_patterns:
+            return
+        try:
+            if self._cdp is None:
+                self._cdp = self.context.new_cdp_session(self.page)
+                self._cdp.on('Fetch.requestPaused', self._handle_paused)
+            if patterns:
+                self._cdp.send('Fetch.enable', {'patterns': patterns})
+            else:
+                self._cdp.send('Fetch.disable')
+            self._fetch_patterns = patterns
+        except Exception as e:
+            print(f"⚠️ Blocage des ressources indisponible: {e}")
+
+    def _handle_paused(self, event):
+        """Requête interceptée : abandon si inutile au parcours en cours, sinon poursuite"""
+        resource_type = event.get('resourceType', 'Other').lower()
+        try:
+            if self._resource_policy().should_block(resource_type, event['request']['url']):
+                self.resource_stats.record_blocked(resource_type)
+                self._cdp.send('Fetch.failRequest', {'requestId': event['requestId'], 'errorReason': 'BlockedByClient'})
+            else:
+                self.resource_stats.record_allowed()
+                self._cdp.send('Fetch.continueRequest', {'requestId': event['requestId']})
+        except Exception:
+            pass  # Page fermée ou requête annulée entre-temps
+
+    def _capture_profile_response(self, response):
+        # Seule la résolution du handle visité compte (pas le compte connecté ni les suggestions)
+        if self._network_profile_id is not None or not self._expected_handle:
+            return
+        if lookup_identity(response.url) != self._expected_handle:
+            return
+        try:
+            body = response.json()
+        except Exception:
+            return
+        self._network_profile_id = profile_id_from_lookup(body, self._expected_handle)
+
     def _inject_cookie(self):
         """Injecter le cookie li_at de manière robuste"""
         clean_cookie_value = self.li_at_cookie.strip().replace('"', '')
@@ -129,11 +294,13 @@ class LinkedInBot:
     def _verify_session(self) -> bool:
         """Vérifier que la session est valide avec gestion retry"""
         print("🔐 Vérification de la session...")
+        self.timing.start_action()
         
         try:
             # Essayer d'aller sur la homepage d'abord, moins sujet aux redirects loops que /feed direct
             response = self.page.goto('https://www.linkedin.com/', wait_until='domcontentloaded', timeout=30000)
-            self._random_delay(2, 3)
+            self._wait_for(url=SESSION_SETTLED_URL, timeout=3000)
+            self._human_pause()
             
             current_url = self.page.url
             
@@ -146,7 +313,7 @@ class LinkedInBot:
             if 'linkedin.com' in current_url and '/login' not in current_url:
                 print("➡️ Navigation explicite vers /feed...")
                 self.page.goto('https://www.linkedin.com/feed/', wait_until='domcontentloaded')
-                self._random_delay(2, 3)
+                self._wait_for(url=SESSION_SETTLED_URL, timeout=3000)
                 
                 if '/feed' in self.page.url:
                     print("✅ Session valide après navigation")
@@ -155,6 +322,7 @@ class LinkedInBot:
             # Vérification finale
             if '/login' in self.page.url or 'guest' in self.page.url:
                  print(f"❌ Redirection vers login/guest : {self.page.url}")
+                 self.auth_failed = True
                  return False
             
             # Par défaut on assume OK si on n'est pas sur login
@@ -168,16 +336,34 @@ class LinkedInBot:
         """Visiter un profil"""
         try:
             print(f"👁️ Visite: {profile_url}")
+            self._expected_handle = canonical_handle(profile_url)
+            self._network_profile_id = None
+            self.last_profile_snapshot = None
             self.page.goto(profile_url, wait_until='domcontentloaded')
-            self._random_delay(3, 6)
+            if self._wait_for(selector=PROFILE_READY, timeout=15000) and self.profile_capture:
+                self.last_profile_snapshot = self._snapshot_profile()
+            self._human_pause()
             self.smart_scroll() # Simulation lecture profil
             return True
         except Exception as e:
             print(f"❌ Erreur visite: {e}")
             return False
 
+    def _snapshot_profile(self) -> dict:
+        """Nom, titre, entreprise, localisation et degré depuis la carte du profil ouvert"""
+        try:
+            return parse_snapshot(self.page.evaluate(SNAPSHOT_SCRIPT))
+        except Exception as e:
+            print(f"⚠️ Relevé du profil impossible: {e}")
+            return None
+
     def _extract_profile_id(self) -> str:
-        """Extraire l'ID du profil depuis le code source de la page"""
+        """ID du profil : capturé dans les réponses réseau du chargement, sinon extrait du code source"""
+        if self._network_profile_id:
+            print(f"🆔 ID capturé sur le réseau : {self._network_profile_id}")
+            return self._network_profile_id
+
+        # Fallback coûteux : tout le DOM transite par le pipe Playwright
         try:
             # 1. Chercher dans l'URL si elle contient l'ID (rare mais possible)
             # ex: unknown
@@ -215,9 +401,33 @@ class LinkedInBot:
             print(f"❌ Erreur extraction ID: {e}")
             return None
 
+    def _probe_actions(self):
+        """Relever et classer les boutons d'action du profil (un seul aller-retour navigateur)"""
+        return classify_actions(self.page.evaluate(PROBE_SCRIPT))
+
     def _random_delay(self, min_sec: float = 1, max_sec: float = 3):
         time.sleep(random.uniform(min_sec, max_sec))
 
+    def _human_pause(self, min_sec: float = None, max_sec: float = None):
+        """Pause humaine prélevée sur le budget de l'action en cours (cf. HumanTiming)"""
+        time.sleep(self.timing.pause(min_sec, max_sec))
+
+    def _wait_for(self, selector: str = None, predicate: str = None, url=None, state: str = 'visible', timeout: int = 10000) -> bool:
+        """
+        Attendre un élément (selector), un état JS (predicate) ou une URL.
+        Rend la main dès que la condition est remplie ; False au timeout.
+        """
+        try:
+            if selector:
+                self.page.wait_for_selector(selector, state=state, timeout=timeout)
+            elif predicate:
+                self.page.wait_for_function(predicate, timeout=timeout)
+            elif url:
+                self.page.wait_for_url(url, wait_until='commit', timeout=timeout)
+            return True
+        except Exception:
+            return False
+
     def human_type(self, selector: str, text: str):
         """Simuler une frappe humaine avec vitesse variable et fautes (optionnel)"""
         try:
@@ -261,8 +471,16 @@ class LinkedInBot:
             print(f"⚠️ Erreur smart_scroll: {e}")
 
 
-    def send_connection_request(self, profile_url: str, message: str = None) -> bool:
-        """Envoyer une demande de connexion (Support FR/EN)"""
+    def send_connection_request(self, profile_url: str, message: str = None, profile_id: str = None) -> bool:
+        """
+        Envoyer une demande de connexion (Support FR/EN).
+        `profile_id` : ID membre déjà connu (Prospect.linkedin_urn), évite l'extraction.
+        `self.last_profile_id` expose l'ID à mettre en cache : l'ID connu, ou celui de la
+        réponse memberIdentity du profil visité (jamais un ID trouvé dans le code source).
+        """
+        self.set_resource_action('connect')
+        self.timing.start_action()
+        self.last_profile_id = None
         try:
             if not self.visit_profile(profile_url):
                 return False
@@ -270,7 +488,9 @@ class LinkedInBot:
             print("🤝 Tentative de connexion...")
             
             # --- STRATÉGIE 1 : URL DIRECTE (Seulement si ID numérique) ---
-            profile_id = self._extract_profile_id()
+            known_id = profile_id
+            profile_id = profile_id or self._extract_profile_id()
+            self.last_profile_id = known_id or self._network_profile_id
             
             # Pour l'instant, la navigation directe via normGuestID ne fonctionne fiable qu'avec des ID numériques
             # Les ID fs_profile (ACo...) nécessitent une autre URL ou le clic UI
@@ -279,231 +499,103 @@ class LinkedInBot:
                 print(f"🔗 Navigation directe vers URL d'invitation (ID Numeric): {invite_url}")
                 try:
                     self.page.goto(invite_url, wait_until='domcontentloaded')
-                    self._random_delay(2, 4)
+                    self._wait_for(selector=PROFILE_READY, timeout=10000)
                 except Exception as e:
                     print(f"⚠️ Erreur navigation directe: {e}")
             elif profile_id:
                  print(f"ℹ️ ID non-numérique détecté ({profile_id}), bascule vers clic UI standard.")
 
-            # --- STRATÉGIE 2 : UI CLICK (Robust Text-Based) ---
+            # --- STRATÉGIE 2 : UI CLICK (sonde DOM, un seul evaluate par état) ---
             print("🖱️ Recherche du bouton Connect dans l'interface...")
-            
-            connect_btn = None
-            
-            # Recherche globale scopée au Main pour éviter header/footer
-            # On cherche des boutons ou liens qui contiennent exactement "Connect" ou "Se connecter"
-            # Note: Les classes artdeco-button / pv-top-card semblent absentes/obfusqués sur certains profils
-            
-            main_loc = self.page.locator("main").first
-            if not main_loc.is_visible():
-                main_loc = self.page.locator("body") 
-
-            # Liste prioritaire de sélécteurs textuels
-            text_patterns = [
-                re.compile(r"^Connect$", re.IGNORECASE), 
-                re.compile(r"^Se connecter$", re.IGNORECASE)
-            ]
-            
-            # 1. Recherche boutons/liens directs
-            for pattern in text_patterns:
-                # On cherche button, a, ou div[role='button']
-                candidates = main_loc.locator("button, a, div[role='button']").filter(has_text=pattern)
-                count = candidates.count()
-                
-                for i in range(count):
-                    candidate = candidates.nth(i)
-                    if candidate.is_visible():
-                        # Vérifier que ce n'est pas un bouton "Message" ou autre avec le texte dedans par hasard
-                        # On vérifie le texte exact via evaluate pour être sûr
-                        text = candidate.inner_text().strip()
-                        if re.match(pattern, text):
-                            connect_btn = candidate
-                            print(f"✅ Bouton Connect trouvé par texte ({text})")
-                            break
-                if connect_btn: break
-            
-            # 2. Si pas trouvé, chercher dans le menu "Plus"
-            # --- 2. Recherche du bouton Connect (SCOPÉ) ---
-            print("🖱️ Recherche du bouton Connect dans l'interface...")
-            
-            # On définit la zone de recherche principale (Profile Card)
-            main_profile_card = self.page.locator("main section").first
-            connect_btn = None
-            
-            # Stratégie 1: Bouton direct dans la card principale
-            # On cherche "Connect" ou "Se connecter"
-            # Note: On exclut les boutons "Message" ou "More" qui pourraient contenir "Connect" dans des attributs cachés
-            primary_btn = main_profile_card.locator("button, a").filter(has_text=re.compile(r"^(Connect|Se connecter)$", re.IGNORECASE)).first
-            
-            if primary_btn.is_visible():
-                connect_btn = primary_btn
-                print("✅ Bouton Connect trouvé (Principal)")
-            
-            # Stratégie 2: Menu "More" / "Plus"
-            if not connect_btn:
-                # Le bouton "More" est souvent le dernier de la liste d'actions
-                more_btn = main_profile_card.locator("button[aria-label*='More'], button[aria-label*='Plus']").first
-                if not more_btn.is_visible():
-                     # Fallback selecteur générique pour le bouton "..."
-                     more_btn = main_profile_card.locator(".artdeco-dropdown__trigger").first
-                
-                if more_btn.is_visible():
-                    print("ℹ️ Connect absent, vérification du menu 'Plus'...")
-                    try:
-                        more_btn.click()
-                        self._random_delay(0.5, 1)
-                        
-                        # Le menu s'ouvre souvent dans un layer global (.artdeco-dropdown__content)
-                        # On doit chercher dans le document entier, mais filtrer par texte strict
-                        dropdown_opts = self.page.locator("div.artdeco-dropdown__content div[role='button'], div.artdeco-dropdown__content a").filter(has_text=re.compile(r"^(Connect|Se connecter)$", re.IGNORECASE))
-                        
-                        # On prend le premier visible
-                        for i in range(dropdown_opts.count()):
-                            opt = dropdown_opts.nth(i)
-                            if opt.is_visible():
-                                connect_btn = opt
-                                print("✅ Bouton Connect trouvé dans le menu Plus")
-                                break
-                    except Exception as e:
-                        print(f"⚠️ Erreur menu Plus: {e}")
-
-            # Stratégie 3: Gestion des états déjà connectés/pending (Evite les faux positifs)
-            if not connect_btn:
-                 # Si on voit "Message" en bouton principal et PAS de connect, c'est souvent qu'on est déjà connecté ou pending
-                 # Mais on laisse la suite du code (Follow) gérer ça.
-                 pass     # --- 3. Clic et Validation ---
-            # --- 3. Clic et Validation ---
-            if connect_btn and connect_btn.is_visible():
-                print("🖱️ Smart Click (Suppression href pour éviter navigation)...")
-                
-                # Hack anti-white-page: On supprime l'attribut href pour empêcher la navigation
-                # et forcer l'usage du gestionnaire d'événement JS (React/Ember)
+            actions = self._probe_actions()
+            print(f"🔎 État du profil: {actions.state}")
+
+            if actions.state == PENDING:
+                print("✅ Invitation déjà en attente (Pending)")
+                return (True, 'connected')
+
+            # Connect absent de la carte : on ouvre le menu "Plus" puis on re-sonde
+            if actions.state != CONNECT and actions.selector('more'):
+                print("ℹ️ Connect absent, vérification du menu 'Plus'...")
+                try:
+                    self.page.locator(actions.selector('more')).click()
+                    self._wait_for(predicate=DROPDOWN_OPEN_SCRIPT, timeout=5000)
+                    self._human_pause(0.2, 0.8)
+                    actions = self._probe_actions()
+                except Exception as e:
+                    print(f"⚠️ Erreur menu Plus: {e}")
+
+            if actions.state == CONNECT:
+                connect_btn = self.page.locator(actions.selector('connect'))
                 connect_btn.scroll_into_view_if_needed()
-                
-                # Tentative ultime : Navigation au clavier (Humain)
-                if connect_btn:
-                    # Si on a ciblé l'SVG (connect-small), on doit remonter au bouton parent pour le focus
-                    try:
-                        is_svg = connect_btn.evaluate("el => el.tagName.toLowerCase() === 'svg' || el.id === 'connect-small'")
-                        if is_svg:
-                            print("🔍 SVG détecté, remonte au parent <button> ou <a>...")
-                            connect_btn = connect_btn.locator("xpath=..")
-                    except Exception as e:
-                        print(f"Check SVG warning: {e}")
-
-                    # Debug: Afficher ce qu'on va cliquer
-                    try:
-                        html_snapshot = connect_btn.evaluate("el => el.outerHTML")
-                        print(f"🎯 CIBLAGE: {html_snapshot[:150]}...") 
-                    except:
-                        pass
 
-                    print("⌨️ Entrée Clavier (Focus + Enter)...")
-                    try:
-                        connect_btn.focus()
-                        self._random_delay(0.2, 0.5)
-                        self.page.keyboard.press("Enter")
-                    except Exception as e:
-                        print(f"Keyboard press failed: {e}. Fallback to JS click.")
-                        self.page.evaluate("(element) => element.click()", connect_btn.element_handle())
-                
-                self._random_delay(2, 4) # Attendre que la modale s'ouvre ou que l'état change
-                
-                # --- 4. Gestion de la Modale (PRIORITAIRE) ---
-                print("🔍 Recherche de la modale d'envoi...")
-                
-                # Sélecteurs pour la modale via TEXTE (plus robuste que aria-label)
-                # Bouton "Ajouter une note"
-                add_note_btn = self.page.locator("button, div[role='button']").filter(has_text=re.compile(r"^(Add a note|Ajouter une note)$", re.IGNORECASE)).first
-                
-                # Bouton "Envoyer sans note"
-                send_now_btn = self.page.locator("button, div[role='button']").filter(has_text=re.compile(r"^(Send without a note|Envoyer sans note)$", re.IGNORECASE)).first
-                
-                # Si non trouvé, fallback partiel (contains)
-                if not add_note_btn.is_visible():
-                     add_note_btn = self.page.locator("button").filter(has_text="Ajouter une note").first
-                     if not add_note_btn.is_visible():
-                         add_note_btn = self.page.locator("button").filter(has_text="Add a note").first
-
-                if not send_now_btn.is_visible():
-                    send_now_btn = self.page.locator("button").filter(has_text="Envoyer sans note").first
-                    if not send_now_btn.is_visible():
-                        send_now_btn = self.page.locator("button").filter(has_text="Send without a note").first
-                
-                # Si des boutons de modale sont visibles, on DOIT les traiter, peu importe le statut Pending du background
-                if add_note_btn.is_visible() or send_now_btn.is_visible():
+                print("⌨️ Entrée Clavier (Focus + Enter)...")
+                try:
+                    connect_btn.focus()
+                    self._human_pause(0.2, 0.5)
+                    self.page.keyboard.press("Enter")
+                except Exception as e:
+                    print(f"Keyboard press failed: {e}. Fallback to JS click.")
+                    connect_btn.evaluate("el => el.click()")
+
+                # Attendre que la modale s'ouvre ou que l'état passe en Pending
+                self._wait_for(predicate=INVITE_RESPONSE_SCRIPT, timeout=8000)
+                self._human_pause()
+
+                # --- Modale d'invitation (prioritaire sur l'état Pending du fond) ---
+                after = self._probe_actions()
+                if after.modal_open:
                     print("✅ Modale détectée. Traitement...")
-                    
-                    invite_sent = False
                     # IMPORTANT: On ignore le message, on envoie TOUJOURS sans note (demande user)
                     if message:
                         print("⚠️ Message fourni mais ignoré (Mode Send Without Note forcé).")
 
-                    if send_now_btn.is_visible():
-                        print("🚀 Envoi sans note...")
-                        send_now_btn.click()
-                        invite_sent = True
-                    else:
-                        # Fallback Send dans modale
-                        send_btn = self.page.locator("div[role='dialog'] button").filter(has_text=re.compile(r"^(Envoyer|Send)$", re.IGNORECASE)).first
-                        if send_btn.is_visible():
-                            print("🚀 Envoi (Bouton générique modale)...")
-                            send_btn.click()
-                            invite_sent = True
-
-                    if invite_sent:
-                        print("✅ Invitation envoyée avec succès (via Modale)")
-                        self._random_delay(1, 2)
-                        return (True, 'connected')
-                    else:
+                    send_selector = after.selector('send_without_note') or after.selector('send')
+                    if not send_selector:
                         print("❌ Impossible de cliquer sur Envoyer (Boutons introuvables)")
                         return (False, 'failed')
 
-                # --- 3b (Fallback). Vérification 'Pending' (Si PAS de modale détectée) ---
-                print("🔍 Modale non détectée. Vérification de l'état 'Pending' (Succès immédiat?)...")
-                
-                pending_patterns = [
-                    re.compile(r"^Pending$", re.IGNORECASE),
-                    re.compile(r"^En attente$", re.IGNORECASE)
-                ]
-                
-                for pattern in pending_patterns:
-                    if main_loc.locator("button, div, span").filter(has_text=pattern).first.is_visible():
-                        print(f"✅ État PENDING détecté ! Invitation envoyée avec succès.")
-                        return (True, 'connected')
-                        
-                if main_loc.locator("button[aria-label*='Pending'], button[aria-label*='En attente']").first.is_visible():
-                     print(f"✅ État PENDING détecté (aria-label) ! Invitation envoyée.")
-                     return (True, 'connected')
-                
+                    print("🚀 Envoi sans note...")
+                    self.page.locator(send_selector).click()
+                    print("✅ Invitation envoyée avec succès (via Modale)")
+                    self._wait_for(selector="[role='dialog']", state='hidden', timeout=5000)
+                    return (True, 'connected')
+
+                if after.state == PENDING:
+                    print("✅ État PENDING détecté ! Invitation envoyée avec succès.")
+                    return (True, 'connected')
+
                 print("❌ Échec : Pas de modale et pas de passage en Pending.")
                 return (False, 'failed')
 
-            else:
-                # Si Connect n'est pas trouvé, on cherche FOLLOW
-                print("⚠️ Bouton 'Connect' introuvable. Recherche bouton 'Follow'...")
-                follow_btn = main_loc.locator("button, div[role='button']").filter(has_text=re.compile(r"^(Follow|Suivre)$", re.IGNORECASE)).first
-                
-                if follow_btn.is_visible():
-                     print("➕ Bouton Follow trouvé ! Clic...")
-                     try:
-                        follow_btn.click()
-                        self._random_delay(1, 2)
-                        print("✅ Suivi effectué (Followed)")
-                        return (True, 'followed')
-                     except Exception as e:
-                        print(f"❌ Erreur click Follow: {e}")
-                        return (False, 'failed')
+            # Si Connect n'est pas trouvé, on cherche FOLLOW
+            if actions.selector('follow'):
+                print("➕ Bouton Follow trouvé ! Clic...")
+                try:
+                    self.page.locator(actions.selector('follow')).click()
+                    self._human_pause()
+                    print("✅ Suivi effectué (Followed)")
+                    return (True, 'followed')
+                except Exception as e:
+                    print(f"❌ Erreur click Follow: {e}")
+                    return (False, 'failed')
 
+            if actions.state == PREMIUM_GATED:
+                print("❌ Ni Connect ni Follow : message réservé Premium (InMail)")
+            elif actions.state == MESSAGE_ONLY:
+                print("❌ Ni Connect ni Follow trouvés (déjà connecté)")
+            else:
                 print("❌ Ni Connect ni Follow trouvés (déjà connecté ?)")
-                return (False, 'failed')
-                
+            return (False, 'failed')
+
         except Exception as e:
             print(f"❌ Erreur connexion: {e}")
             return (False, 'failed')
 
     def send_message(self, profile_url: str, message: str) -> bool:
         """Envoyer un DM à une relation existante"""
+        self.set_resource_action('message')
+        self.timing.start_action()
         try:
             if not self.visit_profile(profile_url):
                 return False
@@ -550,18 +642,12 @@ class LinkedInBot:
                 except:
                     pass
                 
-                # Attendre que la page soit stable
-                try:
-                    self.page.wait_for_load_state("networkidle", timeout=5000)
-                except:
-                    pass
-                
-                # Scroll et focus avant de cliquer
+                # Scroll et focus avant de cliquer (le bouton est déjà visible : pas d'attente réseau)
                 try:
                     msg_btn.scroll_into_view_if_needed()
-                    self._random_delay(0.8, 1.2)
+                    self._human_pause()
                     msg_btn.focus()
-                    self._random_delay(0.5, 0.8)
+                    self._human_pause(0.2, 0.6)
                 except:
                     pass
                 
@@ -614,7 +700,8 @@ class LinkedInBot:
                     print("❌ Impossible de cliquer sur le bouton Message après 5 tentatives")
                     return False
                 
-                self._random_delay(1, 2)
+                # Éditeur ou popup (Premium) : on reprend dès que l'un des deux s'affiche
+                self._wait_for(selector=f"{MESSAGE_EDITOR}, div[role='dialog']", timeout=10000)
                 
                 # --- 2. Détection de la popup Premium (Blocker) ---
                 print("🔍 Vérification popup Premium...")
@@ -641,7 +728,7 @@ class LinkedInBot:
                 
                 # Attendre l'apparition de l'un des éléments clés (Sujet ou Body)
                 try:
-                     self.page.wait_for_selector("input[name='subject'], div.msg-form__contenteditable, div[role='textbox']", timeout=10000)
+                     self.page.wait_for_selector(MESSAGE_EDITOR, timeout=10000)
                 except:
                     print("⚠️ Timeout attente éditeur message")
 
@@ -650,9 +737,9 @@ class LinkedInBot:
                 if subject_input.is_visible():
                     print("📝 Champ Sujet détecté. (Focus et Tab)")
                     subject_input.focus()
-                    self._random_delay(0.2, 0.5)
+                    self._human_pause(0.2, 0.5)
                     self.page.keyboard.press("Tab")
-                    self._random_delay(0.2, 0.5)
+                    self._human_pause(0.2, 0.5)
 
                 # 2. Focus et Remplissage Body
                 editor = self.page.locator("div.msg-form__contenteditable").first
@@ -664,9 +751,9 @@ class LinkedInBot:
                 if editor and editor.is_visible():
                     print("📝 Remplissage du message...")
                     editor.click()
-                    self._random_delay(0.2, 0.5)
+                    self._human_pause(0.2, 0.5)
                     self.human_type("div.msg-form__contenteditable" if editor else "textarea", message)
-                    self._random_delay(1, 2)
+                    self._human_pause()
                     
                     # 3. Envoi (SCOPÉ au formulaire)
                     # On cherche le bouton UNIQUEMENT dans le conteneur msg_form détecté ou via classes précises
@@ -689,7 +776,7 @@ class LinkedInBot:
                     else:
                         print("⚠️ Bouton Envoyer introuvable, tentative TAB + Enter...")
                         self.page.keyboard.press("Tab")
-                        self._random_delay(0.5, 1)
+                        self._human_pause(0.3, 0.8)
                         self.page.keyboard.press("Enter")
                         return True
 
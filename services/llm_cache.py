@@ -0,0 +1,180 @@
+"""
+Cache persistant des réponses LLM, adressé par contenu.
+
+Les mêmes entrées étaient régénérées (et payées) à chaque fois : bouton
+d'aperçu /api/ai/generate, génération de dernier recours des campagnes,
+`enrich_signals.py --force-rescan` sur des profils inchangés. AIService
+consulte ce cache avant tout appel :
+
+- clé = empreinte SHA-256 de (type d'appel, modèle, empreinte du template de
+  prompt, champs d'entrée normalisés) : toute modification du prompt, du modèle
+  ou du profil donne une nouvelle clé, jamais de réponse périmée ;
+- seules les réponses valides sont mises en cache (jamais les erreurs) ;
+- expiration (TTL) et taille maximale (les entrées les moins récemment
+  utilisées partent en premier) ;
+- contournement par appel (`use_cache=False`, ex. bouton "régénérer") ;
+- compteurs hits / misses du processus (`stats()`).
+
+Base SQLite dédiée (data/llm_cache.db) : le cache se vide ou se supprime sans
+toucher à prospects.db, et ses écritures ne prennent pas le verrou de la base
+principale. Partagé entre threads (fan-out du client LLM).
+
+Configuration (.env) :
+    LLM_CACHE_PATH=data/llm_cache.db   # vide = cache désactivé
+    LLM_CACHE_TTL_DAYS=30
+    LLM_CACHE_MAX_ENTRIES=50000
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = os.path.join('data', 'llm_cache.db')
+PURGE_EVERY = 200  # Écritures entre deux passes d'éviction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    model TEXT,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_llm_cache_last_used ON llm_cache (last_used_at);
+"""
+
+
+def normalize(value):
+    """Forme canonique des entrées : espaces fusionnés, clés triées, None == ''"""
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return ' '.join(value.split())
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    return value
+
+
+def template_hash(template: str) -> str:
+    return hashlib.sha256((template or '').encode('utf-8')).hexdigest()[:16]
+
+
+def cache_key(kind: str, model: str, template: str, inputs) -> str:
+    material = json.dumps(
+        [kind, model, template_hash(template), normalize(inputs)],
+        ensure_ascii=False, sort_keys=True, default=str,
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path: str = DEFAULT_PATH, ttl_days: float = 30, max_entries: int = 50000):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def get(self, key: str):
+        """Valeur en cache (désérialisée) ou None (absente ou expirée)"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE llm_cache SET last_used_at = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key: str, value, kind: str, model: str = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, kind, model, value, created_at, last_used_at, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (key, kind, model, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            self._conn.commit()
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                self._purge(now)
+
+    def _purge(self, now: float) -> int:
+        """Éviction : entrées expirées, puis les moins récemment utilisées au-delà de max_entries"""
+        removed = 0
+        if self.ttl:
+            removed += self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,)
+            ).rowcount
+        if self.max_entries:
+            removed += self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        self._conn.commit()
+        return removed
+
+    def purge(self) -> int:
+        with self._lock:
+            return self._purge(time.time())
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, saved = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM llm_cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'entries': entries,
+            'hits_all_time': saved,  # Appels évités depuis la création des entrées présentes
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Cache partagé du processus, ou None si désactivé (LLM_CACHE_PATH vide)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            path = os.getenv('LLM_CACHE_PATH', DEFAULT_PATH)
+            if not path:
+                return None
+            _cache = LLMCache(
+                path,
+                ttl_days=float(os.getenv('LLM_CACHE_TTL_DAYS', 30)),
+                max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', 50000)),
+            )
+        return _cache
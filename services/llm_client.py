@@ -0,0 +1,168 @@
+"""
+Client HTTP partagé des appels LLM (OpenRouter, API chat/completions).
+
+- une `requests.Session` par processus : connexions keep-alive réutilisées
+  (pool dimensionné sur le nombre de requêtes simultanées) ;
+- un limiteur requêtes/minute + tokens/minute commun à tous les threads ;
+- nouvelle tentative avec backoff exponentiel et jitter sur 429 / 5xx / erreur
+  réseau (en-tête Retry-After respecté) ;
+- `fan_out()` : exécute une fonction sur une liste d'éléments en parallèle (threads),
+  sous le limiteur ; un lot de centaines d'appels dure à peu près le plus lent
+  d'entre eux au lieu de leur somme.
+
+Configuration (.env) :
+    LLM_RPM=60             # requêtes par minute
+    LLM_TPM=200000         # tokens par minute (estimation prompt + max_tokens)
+    LLM_CONCURRENCY=8      # requêtes simultanées
+    LLM_MAX_RETRIES=4
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = "https://openrouter.ai/api/v1"
+RETRY_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504}
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+
+class LLMError(Exception):
+    """Appel LLM en échec définitif (après les nouvelles tentatives)"""
+
+
+class RateLimiter:
+    """Seaux à jetons requêtes/minute et tokens/minute, partagés entre threads"""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = max(1, rpm)
+        self.tpm = max(1, tpm)
+        self.requests_available = float(self.rpm)
+        self.tokens_available = float(self.tpm)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        self.updated = now
+        self.requests_available = min(self.rpm, self.requests_available + elapsed * self.rpm / 60)
+        self.tokens_available = min(self.tpm, self.tokens_available + elapsed * self.tpm / 60)
+
+    def acquire(self, tokens: int):
+        """Bloquer jusqu'à disposer d'une requête et de `tokens` tokens"""
+        tokens = min(tokens, self.tpm)  # Une requête plus grosse que le seau ne passerait jamais
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.requests_available >= 1 and self.tokens_available >= tokens:
+                    self.requests_available -= 1
+                    self.tokens_available -= tokens
+                    return
+                wait = max(
+                    (1 - self.requests_available) * 60 / self.rpm,
+                    (tokens - self.tokens_available) * 60 / self.tpm,
+                )
+            time.sleep(min(max(wait, 0.05), 5))
+
+
+def estimate_tokens(payload: dict) -> int:
+    """Estimation grossière (≈ 4 caractères par token) du prompt + réponse maximale"""
+    prompt_chars = sum(len(m.get('content') or '') for m in payload.get('messages', []))
+    return prompt_chars // 4 + (payload.get('max_tokens') or 500)
+
+
+class LLMClient:
+    def __init__(self, api_key: str = None, base_url: str = BASE_URL, rpm: int = None, tpm: int = None,
+                 concurrency: int = None, max_retries: int = None):
+        self.api_key = api_key if api_key is not None else os.getenv('OPENROUTER_KEY')
+        self.base_url = base_url
+        self.concurrency = max(1, concurrency or int(os.getenv('LLM_CONCURRENCY', 8)))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('LLM_MAX_RETRIES', 4))
+        self.limiter = RateLimiter(rpm or int(os.getenv('LLM_RPM', 60)), tpm or int(os.getenv('LLM_TPM', 200000)))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "HTTP-Referer": "https://linkedin-mvp.local",  # Required by OpenRouter
+            "X-Title": "LinkedIn MVP",
+            "Content-Type": "application/json",
+        })
+
+    def _backoff(self, attempt: int, response=None) -> float:
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX)
+            except ValueError:
+                pass
+        # Full jitter : évite que les threads relancent tous au même instant
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+    def chat(self, payload: dict, timeout: int = 30) -> dict:
+        """POST /chat/completions. Retourne le JSON de réponse, lève LLMError après les tentatives."""
+        if not self.api_key:
+            raise LLMError("OPENROUTER_KEY not found in .env")
+
+        body = json.dumps(payload)
+        tokens = estimate_tokens(payload)
+        error, response = None, None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self._backoff(attempt - 1, response))
+            self.limiter.acquire(tokens)
+            response = None
+            try:
+                response = self.session.post(f"{self.base_url}/chat/completions", data=body, timeout=timeout)
+            except requests.RequestException as e:
+                error = f"{type(e).__name__}: {e}"
+                continue
+
+            if response.status_code == 200:
+                return response.json()
+            error = f"API returned {response.status_code} - {response.text[:300]}"
+            if response.status_code not in RETRY_STATUSES:
+                break
+
+        raise LLMError(error)
+
+    def fan_out(self, fn, items):
+        """
+        Appliquer `fn` à chaque élément en parallèle (au plus `concurrency` à la fois).
+        Itère sur (index, résultat) au fil des fins d'appels, dans le thread appelant
+        (écritures en base possibles sans partager la session entre threads).
+        Une exception de `fn` est renvoyée comme résultat.
+        """
+        items = list(items)
+        if not items:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(items))) as pool:
+            futures = {pool.submit(fn, item): index for index, item in enumerate(items)}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = e
+                yield futures[future], result
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Client partagé du processus (pool de connexions et limiteur communs)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
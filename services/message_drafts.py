@@ -0,0 +1,183 @@
+"""
+Pré-génération des messages IA (icebreakers) avant la fenêtre d'envoi.
+
+Générer le message au moment de l'envoi laissait le navigateur authentifié
+inactif jusqu'à 30s par prospect (appel OpenRouter synchrone). Ici, une étape
+en amont (tâche 'drafts' de worker.py, empilée par scheduler.py ; inline dans
+run_campaigns.py avant d'ouvrir la session) prépare les messages des N
+prochains prospects éligibles et les stocke en brouillons (`MessageDraft`),
+par prospect et campagne. L'envoi ne fait plus que lire un brouillon prêt.
+
+Régénération : un brouillon porte l'empreinte du prompt (+ modèle) et celle des
+champs du profil envoyés au modèle ; si l'une change (prompt du compte modifié,
+profil ré-enrichi), il est périmé et régénéré au passage suivant.
+
+Échec de génération : le brouillon passe en 'failed' et est retenté aux passages
+suivants (jusqu'à MAX_ATTEMPTS) ; un prospect dû entre-temps reçoit le template
+de la campagne. Brouillon absent (étape en amont pas encore passée) : l'envoi le
+génère lui-même, en dernier recours.
+"""
+
+import hashlib
+from datetime import datetime, timedelta
+
+from database.models import Prospect, Action, Settings, MessageDraft
+from services.ai_service import AIService, DEFAULT_PROMPT
+
+DRAFT_LOOKAHEAD = timedelta(days=1)  # Préparer aussi les prospects éligibles dans les prochaines 24h
+MAX_ATTEMPTS = 3
+
+
+def resolve_system_prompt(db, campaign):
+    """Prompt système de la campagne. Priorité : Compte > Global (None = prompt par défaut)"""
+    system_prompt = campaign.account.system_prompt if campaign.account else None
+    if not system_prompt:
+        setting = db.query(Settings).filter(Settings.key == 'system_prompt').first()
+        system_prompt = setting.value if setting else None
+    return system_prompt
+
+
+def prospect_data(prospect) -> dict:
+    """Champs du profil transmis au modèle"""
+    return {
+        'name': prospect.full_name,
+        'headline': prospect.headline,
+        'summary': prospect.summary,
+        'experience': prospect.experiences,
+    }
+
+
+def _fingerprint(*parts) -> str:
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(str(part or '').encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()[:16]
+
+
+def prompt_version(system_prompt, model: str) -> str:
+    return _fingerprint(system_prompt or DEFAULT_PROMPT, model)
+
+
+def profile_version(prospect) -> str:
+    data = prospect_data(prospect)
+    return _fingerprint(*(data[key] for key in sorted(data)))
+
+
+def draft_candidates(db, campaign, limit: int, lookahead: timedelta = DRAFT_LOOKAHEAD):
+    """
+    Prochains prospects à messager : mêmes critères que plan_messages (run_campaigns.py),
+    délai avancé de `lookahead`, les plus proches de l'éligibilité d'abord.
+    """
+    cutoff_date = datetime.now() - timedelta(days=campaign.message_delay_days) + lookahead
+    already_messaged = db.query(Action.id).filter(
+        Action.prospect_id == Prospect.id,
+        Action.action_type == 'message',
+        Action.status == 'success'
+    ).exists()
+
+    return db.query(Prospect).filter(
+        Prospect.campaign_id == campaign.id,
+        Prospect.status.in_(['connected', 'followed']),
+        Prospect.last_action_at <= cutoff_date,
+        ~already_messaged
+    ).order_by(Prospect.last_action_at, Prospect.id).limit(limit).all()
+
+
+def prepare_drafts(db, campaign, prospects, ai_service: AIService = None, on_progress=None) -> dict:
+    """
+    Générer les brouillons manquants ou périmés des `prospects` (commit après chacun :
+    l'envoi en cours les voit au fil de l'eau). Retourne les compteurs du passage.
+    """
+    stats = {'generated': 0, 'failed': 0, 'fresh': 0, 'skipped': 0}
+    if not prospects:
+        return stats
+
+    ai_service = ai_service or AIService()
+    current_prompt = resolve_system_prompt(db, campaign)
+    current_prompt_version = prompt_version(current_prompt, ai_service.model)
+
+    drafts = {d.prospect_id: d for d in db.query(MessageDraft).filter(
+        MessageDraft.campaign_id == campaign.id,
+        MessageDraft.prospect_id.in_([p.id for p in prospects])
+    ).all()}
+
+    todo = []  # (prospect, brouillon, version du profil) à (re)générer
+    for prospect in prospects:
+        draft = drafts.get(prospect.id)
+        current_profile_version = profile_version(prospect)
+        up_to_date = draft is not None and (
+            draft.prompt_version == current_prompt_version and draft.profile_version == current_profile_version
+        )
+
+        if up_to_date and draft.status in ('ready', 'used'):
+            stats['fresh'] += 1
+            continue
+        if up_to_date and draft.status == 'failed' and (draft.attempts or 0) >= MAX_ATTEMPTS:
+            stats['skipped'] += 1
+            continue
+
+        if draft is None:
+            draft = MessageDraft(campaign_id=campaign.id, prospect_id=prospect.id, attempts=0)
+            db.add(draft)
+        elif not up_to_date:
+            draft.attempts = 0  # Nouveau prompt ou nouveau profil : compteur d'échecs remis à zéro
+        todo.append((prospect, draft, current_profile_version))
+
+    # Générations en parallèle (client LLM partagé) ; écritures ici, dans le thread de la session
+    results = ai_service.generate_icebreakers([prospect_data(p) for p, _, _ in todo], current_prompt)
+    for done, (index, message) in enumerate(results, 1):
+        prospect, draft, current_profile_version = todo[index]
+        draft.prompt_version = current_prompt_version
+        draft.profile_version = current_profile_version
+        draft.generated_at = datetime.utcnow()
+        draft.used_at = None
+
+        if message.startswith("Error"):
+            draft.status = 'failed'
+            draft.message = None
+            draft.error = message
+            draft.attempts = (draft.attempts or 0) + 1
+            stats['failed'] += 1
+            print(f"      ⚠️ Brouillon {prospect.full_name}: {message}")
+        else:
+            draft.status = 'ready'
+            draft.message = message
+            draft.error = None
+            stats['generated'] += 1
+        db.commit()
+
+        if on_progress:
+            on_progress(done, len(todo))
+
+    return stats
+
+
+def draft_state(db, campaign, prospect, model: str = None):
+    """
+    (état, brouillon) du prospect, en lecture seule (aucun appel IA) :
+    'ready' (à jour, utilisable), 'failed' (génération en échec), 'stale' (prompt ou profil changé), 'missing'.
+    """
+    draft = db.query(MessageDraft).filter(
+        MessageDraft.campaign_id == campaign.id,
+        MessageDraft.prospect_id == prospect.id
+    ).first()
+    if draft is None or draft.status == 'used':
+        return 'missing', None
+
+    model = model or AIService().model
+    if (draft.prompt_version != prompt_version(resolve_system_prompt(db, campaign), model)
+            or draft.profile_version != profile_version(prospect)):
+        return 'stale', draft
+    if draft.status == 'failed' or not draft.message:
+        return 'failed', draft
+    return 'ready', draft
+
+
+def mark_draft_used(db, campaign, prospect):
+    """Brouillon consommé par un envoi réussi (commit laissé à l'appelant)"""
+    db.query(MessageDraft).filter(
+        MessageDraft.campaign_id == campaign.id,
+        MessageDraft.prospect_id == prospect.id,
+        MessageDraft.status == 'ready'
+    ).update({MessageDraft.status: 'used', MessageDraft.used_at: datetime.utcnow()}, synchronize_session=False)
@@ -0,0 +1,73 @@
+"""
+Enrichissement « gratuit » depuis le profil que le bot a déjà ouvert.
+
+Chaque connexion / message commence par `visit_profile()`, qui charge la
+carte du profil. Si le compte l'active (`security_settings['profile_capture']`),
+le bot relève en un seul `evaluate` le nom, le titre, l'entreprise actuelle,
+la localisation et le degré de relation ; `apply_profile_snapshot()` les écrit
+sur le Prospect avec la date du relevé (`profile_scraped_at`).
+
+enrich_prospects.py ne repaie pas Apify pour un prospect relevé récemment
+(cf. BOT_DATA_FRESH_DAYS).
+"""
+
+import re
+from datetime import datetime
+
+BOT_DATA_FRESH_DAYS = 30
+
+# Champs du Prospect tenus par le relevé du bot (prioritaires sur un dump Apify plus ancien)
+BOT_FIELDS = ('full_name', 'headline', 'location', 'company')
+
+SNAPSHOT_SCRIPT = """
+() => {
+    const text = (el) => el ? (el.innerText || el.textContent || '').replace(/\\s+/g, ' ').trim() : '';
+    const main = document.querySelector('main') || document.body;
+    const card = main.querySelector('section') || main;
+    const company = card.querySelector("[aria-label^='Current company'], [aria-label^='Entreprise actuelle']");
+    return {
+        name: text(card.querySelector('h1')),
+        headline: text(card.querySelector('.text-body-medium')),
+        location: text(card.querySelector('span.text-body-small.inline, .pv-text-details__left-panel span.text-body-small')),
+        company: company ? company.getAttribute('aria-label') : '',
+        degree: text(card.querySelector('.dist-value')),
+        card_text: text(card).slice(0, 800),
+    };
+}
+"""
+
+COMPANY_LABEL = re.compile(r"^(?:Current company|Entreprise actuelle)\s*:\s*(.+?)(?:\.\s*(?:Click|Cliquez).*)?$", re.IGNORECASE)
+DEGREE = re.compile(r"(?:^|[\s·•])(1st|2nd|3rd\+?|1er|2e|3e\+?)(?:$|[\s·•])", re.IGNORECASE)
+DEGREE_NORMALIZED = {'1st': '1st', '1er': '1st', '2nd': '2nd', '2e': '2nd', '3rd': '3rd', '3e': '3rd'}
+
+
+def parse_snapshot(raw: dict) -> dict:
+    """Normaliser le relevé brut de SNAPSHOT_SCRIPT (champs vides omis)"""
+    if not raw:
+        return {}
+
+    snapshot = {
+        'full_name': raw.get('name'),
+        'headline': raw.get('headline'),
+        'location': raw.get('location'),
+    }
+
+    match = COMPANY_LABEL.match(raw.get('company') or '')
+    if match:
+        snapshot['company'] = match.group(1).strip()
+
+    match = DEGREE.search(raw.get('degree') or '') or DEGREE.search(raw.get('card_text') or '')
+    if match:
+        snapshot['connection_degree'] = DEGREE_NORMALIZED[match.group(1).lower().rstrip('+')]
+
+    return {k: v for k, v in snapshot.items() if v}
+
+
+def apply_profile_snapshot(prospect, snapshot: dict) -> bool:
+    """Écrire le relevé du bot sur le prospect (sans commit). False si rien d'exploitable."""
+    if not snapshot or not snapshot.get('full_name'):
+        return False
+    for field, value in snapshot.items():
+        setattr(prospect, field, value)
+    prospect.profile_scraped_at = datetime.utcnow()
+    return True
@@ -0,0 +1,190 @@
+"""
+Politique de blocage des ressources réseau des sessions bot.
+
+Les proxies résidentiels sont facturés au Go : sur une visite de profil, les
+images, vidéos, polices, publicités et beacons de tracking représentent
+l'essentiel du trafic, sans servir aux parcours connexion / message (qui ne
+lisent que le DOM).
+
+Le blocage passe par le domaine Fetch du protocole Chrome (CDP) de la page, et
+non par `context.route()` : le routage Playwright désactive le cache HTTP, et
+les bundles JS/CSS first-party de LinkedIn seraient alors retéléchargés à chaque
+navigation de la session (plus de trafic proxy que n'en économise le blocage).
+Seuls les types et URLs candidats au blocage (`fetch_patterns()`) sont
+interceptés ; le reste suit le chemin normal, cache compris. Politique
+désactivée : aucune interception.
+
+Configuration par compte dans `Account.security_settings` :
+
+    "resource_policy": {
+        "enabled": true,
+        "block_types": ["image", "media", "font"],
+        "block_domains": ["example-tracker.com"],
+        "allow_domains": ["cdn.example.com"],
+        "actions": {"message": {"block_types": ["media", "font"]}}
+    }
+
+Les octets économisés sont estimés (une requête bloquée n'a pas de réponse)
+à partir de tailles moyennes par type de ressource.
+"""
+
+from urllib.parse import urlparse
+
+# Types Playwright (request.resource_type) bloqués par défaut.
+# Les stylesheets restent autorisées : is_visible() dépend du CSS.
+DEFAULT_BLOCK_TYPES = {'image', 'media', 'font'}
+
+# Tiers d'analytics / publicité / tracking (suffixes de domaine)
+DEFAULT_BLOCK_DOMAINS = {
+    'google-analytics.com',
+    'googletagmanager.com',
+    'googleadservices.com',
+    'doubleclick.net',
+    'facebook.net',
+    'bat.bing.com',
+    'ads.linkedin.com',
+    'px.ads.linkedin.com',
+    'snap.licdn.com',
+    'hotjar.com',
+    'adsrvr.org',
+}
+
+# Chemins de tracking first-party LinkedIn (beacons, télémétrie)
+DEFAULT_BLOCK_PATHS = (
+    '/li/track',
+    '/sensorCollect',
+    '/tscp-serving/',
+    '/realtime/realtimeFrontendClientConnectivityTracking',
+)
+
+# Domaines LinkedIn : seuls les chemins de tracking y sont bloqués (hors types)
+FIRST_PARTY_DOMAINS = {'linkedin.com', 'licdn.com'}
+
+# Types Playwright -> types CDP (Network.ResourceType) des motifs d'interception
+CDP_RESOURCE_TYPES = {
+    'xhr': 'XHR',
+    'eventsource': 'EventSource',
+    'websocket': 'WebSocket',
+    'texttrack': 'TextTrack',
+    'cspviolationreport': 'CSPViolationReport',
+    'signedexchange': 'SignedExchange',
+}
+
+# Taille moyenne estimée d'une réponse par type (octets)
+ESTIMATED_BYTES = {
+    'image': 40_000,
+    'media': 600_000,
+    'font': 35_000,
+    'script': 80_000,
+    'stylesheet': 30_000,
+    'xhr': 3_000,
+    'fetch': 3_000,
+    'ping': 500,
+    'beacon': 500,
+    'other': 5_000,
+}
+
+# Politique par type d'action (surchargée par le compte).
+# 'browse' (vérification de session) ne lit que l'URL : le CSS peut aussi sauter.
+# 'connect' / 'message' testent la visibilité des boutons : CSS conservé.
+ACTION_POLICIES = {
+    'browse': {'block_types': ['image', 'media', 'font', 'stylesheet']},
+    'connect': {},
+    'message': {},
+}
+
+
+def _domain_matches(host: str, domains) -> bool:
+    return any(host == d or host.endswith('.' + d) for d in domains)
+
+
+class ResourcePolicy:
+    """Décide, requête par requête, ce qui est bloqué"""
+
+    def __init__(self, block_types=None, block_domains=None, allow_domains=None, block_paths=None, enabled=True):
+        self.enabled = enabled
+        self.block_types = set(DEFAULT_BLOCK_TYPES if block_types is None else block_types)
+        self.block_domains = set(DEFAULT_BLOCK_DOMAINS) | set(block_domains or [])
+        self.allow_domains = set(allow_domains or [])
+        self.block_paths = tuple(DEFAULT_BLOCK_PATHS if block_paths is None else block_paths)
+
+    @classmethod
+    def from_settings(cls, security_settings: dict = None, action: str = 'browse'):
+        """Politique d'un compte pour un type d'action (défauts + surcharges du compte)"""
+        config = dict(ACTION_POLICIES.get(action, {}))
+        account_config = (security_settings or {}).get('resource_policy', {}) or {}
+        config.update({k: v for k, v in account_config.items() if k != 'actions'})
+        config.update((account_config.get('actions') or {}).get(action, {}))
+        return cls(
+            block_types=config.get('block_types'),
+            block_domains=config.get('block_domains'),
+            allow_domains=config.get('allow_domains'),
+            block_paths=config.get('block_paths'),
+            enabled=config.get('enabled', True),
+        )
+
+    def fetch_patterns(self) -> list:
+        """
+        Motifs Fetch.enable (CDP) des requêtes à intercepter : types bloqués, domaines
+        bloqués, chemins de tracking first-party. Plus larges que should_block(),
+        qui tranche requête par requête. Liste vide si la politique est désactivée.
+        """
+        if not self.enabled:
+            return []
+        patterns = [{'resourceType': CDP_RESOURCE_TYPES.get(t, t.capitalize()), 'requestStage': 'Request'}
+                    for t in sorted(self.block_types) if t != 'document']
+        for domain in sorted(self.block_domains):
+            patterns += [{'urlPattern': f'*://{domain}/*'}, {'urlPattern': f'*://*.{domain}/*'}]
+        for domain in sorted(FIRST_PARTY_DOMAINS):
+            for path in self.block_paths:
+                patterns += [{'urlPattern': f'*://{domain}{path}*'}, {'urlPattern': f'*://*.{domain}{path}*'}]
+        return patterns
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        if not self.enabled or resource_type == 'document':
+            return False
+
+        parsed = urlparse(url)
+        if parsed.scheme not in ('http', 'https'):
+            return False  # data:, blob: : déjà en mémoire
+        host = parsed.hostname or ''
+
+        if _domain_matches(host, self.allow_domains):
+            return False
+        if _domain_matches(host, self.block_domains):
+            return True
+        if resource_type in self.block_types:
+            return True
+        if _domain_matches(host, FIRST_PARTY_DOMAINS):
+            return any(parsed.path.startswith(p) for p in self.block_paths)
+        # Tiers non listés (ex: challenge de sécurité) : laissés passer
+        return False
+
+
+class ResourceStats:
+    """Compteurs d'une session : requêtes interceptées bloquées / laissées passer, octets estimés"""
+
+    def __init__(self):
+        self.blocked = {}  # resource_type -> nombre
+        self.allowed = 0
+        self.bytes_saved = 0
+
+    def record_blocked(self, resource_type: str):
+        self.blocked[resource_type] = self.blocked.get(resource_type, 0) + 1
+        self.bytes_saved += ESTIMATED_BYTES.get(resource_type, ESTIMATED_BYTES['other'])
+
+    def record_allowed(self):
+        self.allowed += 1
+
+    def summary(self) -> dict:
+        return {
+            'blocked': sum(self.blocked.values()),
+            'blocked_by_type': dict(self.blocked),
+            'allowed': self.allowed,
+            'estimated_bytes_saved': self.bytes_saved,
+        }
+
+    def __str__(self):
+        total = sum(self.blocked.values())
+        detail = ', '.join(f"{t}: {n}" for t, n in sorted(self.blocked.items(), key=lambda x: -x[1]))
+        return f"{total} requêtes bloquées ({detail or '-'}), ~{self.bytes_saved / 1_000_000:.1f} Mo économisés"
@@ -0,0 +1,48 @@
+"""
+Verrou mono-instance des runners de campagnes (scheduler.py, run_campaigns*.py).
+
+Deux runners simultanés piloteraient les mêmes comptes LinkedIn avec deux
+navigateurs et dépasseraient les quotas. Le verrou est un `flock` sur un
+fichier : libéré par le noyau si le processus meurt, pas de verrou orphelin.
+"""
+
+import fcntl
+import os
+
+LOCK_PATH = os.getenv('CAMPAIGN_LOCK_PATH', os.path.join('data', 'campaign_runner.lock'))
+
+
+def acquire_run_lock(path: str = LOCK_PATH):
+    """
+    Prendre le verrou sans attendre. Retourne le fichier ouvert (à garder
+    ouvert pendant toute l'exécution) ou None si un autre runner le détient.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    handle = open(path, 'a+')
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        handle.seek(0)
+        holder = handle.read().strip() or '?'
+        handle.close()
+        print(f"⛔ Un autre runner de campagnes tourne déjà (pid {holder}, verrou {path})")
+        return None
+
+    handle.seek(0)
+    handle.truncate()
+    handle.write(f"{os.getpid()}\n")
+    handle.flush()
+    return handle
+
+
+def lock_holder(path: str = LOCK_PATH):
+    """PID du runner qui détient le verrou ('?' si illisible), None si le verrou est libre"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return handle.read().strip() or '?'
+        fcntl.flock(handle, fcntl.LOCK_UN)
+    return None
@@ -13,6 +13,7 @@ import random
 import re
 from dotenv import load_dotenv
 from database import get_db, Prospect
+from database.handles import canonical_profile_url, canonical_handle
 
 # Charger les variables d'environnement
 load_dotenv()
@@ -208,14 +209,8 @@ class LinkedInScraper:
     
     
     def _clean_linkedin_url(self, url: str) -> str:
-        """Nettoyer l'URL LinkedIn en supprimant les suffixes de langue (/en, /es, /fr, etc.)"""
-        import re
-        # Supprimer les suffixes de langue courants
-        # Pattern: /en, /fr, /es, /de, /pt, /it, /nl, /pl, /ru, /ja, /zh-cn, /zh-tw, etc.
-        url = re.sub(r'/(en|fr|es|de|pt|it|nl|pl|ru|ja|ko|zh-cn|zh-tw|ar|tr|sv|da|no|fi)/?$', '', url, flags=re.IGNORECASE)
-        # S'assurer qu'il n'y a pas de slash final
-        url = url.rstrip('/')
-        return url
+        """Nettoyer l'URL LinkedIn (suffixes de langue /en, /fr..., query string, slash final)"""
+        return canonical_profile_url(url)
     
     def _extract_name_from_url(self, username: str) -> str:
         """Extraire un nom lisible depuis un username LinkedIn"""
@@ -248,14 +243,22 @@ class LinkedInScraper:
         db = next(get_db())
         try:
             count = 0
+            seen = set()  # Profils (handles) déjà traités dans ce lot (index unique par compte)
             for data in prospects_data:
+                handle = canonical_handle(data['linkedin_url'])
+                if (handle or data['linkedin_url']) in seen:
+                    continue
+                seen.add(handle or data['linkedin_url'])
                 # Vérifier si existe déjà (Scope Global ou par Compte ?)
                 # Pour l'instant, check global par URL pour éviter doublons, 
                 # OU check par compte si on veut autoriser le même prospect sur plusieurs comptes.
-                # ACTUELLEMENT: check global par linkedin_url (car pas de composite unique constraint facile en SQLite sans migration complexe)
-                # FIX: Check si existe DANS CE COMPTE
+                # Check si existe DANS CE COMPTE (garanti en base par l'index unique uq_prospects_url_account)
                 
-                query = db.query(Prospect).filter(Prospect.linkedin_url == data['linkedin_url'])
+                # Par handle (index ix_prospects_handle) : les variantes d'URL d'un même profil sont des doublons
+                if handle:
+                    query = db.query(Prospect).filter(Prospect.linkedin_handle == handle)
+                else:
+                    query = db.query(Prospect).filter(Prospect.linkedin_url == data['linkedin_url'])
                 if account_id:
                     query = query.filter(Prospect.account_id == account_id)
                 
@@ -0,0 +1,259 @@
+"""
+Préfiltre local du tagging des signaux, avant l'appel LLM.
+
+Chaque signal du prompt de tagging (services/ai_service.py) est défini par
+des mots-clés littéraux ("Platform Engineering", "Copilot", "tech debt"...).
+La table SIGNAL_DEFINITIONS les reprend en deux niveaux :
+
+- `strong` : mot-clé sans ambiguïté, le signal est posé localement ;
+- `weak` : mot-clé qui peut tromper ("scaling", "Cursor", "IDP", "legacy"...),
+  le profil part au LLM.
+
+Tous les mots-clés sont compilés en un seul automate Aho-Corasick, parcouru
+une fois sur headline + summary + skills (insensible à la casse, tirets et
+espaces normalisés, limites de mots respectées). Décision par profil :
+
+- au moins un mot-clé faible → ambigu, envoyé au LLM (les signaux forts trouvés
+  sont conservés en plus de sa réponse) ;
+- sinon → tranché localement (signaux forts trouvés, ou aucun signal), sans appel.
+
+`evaluate()` mesure, signal par signal, précision et rappel de ce pipeline
+contre les étiquettes du LLM seul sur un échantillon (cf. enrich_signals.py --evaluate).
+"""
+
+import json
+import re
+
+SIGNAL_PREFIX = "Signal: "
+
+SIGNAL_DEFINITIONS = [
+    {
+        'name': "Platform/DevEx initiatives",
+        'color': "#6f42c1",  # Purple
+        'strong': ["platform engineering", "platform engineer", "internal developer platform",
+                   "developer experience", "devex", "developer platform"],
+        'weak': ["idp", "dx", "platform team"],
+    },
+    {
+        'name': "AI coding mentions",
+        'color': "#198754",  # Green
+        'strong': ["github copilot", "ai coding", "coding agent", "coding agents", "ai pair programming",
+                   "llm for code", "llms for code", "autonomous coding", "ai code generation", "ai-assisted coding"],
+        'weak': ["copilot", "cursor", "code generation", "codegen", "llm", "llms"],
+    },
+    {
+        'name': "scaling/hiring",
+        'color': "#fd7e14",  # Orange
+        'strong': ["hypergrowth", "we're hiring", "we are hiring", "now hiring", "scaling the team",
+                   "scaling teams", "scaling engineering"],
+        'weak': ["scaling", "hiring", "growing", "recruiting", "scale up", "scaleup"],
+    },
+    {
+        'name': "productivity investment",
+        'color': "#0dcaf0",  # Cyan
+        'strong': ["engineering productivity", "developer productivity", "dora metrics", "space framework"],
+        'weak': ["dora", "productivity"],
+    },
+    {
+        'name': "refactor/tech debt narratives",
+        'color': "#dc3545",  # Red
+        'strong': ["tech debt", "technical debt", "refactoring", "legacy code", "legacy modernization",
+                   "legacy modernisation"],
+        'weak': ["legacy", "modernization", "modernisation", "refactor"],
+    },
+]
+
+SIGNAL_COLORS = {d['name']: d['color'] for d in SIGNAL_DEFINITIONS}
+
+_SEPARATORS = re.compile(r"[\s\-_/]+")
+
+
+def normalize_text(text: str) -> str:
+    """Minuscules, tirets / underscores / slashs et espaces fusionnés en un espace"""
+    return _SEPARATORS.sub(' ', (text or '').lower())
+
+
+class KeywordAutomaton:
+    """Automate Aho-Corasick : tous les mots-clés trouvés en un seul passage sur le texte"""
+
+    def __init__(self, keywords):
+        # keywords : itérable de (mot-clé, charge utile)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for keyword, payload in keywords:
+            self._add(normalize_text(keyword).strip(), payload)
+        self._build()
+
+    def _add(self, keyword: str, payload):
+        node = 0
+        for char in keyword:
+            nxt = self.goto[node].get(char)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][char] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = nxt
+        self.output[node].append((len(keyword), payload))
+
+    def _build(self):
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, text: str):
+        """Charges utiles des mots-clés présents comme mots entiers dans `text`"""
+        text = normalize_text(text)
+        found = []
+        node = 0
+        for end, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for length, payload in self.output[node]:
+                start = end - length + 1
+                if (start == 0 or not text[start - 1].isalnum()) and (end + 1 == len(text) or not text[end + 1].isalnum()):
+                    found.append(payload)
+        return found
+
+
+def _build_automaton():
+    keywords = []
+    for definition in SIGNAL_DEFINITIONS:
+        for level in ('strong', 'weak'):
+            for keyword in definition[level]:
+                keywords.append((keyword, (definition['name'], level)))
+    return KeywordAutomaton(keywords)
+
+
+AUTOMATON = _build_automaton()
+
+
+def skills_text(skills) -> str:
+    """Compétences (JSON Apify : liste de chaînes ou d'objets) à plat"""
+    if isinstance(skills, str):
+        try:
+            skills = json.loads(skills)
+        except ValueError:
+            return skills
+    parts = []
+
+    def collect(value):
+        if isinstance(value, str):
+            parts.append(value)
+        elif isinstance(value, dict):
+            for v in value.values():
+                collect(v)
+        elif isinstance(value, (list, tuple)):
+            for v in value:
+                collect(v)
+
+    collect(skills)
+    return ' | '.join(parts)
+
+
+def match_profile(prospect_data: dict):
+    """
+    (signaux forts, signaux faibles) trouvés dans headline + summary + skills.
+    `prospect_data` : dict {'headline', 'summary', 'skills'} comme pour analyze_batch_signals.
+    """
+    text = ' | '.join([
+        prospect_data.get('headline') or '',
+        prospect_data.get('summary') or '',
+        skills_text(prospect_data.get('skills')),
+    ])
+    strong, weak = set(), set()
+    for name, level in AUTOMATON.find(text):
+        (strong if level == 'strong' else weak).add(name)
+    return strong, weak - strong
+
+
+def prefilter(prospects_data):
+    """
+    Partage des profils : (décisions locales {str(id): [signaux]}, profils ambigus à
+    envoyer au LLM, signaux forts déjà trouvés sur ces profils {str(id): set}).
+    """
+    decided, ambiguous, known = {}, [], {}
+    for data in prospects_data:
+        strong, weak = match_profile(data)
+        if weak:
+            ambiguous.append(data)
+            known[str(data['id'])] = strong
+        else:
+            decided[str(data['id'])] = sorted(strong)
+    return decided, ambiguous, known
+
+
+def iter_signal_tags(ai, prospects_data, batch_size=None, use_cache=True, use_llm=True):
+    """
+    Tagging avec préfiltre : même interface que AIService.iter_batch_signals
+    (itère sur (lot, {str(id): [signaux]})). Les profils tranchés localement
+    sortent en premier, sans appel ; seuls les ambigus vont au LLM.
+    """
+    decided, ambiguous, known = prefilter(prospects_data)
+    by_id = {str(data['id']): data for data in prospects_data}
+    if decided:
+        yield [by_id[pid] for pid in decided], {pid: tags for pid, tags in decided.items() if tags}
+
+    if not ambiguous or not use_llm:
+        return
+    kwargs = {'use_cache': use_cache}
+    if batch_size:
+        kwargs['batch_size'] = batch_size
+    for batch, results in ai.iter_batch_signals(ambiguous, **kwargs):
+        merged = {}
+        for data in batch:
+            pid = str(data['id'])
+            tags = set(results.get(pid) or []) | known.get(pid, set())
+            if tags:
+                merged[pid] = sorted(tags)
+        yield batch, merged
+
+
+def evaluate(ai, prospects_data, use_cache=True) -> dict:
+    """
+    Précision / rappel par signal du pipeline préfiltré contre le LLM seul (référence),
+    sur `prospects_data`. Retourne {signal: {'tp', 'fp', 'fn', 'precision', 'recall'}}
+    plus '__summary__' (profils, part tranchée localement).
+    """
+    reference = ai.analyze_batch_signals(list(prospects_data), use_cache=use_cache)
+    decided, ambiguous, known = prefilter(prospects_data)
+
+    report = {d['name']: {'tp': 0, 'fp': 0, 'fn': 0} for d in SIGNAL_DEFINITIONS}
+    for data in prospects_data:
+        pid = str(data['id'])
+        expected = set(reference.get(pid) or [])
+        if pid in decided:
+            predicted = set(decided[pid])
+        else:
+            predicted = expected | known.get(pid, set())  # Ambigu : étiquettes du LLM (+ forts locaux)
+        for name, counts in report.items():
+            if name in predicted and name in expected:
+                counts['tp'] += 1
+            elif name in predicted:
+                counts['fp'] += 1
+            elif name in expected:
+                counts['fn'] += 1
+
+    for counts in report.values():
+        predicted_pos = counts['tp'] + counts['fp']
+        actual_pos = counts['tp'] + counts['fn']
+        counts['precision'] = round(counts['tp'] / predicted_pos, 3) if predicted_pos else None
+        counts['recall'] = round(counts['tp'] / actual_pos, 3) if actual_pos else None
+
+    total = len(prospects_data)
+    report['__summary__'] = {
+        'profiles': total,
+        'decided_locally': len(decided),
+        'sent_to_llm': len(ambiguous),
+        'llm_share': round(len(ambiguous) / total, 3) if total else 0.0,
+    }
+    return report
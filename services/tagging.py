@@ -0,0 +1,150 @@
+"""
+Écriture en masse des tags prospects (table d'association prospect_tags).
+
+Le tagging passait par la relation ORM : requête du Tag par nom pour chaque
+prospect, chargement paresseux de `prospect.tags` avant chaque ajout,
+`get()` par résultat de l'IA. Ici :
+
+- `TagCatalogue` : catalogue nom -> id chargé en une requête, tags manquants
+  créés à la demande ;
+- `segment_for_size()` : segment d'après `company_size`, sans accès base ;
+- `add_tags()` : paires (prospect_id, tag_id) insérées par lots `INSERT OR IGNORE`
+  (la PK de prospect_tags écarte les doublons, aucune lecture préalable) ;
+- `resegment()` : segmentation en masse depuis (id, company_size), colonnes seules ;
+  un prospect n'a qu'un segment, les autres tags de segment lui sont retirés.
+
+Ces écritures passent sous l'ORM : une collection `prospect.tags` déjà chargée
+dans la session est expirée (relue au prochain accès).
+"""
+
+import re
+
+from sqlalchemy import insert, delete, select
+
+from database.models import Prospect, Tag, prospect_tags
+
+WRITE_BATCH = 5000  # Lignes par INSERT OR IGNORE (executemany)
+IN_BATCH = 500  # Ids par clause IN (limite de variables SQLite)
+
+DEFAULT_COLOR = '#6c757d'
+HORS_CIBLE = 'Hors Cible'
+SEGMENT_TAGS = {
+    'Segment A (11-100)': '#28a745',
+    'Segment B (101-500)': '#ffc107',
+    'Segment C (501-2000)': '#17a2b8',
+    HORS_CIBLE: '#dc3545',
+}
+
+_NUMBER = re.compile(r'\d+')
+
+
+def segment_for_size(size_str):
+    """
+    Tag de segment d'après la taille d'entreprise, ou None si illisible.
+    Premier nombre de la chaîne : "11-50 employees" -> 11, "10,001+ employees" -> 10001.
+    """
+    if not size_str:
+        return None
+    match = _NUMBER.search(size_str.replace(',', ''))
+    if not match:
+        return None
+
+    lower = int(match.group())
+    if lower <= 10:
+        return HORS_CIBLE
+    if lower <= 100:
+        return 'Segment A (11-100)'
+    if lower <= 500:
+        return 'Segment B (101-500)'
+    if lower <= 5000:
+        return 'Segment C (501-2000)'  # 2001-5000 rattachés au segment C
+    return HORS_CIBLE
+
+
+class TagCatalogue:
+    """Tags de la base (nom -> id), lus une fois"""
+
+    def __init__(self, db):
+        self.db = db
+        self.ids = dict(db.execute(select(Tag.name, Tag.id)).all())
+
+    def get(self, name: str):
+        return self.ids.get(name)
+
+    def ensure(self, name: str, color: str = DEFAULT_COLOR) -> int:
+        """Id du tag, créé (et commité) s'il n'existe pas"""
+        tag_id = self.ids.get(name)
+        if tag_id is None:
+            tag = Tag(name=name, color=color)
+            self.db.add(tag)
+            self.db.commit()
+            tag_id = self.ids[name] = tag.id
+        return tag_id
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _expire_tags(db, prospect_ids):
+    """Collections `tags` chargées de ces prospects rendues obsolètes par une écriture directe"""
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, Prospect) and obj.id in prospect_ids and 'tags' in obj.__dict__:
+            db.expire(obj, ['tags'])
+
+
+def add_tags(db, pairs, batch_size: int = WRITE_BATCH) -> int:
+    """
+    Poser les tags (prospect_id, tag_id) absents, par lots INSERT OR IGNORE.
+    Retourne le nombre de lignes ajoutées (commit laissé à l'appelant).
+    """
+    rows = [{'prospect_id': p_id, 'tag_id': tag_id} for p_id, tag_id in set(pairs)]
+    if not rows:
+        return 0
+    statement = insert(prospect_tags).prefix_with('OR IGNORE')
+    added = 0
+    for batch in _chunks(rows, batch_size):
+        added += db.execute(statement, batch).rowcount
+    _expire_tags(db, {row['prospect_id'] for row in rows})
+    return added
+
+
+def remove_tags(db, prospect_ids, tag_ids) -> int:
+    """Retirer les `tag_ids` des prospects donnés. Retourne le nombre de lignes supprimées."""
+    prospect_ids, tag_ids = list(set(prospect_ids)), list(tag_ids)
+    if not prospect_ids or not tag_ids:
+        return 0
+    removed = 0
+    for batch in _chunks(prospect_ids, IN_BATCH):
+        removed += db.execute(delete(prospect_tags).where(
+            prospect_tags.c.tag_id.in_(tag_ids),
+            prospect_tags.c.prospect_id.in_(batch)
+        )).rowcount
+    _expire_tags(db, set(prospect_ids))
+    return removed
+
+
+def resegment(db, rows=None, catalogue: TagCatalogue = None) -> dict:
+    """
+    Segmenter les prospects `rows` ((id, company_size), tous les prospects si None).
+    Tags de segment créés si absents. Retourne les compteurs (commit laissé à l'appelant).
+    """
+    catalogue = catalogue or TagCatalogue(db)
+    segment_ids = {name: catalogue.ensure(name, color) for name, color in SEGMENT_TAGS.items()}
+    if rows is None:
+        rows = db.execute(select(Prospect.id, Prospect.company_size).where(Prospect.company_size.isnot(None)))
+
+    by_segment = {tag_id: [] for tag_id in segment_ids.values()}
+    for p_id, size_str in rows:
+        name = segment_for_size(size_str)
+        if name:
+            by_segment[segment_ids[name]].append(p_id)
+
+    stats = {'segmented': 0, 'added': 0, 'removed': 0}
+    for tag_id, p_ids in by_segment.items():
+        others = [other for other in segment_ids.values() if other != tag_id]
+        stats['segmented'] += len(p_ids)
+        stats['removed'] += remove_tags(db, p_ids, others)
+        stats['added'] += add_tags(db, [(p_id, tag_id) for p_id in p_ids])
+    return stats
@@ -7,17 +7,22 @@ import sys
 import os
 import requests
 import bcrypt
+import atexit
+import base64
 from functools import wraps
 
 # Ajouter le dossier parent au path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from database import init_db, SessionLocal, Prospect, Campaign, Action, Settings, Account
-from database.models import User, Tag
-from services.scraper import LinkedInScraper
-from services.linkedin_bot import LinkedInBot
+from database.models import User, Tag, ProspectStatusCount, Job
+from database.counters import read_status_counts
+from services.bot_pool import BotPool
 from services.ai_service import AIService
-from datetime import datetime
+from services import job_queue
+from services.profile_snapshot import apply_profile_snapshot
+from services.run_lock import lock_holder
+from datetime import datetime, timedelta
 
 app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key')
@@ -38,11 +43,9 @@ def from_json_filter(value):
 # Initialiser la DB au démarrage (déjà fait dans main.py mais utile si lancé seul)
 # init_db()
 
-# Instance globale du scraper
-scraper = LinkedInScraper()
-
-# Instance globale du bot (sera initialisée à la demande)
-bot = None
+# Pool global de sessions bot (une session chaude par compte, voir services/bot_pool.py)
+bot_pool = BotPool(headless=False, max_contexts=3, idle_timeout=600)
+atexit.register(bot_pool.close_all)
 
 from flask import g, session
 
@@ -91,7 +94,86 @@ def inject_account():
         
     return dict(current_account=getattr(g, 'account', None), get_all_accounts=get_all_accounts)
 
-from sqlalchemy.orm import joinedload
+from sqlalchemy import func, case, and_, or_
+from sqlalchemy.orm import joinedload, selectinload
+
+def status_counts(db, account_id):
+    """
+    Compteurs par statut d'un compte, lus dans la table de compteurs
+    (prospect_status_counts, maintenue à chaque flush) : lookup par clé primaire.
+    """
+    return read_status_counts(db, account_id)
+
+def campaign_stats(db, account_id, days=30):
+    """
+    Statistiques de toutes les campagnes d'un compte en un nombre fixe de requêtes.
+
+    Une requête agrège prospects et actions par campagne (sous-requêtes GROUP BY
+    jointes à campaigns), une seconde construit la série journalière des
+    connexions / messages envoyés sur les `days` derniers jours.
+    Les sous-requêtes sont limitées aux prospects et campagnes du compte.
+    """
+    account_campaigns = db.query(Campaign.id).filter(Campaign.account_id == account_id).scalar_subquery()
+
+    prospect_stats = db.query(
+        Prospect.campaign_id.label('campaign_id'),
+        func.count(Prospect.id).label('prospects')
+    ).filter(
+        Prospect.account_id == account_id,
+        Prospect.campaign_id.isnot(None)
+    ).group_by(Prospect.campaign_id).subquery()
+
+    is_message = and_(Action.action_type == 'message', Action.status == 'success')
+    action_stats = db.query(
+        Action.campaign_id.label('campaign_id'),
+        func.sum(case((and_(Action.action_type == 'connect', Action.status == 'success'), 1), else_=0)).label('connected'),
+        func.sum(case((is_message, 1), else_=0)).label('messaged'),
+        func.count(func.distinct(case((is_message, Action.prospect_id)))).label('messaged_prospects')
+    ).filter(Action.campaign_id.in_(account_campaigns)).group_by(Action.campaign_id).subquery()
+
+    rows = db.query(
+        Campaign.id,
+        func.coalesce(prospect_stats.c.prospects, 0),
+        func.coalesce(action_stats.c.connected, 0),
+        func.coalesce(action_stats.c.messaged, 0),
+        func.coalesce(action_stats.c.messaged_prospects, 0)
+    ).outerjoin(prospect_stats, prospect_stats.c.campaign_id == Campaign.id
+    ).outerjoin(action_stats, action_stats.c.campaign_id == Campaign.id
+    ).filter(Campaign.account_id == account_id).all()
+
+    today = datetime.utcnow().date()
+    dates = [(today - timedelta(days=i)).isoformat() for i in range(days - 1, -1, -1)]
+
+    stats = {}
+    for campaign_id, prospects, connected, messaged, messaged_prospects in rows:
+        stats[campaign_id] = {
+            'prospects': prospects,
+            'connected': connected,
+            'messaged': messaged,
+            'messaged_prospects': messaged_prospects,
+            'series': {'dates': dates, 'connect': [0] * days, 'message': [0] * days},
+        }
+
+    if not stats:
+        return stats
+
+    # Série journalière (index campaign_id, action_type, executed_at)
+    day = func.date(Action.executed_at)
+    daily = db.query(
+        Action.campaign_id, day, Action.action_type, func.count(Action.id)
+    ).filter(
+        Action.campaign_id.in_(list(stats.keys())),
+        Action.action_type.in_(['connect', 'message']),
+        Action.status == 'success',
+        Action.executed_at >= datetime.combine(today - timedelta(days=days - 1), datetime.min.time())
+    ).group_by(Action.campaign_id, day, Action.action_type).all()
+
+    index_of = {d: i for i, d in enumerate(dates)}
+    for campaign_id, date_str, action_type, total in daily:
+        if date_str in index_of:
+            stats[campaign_id]['series'][action_type][index_of[date_str]] = total
+
+    return stats
 
 # Authentication Routes
 @app.route('/login', methods=['GET', 'POST'])
@@ -130,11 +212,7 @@ def index():
     
     account_id = g.account.id if g.account else 0
     
-    total_prospects = db.query(Prospect).filter(Prospect.account_id == account_id).count()
-    new_prospects = db.query(Prospect).filter(Prospect.account_id == account_id, Prospect.status == 'new').count()
-    connected = db.query(Prospect).filter(Prospect.account_id == account_id, Prospect.status == 'connected').count()
-    followed = db.query(Prospect).filter(Prospect.account_id == account_id, Prospect.status == 'followed').count()
-    messaged = db.query(Action).join(Prospect).filter(Prospect.account_id == account_id, Action.action_type == 'message', Action.status == 'success').distinct(Action.prospect_id).count()
+    counts = status_counts(db, account_id)
     
     # Eager load 'prospect' to avoid DetachedInstanceError after db.close()
     # Eager load 'prospect' to avoid DetachedInstanceError after db.close()
@@ -146,102 +224,181 @@ def index():
     db.close()
     
     stats = {
-        'total_prospects': total_prospects,
-        'new_prospects': new_prospects,
-        'connected': connected,
-        'followed': followed,
-        'messaged': messaged,
+        'total_prospects': counts['all'],
+        'new_prospects': counts['new'],
+        'connected': counts['connected'],
+        'followed': counts['followed'],
+        'messaged': counts['messaged'],
     }
     
     return render_template('index.html', stats=stats, recent_actions=recent_actions)
 
-@app.route('/prospects')
-def prospects():
-    """Page liste des prospects"""
-    db = SessionLocal()
-    
-    status_filter = request.args.get('status', 'all')
-    tag_filter = request.args.get('tag', 'all')
-    all_tags = db.query(Tag).all()
-    
-    # Split tags for UI dropdowns
-    segment_tags = [t for t in all_tags if "Segment" in t.name or "Hors Cible" in t.name]
-    signal_tags = [t for t in all_tags if "Signal" in t.name]
+PROSPECTS_PAGE_SIZE = 50
+PROSPECTS_MAX_PAGE_SIZE = 200
 
-    # Base Query
-    query = db.query(Prospect).filter(Prospect.account_id == g.account.id)
 
-    # Filter by Status (existing logic adapted)
-    if status_filter == 'messaged':
-        # Special logic for messaged
-        # ... (keep existing messaged logic if complex, or simplify)
-        # For simplicity, let's just reuse the status column if 'messaged' is a valid status?
-        # User previously defined messaged logic via Actions. Let's keep it consistent.
-        # But for query building it's cleaner to chain filters.
-        # Let's rebuild query to be composable.
-        pass
-    
+def encode_cursor(prospect):
+    """Curseur opaque (added_at, id) de la dernière ligne d'une page"""
+    added_at = prospect.added_at.isoformat() if prospect.added_at else None
+    raw = json.dumps([added_at, prospect.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """Retourne (added_at, id) ou None si le curseur est absent/invalide"""
+    if not cursor:
+        return None
+    try:
+        added_at, prospect_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return (datetime.fromisoformat(added_at) if added_at else None), int(prospect_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def prospects_page(db, account_id, status_filter='all', tag_filter='all', sort='newest', cursor=None, limit=PROSPECTS_PAGE_SIZE):
+    """
+    Une page de prospects en pagination par clé (added_at, id).
+
+    Le curseur désigne la dernière ligne déjà affichée : la page suivante
+    repart de là via l'index (account_id, added_at) au lieu d'un OFFSET qui
+    relirait toutes les lignes précédentes. Retourne (prospects, next_cursor).
+    """
+    query = db.query(Prospect).filter(Prospect.account_id == account_id)
+
     # 1. Apply Status Filter
     if status_filter == 'messaged':
-        query = query.join(Action).filter(Action.action_type == 'message', Action.status == 'success').distinct()
+        query = query.filter(Prospect.actions.any(and_(Action.action_type == 'message', Action.status == 'success')))
     elif status_filter != 'all':
         query = query.filter(Prospect.status == status_filter)
-        
+
     # 2. Apply Tag Filter
     if tag_filter and tag_filter != 'all':
         query = query.join(Prospect.tags).filter(Tag.id == int(tag_filter))
-        
-    prospects_list = query.order_by(Prospect.added_at.desc()).all()
+
+    # 3. Keyset : reprendre après la dernière ligne vue.
+    # SQLite place les added_at NULL en tête en ASC et en fin en DESC.
+    position = decode_cursor(cursor)
+    if position:
+        added_at, last_id = position
+        if sort == 'oldest':
+            if added_at is None:
+                query = query.filter(or_(
+                    Prospect.added_at.isnot(None),
+                    and_(Prospect.added_at.is_(None), Prospect.id > last_id)
+                ))
+            else:
+                query = query.filter(or_(
+                    Prospect.added_at > added_at,
+                    and_(Prospect.added_at == added_at, Prospect.id > last_id)
+                ))
+        else:
+            if added_at is None:
+                query = query.filter(Prospect.added_at.is_(None), Prospect.id < last_id)
+            else:
+                query = query.filter(or_(
+                    Prospect.added_at < added_at,
+                    and_(Prospect.added_at == added_at, Prospect.id < last_id),
+                    Prospect.added_at.is_(None)
+                ))
+
+    if sort == 'oldest':
+        query = query.order_by(Prospect.added_at.asc(), Prospect.id.asc())
+    else:
+        query = query.order_by(Prospect.added_at.desc(), Prospect.id.desc())
+
+    # Nombre de messages envoyés, limité aux prospects de la page (pas de COUNT par ligne)
+    page = query.options(selectinload(Prospect.tags)).limit(limit + 1).all()
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    message_counts = dict(db.query(
+        Action.prospect_id,
+        func.count(Action.id)
+    ).filter(
+        Action.prospect_id.in_([p.id for p in page]),
+        Action.action_type == 'message',
+        Action.status == 'success'
+    ).group_by(Action.prospect_id).all()) if page else {}
+
+    for prospect in page:
+        prospect.message_count = message_counts.get(prospect.id, 0)
+
+    next_cursor = encode_cursor(page[-1]) if has_more else None
+    return page, next_cursor
+
+
+def prospect_list_params():
+    """Filtres / tri / taille de page communs à /prospects et /api/prospects"""
+    status_filter = request.args.get('status', 'all')
+    tag_filter = request.args.get('tag', 'all')
+    if tag_filter != 'all' and not tag_filter.isdigit():
+        tag_filter = 'all'
+    sort = 'oldest' if request.args.get('sort') == 'oldest' else 'newest'
+    limit = min(max(request.args.get('limit', PROSPECTS_PAGE_SIZE, type=int), 1), PROSPECTS_MAX_PAGE_SIZE)
+    return status_filter, tag_filter, sort, limit
+
+
+@app.route('/prospects')
+def prospects():
+    """Page liste des prospects (première page seulement, la suite via /api/prospects)"""
+    db = SessionLocal()
     
-    # Pour chaque prospect, compter le nombre de messages envoyés (legacy logic check)
-    for prospect in prospects_list:
-        message_count = db.query(Action).filter(
-            Action.prospect_id == prospect.id,
-            Action.action_type == 'message',
-            Action.status == 'success'
-        ).count()
-        prospect.message_count = message_count
+    status_filter, tag_filter, sort, limit = prospect_list_params()
+    all_tags = db.query(Tag).all()
     
-    # Calculer les compteurs pour chaque filtre (Status)
-    account_id = g.account.id
-    counts = {
-        'all': db.query(Prospect).filter(Prospect.account_id == account_id).count(),
-        'new': db.query(Prospect).filter(Prospect.account_id == account_id, Prospect.status == 'new').count(),
-        'connected': db.query(Prospect).filter(Prospect.account_id == account_id, Prospect.status == 'connected').count(),
-        'followed': db.query(Prospect).filter(Prospect.account_id == account_id, Prospect.status == 'followed').count(),
-        'messaged': db.query(Action).join(Prospect).filter(
-            Prospect.account_id == account_id,
-            Action.action_type == 'message',
-            Action.status == 'success'
-        ).distinct(Action.prospect_id).count()
-    }
+    # Split tags for UI dropdowns
+    segment_tags = [t for t in all_tags if "Segment" in t.name or "Hors Cible" in t.name]
+    signal_tags = [t for t in all_tags if "Signal" in t.name]
 
-    # Préparer les données pour la modale JS (sérialisation propre)
-    import json
-    prospects_data = {}
-    for p in prospects_list:
-        prospects_data[str(p.id)] = {
-            'name': p.full_name,
-            'headline': p.headline or '',
-            'location': p.location or '',
-            'photo': p.profile_picture or '',
-            'about': p.summary or 'No description available.',
-            'experience': p.experiences or 'No experience info.',
-            'skills': p.skills or '',
-            'tags': [{'name': t.name, 'color': t.color} for t in p.tags]
-        }
+    prospects_list, next_cursor = prospects_page(db, g.account.id, status_filter, tag_filter, sort, limit=limit)
+    
+    # Calculer les compteurs pour chaque filtre (Status)
+    counts = status_counts(db, g.account.id)
     
     db.close()
     
     return render_template('prospects.html', 
                          prospects=prospects_list, 
+                         next_cursor=next_cursor,
                          status_filter=status_filter, 
                          current_tag=tag_filter,
+                         sort=sort,
                          all_tags=all_tags,
                          segment_tags=segment_tags,
                          signal_tags=signal_tags,
-                         counts=counts,
-                         prospects_json=json.dumps(prospects_data))
+                         counts=counts)
+
+@app.route('/api/prospects')
+def api_prospects():
+    """Liste paginée des prospects du compte actif (JSON + lignes HTML prêtes à insérer)"""
+    db = SessionLocal()
+    
+    status_filter, tag_filter, sort, limit = prospect_list_params()
+    cursor = request.args.get('cursor')
+    if cursor and decode_cursor(cursor) is None:
+        db.close()
+        return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
+    
+    prospects_list, next_cursor = prospects_page(db, g.account.id, status_filter, tag_filter, sort, cursor, limit)
+    
+    data = [{
+        'id': p.id,
+        'name': p.full_name,
+        'headline': p.headline or '',
+        'company': p.company or '',
+        'photo': p.profile_picture or '',
+        'linkedin_url': p.linkedin_url,
+        'status': p.status,
+        'message_count': p.message_count,
+        'added_at': p.added_at.isoformat() if p.added_at else None,
+        'tags': [{'id': t.id, 'name': t.name, 'color': t.color} for t in p.tags]
+    } for p in prospects_list]
+    
+    rows_html = render_template('_prospect_rows.html', prospects=prospects_list)
+    
+    db.close()
+    
+    return jsonify({'success': True, 'prospects': data, 'rows_html': rows_html, 'next_cursor': next_cursor})
 
 @app.route('/campaigns')
 def campaigns():
@@ -250,29 +407,27 @@ def campaigns():
     
     campaigns_list = db.query(Campaign).filter(Campaign.account_id == g.account.id).order_by(Campaign.created_at.desc()).all()
     
-    # Calculer les stats pour chaque campagne
+    # Stats de toutes les campagnes en requêtes groupées (coût constant quel que soit le nombre de campagnes)
+    stats = campaign_stats(db, g.account.id)
     for campaign in campaigns_list:
-        # Nombre de prospects associés à cette campagne
-        campaign.stats_prospects = db.query(Prospect).filter(Prospect.campaign_id == campaign.id).count()
-        
-        # Nombre de connexions envoyées (basé sur les logs actions)
-        campaign.stats_connected = db.query(Action).filter(
-            Action.campaign_id == campaign.id,
-            Action.action_type == 'connect', 
-            Action.status == 'success'
-        ).count()
-        
-        # Nombre de messages envoyés
-        campaign.stats_messaged = db.query(Action).filter(
-            Action.campaign_id == campaign.id,
-            Action.action_type == 'message',
-            Action.status == 'success'
-        ).count()
+        campaign_stat = stats.get(campaign.id, {})
+        campaign.stats_prospects = campaign_stat.get('prospects', 0)
+        campaign.stats_connected = campaign_stat.get('connected', 0)
+        campaign.stats_messaged = campaign_stat.get('messaged', 0)
 
     db.close()
     
     return render_template('campaigns.html', campaigns=campaigns_list)
 
+@app.route('/api/campaigns/stats')
+def api_campaigns_stats():
+    """Stats + séries journalières de toutes les campagnes du compte actif"""
+    db = SessionLocal()
+    days = min(max(request.args.get('days', 30, type=int), 1), 365)
+    stats = campaign_stats(db, g.account.id, days=days)
+    db.close()
+    return jsonify({'success': True, 'days': days, 'campaigns': {str(k): v for k, v in stats.items()}})
+
 @app.route('/messages')
 def messages():
     """Page liste des messages envoyés"""
@@ -318,55 +473,55 @@ def api_scrape():
     if not query:
         return jsonify({'error': 'Query required'}), 400
     
-    # Scraper
+    # Scraping + enrichissement + tagging exécutés par worker.py : on rend la main tout de suite
     print(f"🌍 API Scrape request: {query} (Account: {g.account.id})")
-    results = scraper.search_prospects(query, use_apify, max_results, account_id=g.account.id)
-    
-    # LOG ACTION: Scrape
-    # To avoid DB schema change for prospect_id nullable right now (complex with SQLite foreign keys),
-    # I will log the action attached to the first prospect found.
-    if results and len(results) > 0:
-        try:
-             db = SessionLocal()
-             # Find the first prospect that was just added/updated by the scraper
-             # This assumes scraper.search_prospects returns dicts with 'linkedin_url'
-             first_prospect_data = results[0]
-             first_prospect = db.query(Prospect).filter(Prospect.linkedin_url == first_prospect_data['linkedin_url']).first()
-             if first_prospect:
-                 action = Action(
-                     prospect_id=first_prospect.id,
-                     action_type='scrape',
-                     source='manual',
-                     status='success',
-                     message_sent=f"Scraped batch of {len(results)} profiles for query: '{query}'",
-                     executed_at=datetime.utcnow()
-                 )
-                 db.add(action)
-                 db.commit()
-             db.close()
-        except Exception as e:
-            print(f"Error logging scrape: {e}")
+    db = SessionLocal()
+    job = job_queue.enqueue(db, 'scrape', {
+        'query': query,
+        'use_apify': use_apify,
+        'max_results': max_results,
+    }, account_id=g.account.id)
+    job_id = job.id
+    db.close()
 
-    # Enrichissement automatique
-    try:
-        # Import local pour éviter les problèmes cirk
-        import sys
-        import os
-        sys.path.append(os.getcwd()) # Assurer que le CWD est dans le path
-        from enrich_prospects import enrich_prospects as run_enrichment
-        
-        print(f"🚀 Lancement enrichissement automatique pour {len(results)} prospects...")
-        # On lance l'enrichissement pour le nombre de résultats trouvés
-        run_enrichment(limit=len(results), force_clean=False)
-    except Exception as e:
-        print(f"⚠️ Erreur enrichissement auto: {e}")
+    return jsonify({'success': True, 'job_id': job_id}), 202
 
-    return jsonify({
+@app.route('/api/jobs/<int:job_id>')
+def api_job_status(job_id):
+    """API: État d'un pipeline de tâches (scrape -> enrich -> tag) pour le polling"""
+    db = SessionLocal()
+    job = db.query(Job).filter(Job.id == job_id, Job.account_id == g.account.id).first()
+    if not job:
+        db.close()
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+
+    stages = db.query(Job).filter(Job.pipeline_id == job.pipeline_id).order_by(Job.id).all()
+    data = {
         'success': True,
-        'found': len(results),
-        # 'added': ... (serait mieux si search_prospects le retournait)
-        'added': len(results) # Une approximation pour le MVP
-    })
+        'job': job_queue.job_to_dict(job),
+        'stages': [job_queue.job_to_dict(j) for j in stages],
+        # Terminé quand plus rien n'est en file / en cours (le tag est la dernière étape possible)
+        'finished': all(j.status in ('done', 'failed') for j in stages),
+        'failed': any(j.status == 'failed' for j in stages),
+    }
+    db.close()
+    return jsonify(data)
+
+@app.route('/api/jobs/<int:job_id>/retry', methods=['POST'])
+def api_job_retry(job_id):
+    """API: Relancer une étape en échec"""
+    db = SessionLocal()
+    job = db.query(Job).filter(Job.id == job_id, Job.account_id == g.account.id).first()
+    if not job:
+        db.close()
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+    if job.status != 'failed':
+        db.close()
+        return jsonify({'success': False, 'error': f'Job is {job.status}'}), 400
+
+    job_queue.retry(db, job)
+    db.close()
+    return jsonify({'success': True, 'job_id': job_id})
 
 @app.route('/api/connect', methods=['POST'])
 def api_connect():
@@ -382,52 +537,31 @@ def api_connect():
         db.close()
         return jsonify({'error': 'Prospect not found'}), 404
     
-    # TOUJOURS démarrer un bot FRAIS
-    print("🔄 Démarrage d'une session bot fraîche...")
-    fresh_bot = None
+    # Session chaude du compte (démarrée une seule fois, réutilisée entre les actions)
+    success = False
+    status_code = 'failed'
     try:
-        # Configuration Proxy depuis le compte
-        # Configuration Proxy depuis le compte (seulement si activé)
-        proxy_config = None
-        if g.account.proxy_url and g.account.proxy_enabled:
-            proxy_config = {
-                'server': g.account.proxy_url,
-                'username': g.account.proxy_username,
-                'password': g.account.proxy_password
-            }
+        with bot_pool.lease(g.account) as bot:
+            if bot:
+                # Envoyer demande de connexion
+                result = bot.send_connection_request(prospect.linkedin_url, message, profile_id=prospect.linkedin_urn)
+                if bot.last_profile_id:
+                    prospect.linkedin_urn = bot.last_profile_id
+                apply_profile_snapshot(prospect, bot.last_profile_snapshot)
+
+                # Gérer le retour (Tuple ou Bool)
+                if isinstance(result, tuple):
+                    success, status_code = result
+                else:
+                    success = result
+                    status_code = 'connected' if success else 'failed'
+            else:
+                print("❌ Aucune session bot disponible (cookie invalide ?)")
 
-        fresh_bot = LinkedInBot(
-            li_at_cookie=g.account.li_at_cookie, 
-            proxy_config=proxy_config,
-            user_agent=g.account.user_agent,
-            headless=False
-        )
-        fresh_bot.start()
-        
-        # Envoyer demande de connexion
-        result = fresh_bot.send_connection_request(prospect.linkedin_url, message)
-        
-        # Gérer le retour (Tuple ou Bool)
-        if isinstance(result, tuple):
-            success, status_code = result
-        else:
-            success = result
-            status_code = 'connected' if success else 'failed'
-            
     except Exception as e:
         print(f"❌ Erreur bot: {e}")
         success = False
         status_code = 'failed'
-    finally:
-        # Toujours fermer le bot après utilisation
-        if fresh_bot:
-            try:
-                if hasattr(fresh_bot, 'browser') and fresh_bot.browser:
-                    fresh_bot.browser.close()
-                if hasattr(fresh_bot, 'playwright') and fresh_bot.playwright:
-                    fresh_bot.playwright.stop()
-            except:
-                pass
     
     # Logger l'action
     action = Action(
@@ -469,44 +603,20 @@ def api_message():
         db.close()
         return jsonify({'error': 'Prospect not found'}), 404
     
-    # TOUJOURS démarrer un bot FRAIS pour éviter les sessions corrompues
-    print("🔄 Démarrage d'une session bot fraîche...")
-    fresh_bot = None
+    # Session chaude du compte (une session corrompue est fermée par le pool)
+    success = False
     try:
-        # Configuration Proxy depuis le compte
-        # Configuration Proxy depuis le compte (seulement si activé)
-        proxy_config = None
-        if g.account.proxy_url and g.account.proxy_enabled:
-            proxy_config = {
-                'server': g.account.proxy_url,
-                'username': g.account.proxy_username,
-                'password': g.account.proxy_password
-            }
+        with bot_pool.lease(g.account) as bot:
+            if bot:
+                # Envoyer message
+                success = bot.send_message(prospect.linkedin_url, message)
+                apply_profile_snapshot(prospect, bot.last_profile_snapshot)
+            else:
+                print("❌ Aucune session bot disponible (cookie invalide ?)")
 
-        fresh_bot = LinkedInBot(
-            li_at_cookie=g.account.li_at_cookie,
-            proxy_config=proxy_config,
-            user_agent=g.account.user_agent,
-            headless=False
-        )
-        fresh_bot.start()
-        
-        # Envoyer message
-        success = fresh_bot.send_message(prospect.linkedin_url, message)
-        
     except Exception as e:
         print(f"❌ Erreur bot: {e}")
         success = False
-    finally:
-        # Toujours fermer le bot après utilisation
-        if fresh_bot:
-            try:
-                if hasattr(fresh_bot, 'browser') and fresh_bot.browser:
-                    fresh_bot.browser.close()
-                if hasattr(fresh_bot, 'playwright') and fresh_bot.playwright:
-                    fresh_bot.playwright.stop()
-            except:
-                pass
     
     # Logger l'action
     action = Action(
@@ -578,6 +688,15 @@ def api_run_campaign():
         return jsonify({'success': False, 'error': 'La campagne doit être active'})
     
     db.close()
+
+    # run_campaigns.py s'arrête aussitôt si un autre runner (scheduler.py) tient le verrou
+    holder = lock_holder()
+    if holder:
+        return jsonify({
+            'success': False,
+            'error': f"Le planificateur exécute déjà les campagnes (pid {holder}) : les actions suivent ses créneaux",
+            'pid': holder,
+        }), 409
     
     # Créer le dossier logs
     import os
@@ -689,8 +808,9 @@ def api_prospect_item(prospect_id):
 
     if request.method == 'DELETE':
         try:
-            # Supprimer aussi les actions liées
-            db.query(Action).filter(Action.prospect_id == prospect.id).delete()
+            # Supprimer aussi les actions liées (via l'ORM pour que les compteurs de statuts suivent)
+            for action in prospect.actions:
+                db.delete(action)
             db.delete(prospect)
             db.commit()
             db.close()
@@ -754,6 +874,7 @@ def api_ai_generate():
     data = request.json
     prospect_id = data.get('prospect_id')
     prompt_override = data.get('prompt')
+    regenerate = bool(data.get('regenerate'))  # Contourne le cache : nouvelle proposition
 
     db = SessionLocal()
     prospect = db.query(Prospect).get(prospect_id)
@@ -783,7 +904,7 @@ def api_ai_generate():
     }
 
     ai_service = AIService()
-    generated_message = ai_service.generate_icebreaker(prospect_data, prompt_override)
+    generated_message = ai_service.generate_icebreaker(prospect_data, prompt_override, use_cache=not regenerate)
 
     if generated_message.startswith("Error"):
         return jsonify({'success': False, 'error': generated_message}), 500
@@ -911,10 +1032,13 @@ def delete_account():
         db.query(Prospect).filter(Prospect.account_id == account.id).delete(synchronize_session=False)
         # Supprimer Campagnes
         db.query(Campaign).filter(Campaign.account_id == account.id).delete(synchronize_session=False)
+        # Supprimer les compteurs de statuts (les suppressions en masse ne passent pas par l'ORM)
+        db.query(ProspectStatusCount).filter(ProspectStatusCount.account_id == account.id).delete(synchronize_session=False)
         
         # Supprimer le compte
         db.delete(account)
         db.commit()
+        bot_pool.discard(int(account_id))
         
         # Si c'était le compte actif, changer
         if session.get('account_id') == int(account_id):
@@ -979,8 +1103,18 @@ def update_account_security():
         return redirect(url_for('accounts_list', error="Account not found"))
         
     try:
-        # Security Settings (JSON)
-        settings = {
+        try:
+            previous = json.loads(account.security_settings) if account.security_settings else {}
+        except ValueError:
+            previous = {}
+
+        # Politique réseau : on conserve la config avancée (domaines, par action), seul 'enabled' vient du formulaire
+        resource_policy = dict(previous.get('resource_policy') or {})
+        resource_policy['enabled'] = request.form.get('block_resources') == 'on'
+
+        # Security Settings (JSON) : les clés sans champ dans le formulaire (timing...) sont conservées
+        settings = dict(previous)
+        settings.update({
             "timezone": request.form.get('timezone', 'Europe/Paris'),
             "working_hours": {
                 "start": request.form.get('start_time', '09:00'),
@@ -992,8 +1126,10 @@ def update_account_security():
                 "max": int(request.form.get('typing_max', 150))
             },
             "human_scroll": True if request.form.get('human_scroll') == 'on' else False,
-            "mouse_speed": "medium"
-        }
+            "mouse_speed": "medium",
+            "resource_policy": resource_policy,
+            "profile_capture": request.form.get('profile_capture') == 'on'
+        })
         
         account.security_settings = json.dumps(settings)
         db.commit()
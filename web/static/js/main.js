@@ -10,7 +10,7 @@ document.getElementById('search-form')?.addEventListener('submit', async (e) =>
     const maxResults = document.getElementById('max-results').value;
 
     const resultsDiv = document.getElementById('search-results');
-    resultsDiv.innerHTML = '<div style="padding:1rem;color:var(--text-muted);">🔄 Recherche en cours sur Google/SearchAPI... Veuillez patienter.</div>';
+    resultsDiv.innerHTML = '<div style="padding:1rem;color:var(--text-muted);">🔄 Ajout de la recherche à la file de tâches...</div>';
 
     try {
         const response = await fetch('/api/scrape', {
@@ -28,20 +28,89 @@ document.getElementById('search-form')?.addEventListener('submit', async (e) =>
         const data = await response.json();
 
         if (data.success) {
-            resultsDiv.innerHTML = `
-                <div style="padding:1rem; background:#e8f5e9; border-radius:4px; color:#2e7d32; margin-top:10px;">
-                    ✅ <strong>Succès !</strong> ${data.found} profils trouvés pour "${query}".<br>
-                    <a href="/prospects" style="color:#2e7d32; text-decoration:underline;">Voir la liste des prospects →</a>
-                </div>
-            `;
+            // Le scraping tourne dans le worker : on suit l'avancement du pipeline
+            pollScrapeJob(data.job_id, query || 'recherche avancée', resultsDiv);
         } else {
-            resultsDiv.innerHTML = `<div style="padding:1rem; color:red;">❌ ${data.error || 'Erreur inconnue'}</div>`;
+            resultsDiv.innerHTML = `<div style="padding:1rem; color:red;">❌ ${escapeHtml(data.error || 'Erreur inconnue')}</div>`;
         }
     } catch (error) {
         resultsDiv.innerHTML = '<div style="padding:1rem; color:red;">❌ Erreur réseau ou serveur. Vérifiez la console.</div>';
     }
 });
 
+// Texte serveur ou saisi par l'utilisateur, inséré dans du HTML
+function escapeHtml(value) {
+    return String(value ?? '')
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;')
+        .replace(/'/g, '&#39;');
+}
+
+// Suivi d'un pipeline de tâches (scrape -> enrich -> tag)
+const JOB_STAGE_LABELS = { scrape: '🔍 Recherche', enrich: '🧬 Enrichissement', tag: '🤖 Tagging IA' };
+const JOB_STATUS_ICONS = { queued: '⏳', running: '🔄', done: '✅', failed: '❌' };
+
+async function pollScrapeJob(jobId, query, resultsDiv) {
+    let data;
+    try {
+        const response = await fetch(`/api/jobs/${jobId}`);
+        data = await response.json();
+    } catch (error) {
+        setTimeout(() => pollScrapeJob(jobId, query, resultsDiv), 3000);
+        return;
+    }
+
+    if (!data.success) {
+        resultsDiv.innerHTML = `<div style="padding:1rem; color:red;">❌ ${escapeHtml(data.error || 'Tâche introuvable')}</div>`;
+        return;
+    }
+
+    const stages = data.stages.map(stage => `
+        <div style="margin:4px 0;">
+            ${JOB_STATUS_ICONS[stage.status] || ''} ${JOB_STAGE_LABELS[stage.type] || escapeHtml(stage.type)}
+            — ${stage.progress}% ${stage.message ? `<span style="color:var(--text-muted);">(${escapeHtml(stage.message)})</span>` : ''}
+            ${stage.status === 'failed' ? `<br><span style="color:red;">${escapeHtml(stage.error)}</span>
+                <button onclick="retryJob(${stage.id}, ${jobId}, this)" style="margin-left:6px;">🔁 Relancer</button>` : ''}
+        </div>
+    `).join('');
+
+    const found = data.stages[0].result ? data.stages[0].result.found : null;
+    const background = data.failed ? '#ffebee' : (data.finished ? '#e8f5e9' : '#f5f5f5');
+
+    resultsDiv.innerHTML = `
+        <div style="padding:1rem; background:${background}; border-radius:4px; margin-top:10px;">
+            <strong>Recherche "${escapeHtml(query)}"</strong>${found !== null ? ` — ${found} profils trouvés` : ''}
+            ${stages}
+            ${data.finished && !data.failed ? '<a href="/prospects" style="color:#2e7d32; text-decoration:underline;">Voir la liste des prospects →</a>' : ''}
+        </div>
+    `;
+    resultsDiv.dataset.query = query;
+
+    if (!data.finished) {
+        setTimeout(() => pollScrapeJob(jobId, query, resultsDiv), 2000);
+    }
+}
+
+async function retryJob(stageId, pipelineJobId, btn) {
+    btn.disabled = true;
+    try {
+        const response = await fetch(`/api/jobs/${stageId}/retry`, { method: 'POST' });
+        const data = await response.json();
+        if (!data.success) {
+            alert('❌ Erreur : ' + (data.error || 'Relance impossible'));
+            btn.disabled = false;
+            return;
+        }
+        const resultsDiv = document.getElementById('search-results');
+        pollScrapeJob(pipelineJobId, resultsDiv.dataset.query || '', resultsDiv);
+    } catch (error) {
+        alert('❌ Erreur : ' + error.message);
+        btn.disabled = false;
+    }
+}
+
 // Envoyer demande de connexion
 async function sendConnection(prospectId) {
     const message = prompt('Message personnalisé pour l\'invitation (Laisser vide pour envoyer sans note) :');
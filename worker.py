@@ -0,0 +1,190 @@
+"""
+Worker de la file de tâches (scraping -> enrichissement Apify -> tagging IA,
+brouillons de messages IA des campagnes).
+
+Tourne en processus séparé du serveur web (cf. entrypoint.sh) : /api/scrape
+n'empile qu'une tâche et rend la main immédiatement.
+
+Usage:
+    python worker.py            # boucle infinie
+    python worker.py --once     # traite les tâches prêtes puis s'arrête
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import time
+import traceback
+from datetime import datetime
+
+from database import SessionLocal, Prospect, Action, Campaign
+from database.models import Job
+from services import job_queue
+from services.scraper import LinkedInScraper
+from services.message_drafts import draft_candidates, prepare_drafts
+from enrich_prospects import select_prospects, apply_enrichment, tag_signals
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+POLL_INTERVAL = 2
+STALE_CHECK_INTERVAL = 60
+
+_scraper = None
+_stopping = False
+
+
+def get_scraper():
+    global _scraper
+    if _scraper is None:
+        _scraper = LinkedInScraper()
+    return _scraper
+
+
+def run_scrape(db, job, payload):
+    """Étape 1 : recherche Google + sauvegarde des prospects du compte"""
+    query = payload['query']
+    job_queue.update_progress(db, job, 5, f"Searching: {query}")
+
+    results = get_scraper().search_prospects(
+        query, payload.get('use_apify', False), payload.get('max_results', 20), account_id=job.account_id
+    )
+    urls = [r['linkedin_url'] for r in results]
+    prospect_ids = [pid for (pid,) in db.query(Prospect.id).filter(
+        Prospect.account_id == job.account_id,
+        Prospect.linkedin_url.in_(urls)
+    ).all()] if urls else []
+
+    # LOG ACTION: Scrape (rattachée au premier prospect trouvé, prospect_id n'étant pas nullable)
+    if prospect_ids:
+        db.add(Action(
+            prospect_id=prospect_ids[0],
+            action_type='scrape',
+            source='manual',
+            status='success',
+            message_sent=f"Scraped batch of {len(results)} profiles for query: '{query}'",
+            executed_at=datetime.utcnow()
+        ))
+        db.commit()
+        job_queue.enqueue(db, 'enrich', {'prospect_ids': prospect_ids},
+                          account_id=job.account_id, pipeline_id=job.pipeline_id)
+
+    return {'found': len(results), 'prospect_ids': prospect_ids}
+
+
+def run_enrich(db, job, payload):
+    """Étape 2 : enrichissement Apify des prospects trouvés"""
+    prospect_ids = payload.get('prospect_ids', [])
+    prospects = select_prospects(db, prospect_ids=prospect_ids)
+
+    updated = 0
+    if prospects:
+        job_queue.update_progress(db, job, 10, f"Enriching {len(prospects)} profiles via Apify...")
+        updated = apply_enrichment(db, prospects)
+
+    job_queue.enqueue(db, 'tag', {'prospect_ids': prospect_ids},
+                      account_id=job.account_id, pipeline_id=job.pipeline_id)
+    return {'enriched': updated, 'candidates': len(prospects)}
+
+
+def run_tag(db, job, payload):
+    """Étape 3 : tagging IA des signaux sur les prospects enrichis"""
+    prospects = db.query(Prospect).filter(
+        Prospect.id.in_(payload.get('prospect_ids', [])),
+        Prospect.is_enriched == True
+    ).all()
+
+    def on_progress(done, total):
+        job_queue.update_progress(db, job, 100 * done / total, f"{done}/{total} analysed")
+
+    if prospects:
+        tag_signals(db, prospects, on_progress=on_progress)
+    return {'analysed': len(prospects)}
+
+
+def run_drafts(db, job, payload):
+    """Messages IA pré-générés pour les prochains prospects d'une campagne (empilé par scheduler.py)"""
+    campaign = db.query(Campaign).get(payload['campaign_id'])
+    if not campaign or not campaign.use_ai_customization:
+        return {'skipped': True}
+
+    prospects = draft_candidates(db, campaign, limit=payload.get('limit') or campaign.daily_limit or 10)
+
+    def on_progress(done, total):
+        job_queue.update_progress(db, job, 100 * done / total, f"{done}/{total} drafts")
+
+    return prepare_drafts(db, campaign, prospects, on_progress=on_progress)
+
+
+HANDLERS = {
+    'scrape': run_scrape,
+    'enrich': run_enrich,
+    'tag': run_tag,
+    'drafts': run_drafts,
+}
+
+
+def run_job(job_id):
+    # Session dédiée : le scraper ouvre/ferme la session scopée du thread (get_db),
+    # ce qui détacherait le Job en cours
+    db = SessionLocal.session_factory()
+    job = db.query(Job).get(job_id)
+    print(f"⚙️ Job #{job.id} ({job.job_type}) - tentative {job.attempts}/{job.max_attempts}")
+    try:
+        handler = HANDLERS.get(job.job_type)
+        if handler is None:
+            raise ValueError(f"Unknown job type: {job.job_type}")
+        result = handler(db, job, json.loads(job.payload or '{}'))
+        job_queue.complete(db, job, result)
+        print(f"✅ Job #{job.id} terminé: {result}")
+    except Exception as e:
+        traceback.print_exc()
+        db.rollback()
+        job = db.query(Job).get(job_id)
+        job_queue.fail(db, job, str(e))
+        print(f"❌ Job #{job.id} en échec ({job.status}): {e}")
+    finally:
+        db.close()
+        SessionLocal.remove()
+
+
+def _handle_stop(signum, frame):
+    global _stopping
+    print("🛑 Arrêt demandé, fin de la tâche en cours...")
+    _stopping = True
+
+
+def main(once=False):
+    signal.signal(signal.SIGTERM, _handle_stop)
+    signal.signal(signal.SIGINT, _handle_stop)
+    print(f"👷 Worker {WORKER_ID} démarré")
+
+    last_stale_check = 0
+    while not _stopping:
+        db = SessionLocal()
+        if time.monotonic() - last_stale_check > STALE_CHECK_INTERVAL:
+            requeued = job_queue.requeue_stale(db)
+            if requeued:
+                print(f"♻️ {requeued} tâche(s) abandonnée(s) remise(s) en file")
+            last_stale_check = time.monotonic()
+
+        job = job_queue.claim_next(db, WORKER_ID)
+        job_id = job.id if job else None
+        db.close()
+        SessionLocal.remove()
+
+        if job_id:
+            run_job(job_id)
+        elif once:
+            break
+        else:
+            time.sleep(POLL_INTERVAL)
+
+    print("👋 Worker arrêté")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Worker de la file de tâches')
+    parser.add_argument('--once', action='store_true', help='Traiter les tâches prêtes puis quitter')
+    args = parser.parse_args()
+    main(once=args.once)